@@ -0,0 +1,188 @@
+"""
+Stand-ins locais para testes e benchmarks (sem Gemini / Vertex AI); fora do pacote src.
+Permitem exercitar o StatefulFinanceAgent de ponta a ponta com latência controlada.
+"""
+
+import asyncio
+import random
+import threading
+import time
+from collections import Counter
+from collections.abc import AsyncGenerator, Callable
+from typing import Any
+
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+from pydantic import PrivateAttr
+
+
+class FakeThrottledError(Exception):
+    """Equivalente local de um 429 RESOURCE_EXHAUSTED."""
+
+
+def echo_system_instruction(llm_request: LlmRequest) -> str:
+    """Responde com o system prompt recebido (útil para detectar vazamento entre sessões)."""
+    return str(llm_request.config.system_instruction or "")
+
+
+class FakeLlm(BaseLlm):
+    """
+    LLM fake compatível com o ADK (BaseLlm).
+    `latency_s` simula o tempo total de geração; `reply` gera o texto a partir do LlmRequest.
+    Em streaming (SSE) a resposta sai em chunks de palavras, com a latência distribuída entre eles.
+    `failure_rate` é a fração de chamadas que falham com FakeThrottledError (semente fixa).
+    """
+
+    model: str = "fake-llm"
+    latency_s: float = 0.0
+    reply: Callable[[LlmRequest], str] = lambda _req: "Resposta simulada do negociador."
+    failure_rate: float = 0.0
+    seed: int = 42
+    calls: int = 0
+
+    _rng: random.Random | None = PrivateAttr(default=None)
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        self.calls += 1
+        if self.failure_rate:
+            if self._rng is None:
+                self._rng = random.Random(self.seed)
+            if self._rng.random() < self.failure_rate:
+                raise FakeThrottledError("429 RESOURCE_EXHAUSTED (fake LLM)")
+        text = self.reply(llm_request)
+        if stream:
+            chunks = [word + " " for word in text.split(" ")]
+            chunks[-1] = chunks[-1][:-1]
+            for chunk in chunks:
+                if self.latency_s:
+                    await asyncio.sleep(self.latency_s / len(chunks))
+                yield LlmResponse(content=types.Content(role="model", parts=[types.Part(text=chunk)]), partial=True)
+        elif self.latency_s:
+            await asyncio.sleep(self.latency_s)
+        yield LlmResponse(content=types.Content(role="model", parts=[types.Part(text=text)]))
+
+
+class CountingSessionService(InMemorySessionService):
+    """
+    InMemorySessionService que conta round trips por método (get/create/append) e simula latência.
+    `failure_rate` é a fração de leituras (get_session) que falham com FakeThrottledError; escritas
+    nunca falham, para não deixar o store num estado que o Vertex não produziria.
+    """
+
+    def __init__(self, latency_s: float = 0.0, *, failure_rate: float = 0.0, seed: int = 42):
+        super().__init__()
+        self.latency_s = latency_s
+        self.failure_rate = failure_rate
+        self.calls: Counter[str] = Counter()
+        self.failures = 0
+        self._rng = random.Random(seed)
+
+    async def _round_trip(self, method: str) -> None:
+        self.calls[method] += 1
+        if self.latency_s:
+            await asyncio.sleep(self.latency_s)
+
+    def _maybe_throttle(self) -> None:
+        if self.failure_rate and self._rng.random() < self.failure_rate:
+            self.failures += 1
+            raise FakeThrottledError("429 RESOURCE_EXHAUSTED (fake session)")
+
+    async def get_session(self, **kwargs: Any):
+        await self._round_trip("get_session")
+        self._maybe_throttle()
+        return await super().get_session(**kwargs)
+
+    def get_session_sync(self, **kwargs: Any):
+        self.calls["get_session"] += 1
+        self._maybe_throttle()
+        return self._get_session_impl(**kwargs)
+
+    async def create_session(self, **kwargs: Any):
+        await self._round_trip("create_session")
+        return await super().create_session(**kwargs)
+
+    def create_session_sync(self, **kwargs: Any):
+        self.calls["create_session"] += 1
+        return self._create_session_impl(**kwargs)
+
+    async def append_event(self, session: Any, event: Any):
+        await self._round_trip("append_event")
+        return await super().append_event(session=session, event=event)
+
+
+class FakeMemoryDocument:
+    def __init__(self, content: str, score: float = 1.0):
+        self.content = content
+        self.score = score
+
+
+class FakeMemoryService:
+    """
+    Backend vetorial fake com a mesma interface usada pelo LongTermMemoryGateway (`search_memory`).
+    `failure_rate` é a fração de chamadas que falham com FakeThrottledError (semente fixa).
+    `add_sessions_to_memory` é a escrita em lote usada pela ingestão: cada sessão vira um documento
+    (um round trip de `ingest_latency_s` por lote), buscável nas consultas seguintes.
+    """
+
+    def __init__(
+        self,
+        documents: list[str] | None = None,
+        *,
+        latency_s: float = 0.0,
+        failure_rate: float = 0.0,
+        ingest_latency_s: float = 0.0,
+        seed: int = 42,
+    ):
+        self.documents = documents if documents is not None else ["O cliente prefere parcelas menores."]
+        self.latency_s = latency_s
+        self.ingest_latency_s = ingest_latency_s
+        self.ingested_sessions: list[str] = []
+        self.ingest_batches = 0
+        self.failure_rate = failure_rate
+        self.calls = 0
+        self.failures = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def search_memory(self, query: str) -> list[FakeMemoryDocument]:
+        with self._lock:
+            self.calls += 1
+            throttled = self._rng.random() < self.failure_rate
+            if throttled:
+                self.failures += 1
+        if self.latency_s:
+            time.sleep(self.latency_s)
+        if throttled:
+            raise FakeThrottledError("429 RESOURCE_EXHAUSTED (fake)")
+        return [FakeMemoryDocument(doc) for doc in self.documents]
+
+    async def add_sessions_to_memory(self, sessions: list[Any]) -> None:
+        if self.ingest_latency_s:
+            await asyncio.sleep(self.ingest_latency_s)
+        with self._lock:
+            if self._rng.random() < self.failure_rate:
+                self.failures += 1
+                raise FakeThrottledError("429 RESOURCE_EXHAUSTED (fake)")
+            self.ingest_batches += 1
+            for session in sessions:
+                stage = (session.state or {}).get("funnel_stage", "desconhecido")
+                self.ingested_sessions.append(session.id)
+                self.documents.append(f"Negociação {session.id} encerrada em {stage}.")
+
+
+def build_fake_agent() -> Any:
+    """Fábrica de agente para `python -m src.worker_pool --factory`: LLM e banco vetorial fake, sem GCP."""
+    from src.agent_router import StatefulFinanceAgent
+    from src.memory_gateway import LongTermMemoryGateway
+    from src.session_gateway import NegotiationSessionGateway
+
+    return StatefulFinanceAgent(
+        session_gw=NegotiationSessionGateway(),
+        memory_gw=LongTermMemoryGateway(service=FakeMemoryService()),
+        model=FakeLlm(latency_s=0.05, reply=lambda _req: "Posso revisar a taxa considerando seu histórico."),
+    )
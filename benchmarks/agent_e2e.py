@@ -0,0 +1,251 @@
+"""
+Benchmark ponta a ponta do StatefulFinanceAgent.process_message com backends locais.
+
+O Gemini, o VertexAiSessionService e o VertexAiMemoryBankService são substituídos pelos fakes de
+benchmarks/_support.py, com latência e taxa de falha configuráveis. Cada cenário roda num agente novo e
+reporta p50/p95/p99 por turno, turnos/s, erros e RSS de pico. O resultado é um JSON que pode ser
+comparado com o de outro commit (--baseline).
+
+As sessões começam em `rate_proposed` (estágio que consulta a Long-Term Memory) e a política do
+benchmark eleva `max_rejections` para que conversas longas não caiam no handoff; o backoff de
+retry é encurtado para que cenários com throttling meçam o caminho de retry, não o sleep.
+
+Uso:
+    python -m benchmarks.agent_e2e --output results.json
+    python -m benchmarks.agent_e2e --scenario hot_session_contention --baseline results.json
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass, replace
+from pathlib import Path
+
+import yaml
+from src.agent_router import StatefulFinanceAgent
+from src.memory_gateway import LongTermMemoryGateway
+from src.policy import load_policy
+from src.session_gateway import NegotiationSessionGateway
+
+from benchmarks._support import CountingSessionService, FakeLlm, FakeMemoryService
+
+BENCH_POLICY_OVERRIDES = {
+    "session": {"max_rejections": 1_000_000},
+    "retry": {"initial_wait_s": 0.01, "max_wait_s": 0.1},
+}
+
+
+@dataclass(frozen=True)
+class BackendProfile:
+    """Latência (segundos) e fração de falhas (429 simulado) de cada backend fake."""
+
+    llm_latency_s: float = 0.05
+    llm_failure_rate: float = 0.0
+    session_latency_s: float = 0.005
+    session_failure_rate: float = 0.0
+    memory_latency_s: float = 0.01
+    memory_failure_rate: float = 0.0
+
+
+@dataclass(frozen=True)
+class Scenario:
+    """`clients` conversas concorrentes de `turns` turnos sequenciais sobre `sessions` sessões distintas."""
+
+    name: str
+    sessions: int
+    clients: int
+    turns: int
+    backends: BackendProfile = BackendProfile()
+
+
+SCENARIOS = {
+    s.name: s
+    for s in (
+        Scenario("single_session_many_turns", sessions=1, clients=1, turns=200),
+        Scenario("many_sessions_few_turns", sessions=500, clients=500, turns=2),
+        Scenario("hot_session_contention", sessions=1, clients=50, turns=2),
+        Scenario(
+            "throttled_backends",
+            sessions=200,
+            clients=200,
+            turns=2,
+            backends=BackendProfile(llm_failure_rate=0.02, session_failure_rate=0.1, memory_failure_rate=0.3),
+        ),
+    )
+}
+
+
+def _percentile(samples: list[float], pct: float) -> float:
+    """Percentil por nearest-rank (sem depender do NumPy)."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(1, round(pct / 100 * len(ordered) + 0.5 - 1e-9))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss é em KiB no Linux e em bytes no macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _bench_policy(directory: Path) -> Path:
+    policy = load_policy()
+    for section, overrides in BENCH_POLICY_OVERRIDES.items():
+        policy.setdefault(section, {}).update(overrides)
+    path = directory / "memory_policy.yaml"
+    path.write_text(yaml.safe_dump(policy), encoding="utf-8")
+    return path
+
+
+def _build_agent(backends: BackendProfile, policy_path: Path) -> StatefulFinanceAgent:
+    session_gw = NegotiationSessionGateway(
+        service=CountingSessionService(backends.session_latency_s, failure_rate=backends.session_failure_rate),
+        policy_path=policy_path,
+    )
+    memory_gw = LongTermMemoryGateway(
+        service=FakeMemoryService(latency_s=backends.memory_latency_s, failure_rate=backends.memory_failure_rate),
+        policy_path=policy_path,
+    )
+    llm = FakeLlm(
+        latency_s=backends.llm_latency_s,
+        failure_rate=backends.llm_failure_rate,
+        reply=lambda _req: "Entendo sua posição. Posso revisar a taxa considerando seu histórico conosco.",
+    )
+    return StatefulFinanceAgent(session_gw=session_gw, memory_gw=memory_gw, policy_path=policy_path, model=llm)
+
+
+async def _seed_session(agent: StatefulFinanceAgent, session_id: str) -> None:
+    session, state = await agent.session_gw.recover_or_create(session_id, "premium")
+    state.funnel_stage = "rate_proposed"
+    state.proposed_rate = 1.49
+    await agent.session_gw.save_checkpoint(session, state)
+
+
+async def _seed_sessions(agent: StatefulFinanceAgent, session_ids: list[str]) -> None:
+    for session_id in session_ids:
+        # Leituras do backend podem falhar no cenário com throttling: o seed repete até conseguir.
+        for _ in range(100):
+            try:
+                await _seed_session(agent, session_id)
+                break
+            except Exception:
+                continue
+
+
+async def run_scenario(scenario: Scenario, policy_path: Path) -> dict:
+    agent = _build_agent(scenario.backends, policy_path)
+    session_ids = [f"bench-{scenario.name}-{i}" for i in range(scenario.sessions)]
+    await _seed_sessions(agent, session_ids)
+
+    latencies_ms: list[float] = []
+    errors = 0
+
+    async def client(i: int) -> None:
+        nonlocal errors
+        session_id = session_ids[i % len(session_ids)]
+        for _ in range(scenario.turns):
+            t0 = time.perf_counter()
+            try:
+                await agent.process_message(session_id, "A taxa ainda está alta para mim.", "premium")
+            except Exception:
+                errors += 1
+                continue
+            latencies_ms.append((time.perf_counter() - t0) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client(i) for i in range(scenario.clients)))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "scenario": scenario.name,
+        "config": asdict(scenario),
+        "turns": scenario.clients * scenario.turns,
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "turns_per_s": round(len(latencies_ms) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(_percentile(latencies_ms, 50), 3),
+        "p95_ms": round(_percentile(latencies_ms, 95), 3),
+        "p99_ms": round(_percentile(latencies_ms, 99), 3),
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+        "memory_retries": agent.memory_gw.retrier.retries,
+        "session_retries": agent.session_gw.retrier.retries,
+        "lock_contended": agent.session_gw.lock_stats.contended,
+    }
+
+
+def _git_commit() -> str | None:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.stdout.strip()
+
+
+async def main_async(scenarios: list[Scenario]) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        policy_path = _bench_policy(Path(tmp))
+        results = [await run_scenario(scenario, policy_path) for scenario in scenarios]
+    return {
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+
+
+def compare(current: dict, baseline: dict) -> list[str]:
+    """Variação percentual de turns_per_s e p95/p99 por cenário em relação ao baseline."""
+    previous = {r["scenario"]: r for r in baseline.get("results", [])}
+    lines = []
+    for result in current["results"]:
+        base = previous.get(result["scenario"])
+        if base is None:
+            continue
+        deltas = []
+        for key in ("turns_per_s", "p95_ms", "p99_ms"):
+            if base[key]:
+                deltas.append(f"{key} {(result[key] - base[key]) / base[key] * 100:+.1f}%")
+        lines.append(f"{result['scenario']}: " + ", ".join(deltas))
+    return lines
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS), help="padrão: todos")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiplica clientes e turnos (ex: 0.1)")
+    parser.add_argument("--output", help="grava o JSON de resultados neste arquivo")
+    parser.add_argument("--baseline", help="JSON de uma execução anterior para comparar")
+    args = parser.parse_args()
+
+    scenarios = [SCENARIOS[name] for name in (args.scenario or SCENARIOS)]
+    if args.scale != 1.0:
+        scenarios = [
+            replace(
+                s,
+                sessions=max(1, round(s.sessions * args.scale)),
+                clients=max(1, round(s.clients * args.scale)),
+                turns=max(1, round(s.turns * args.scale)),
+            )
+            for s in scenarios
+        ]
+    report = asyncio.run(main_async(scenarios))
+    text = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+    print(text)
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        for line in compare(report, baseline):
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
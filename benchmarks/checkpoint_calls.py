@@ -0,0 +1,52 @@
+"""
+Benchmark: round trips ao Session Service por turno (recover_or_create + save_checkpoint).
+
+Compara o caminho padrão (get de verificação OCC antes do append) com o modo single_writer
+(versão conhecida localmente, save em um único append_event).
+
+Uso:
+    python -m benchmarks.checkpoint_calls --turns 50
+"""
+
+import argparse
+import asyncio
+import time
+
+from src.session_gateway import NegotiationSessionGateway
+
+from benchmarks._support import CountingSessionService
+
+
+async def _run(single_writer: bool, turns: int) -> dict:
+    service = CountingSessionService()
+    gw = NegotiationSessionGateway(service=service, single_writer=single_writer)
+    start = time.perf_counter()
+    for _ in range(turns):
+        session, state = await gw.recover_or_create("bench-checkpoint", "premium")
+        state.rejection_count += 1
+        await gw.save_checkpoint(session, state)
+    elapsed = time.perf_counter() - start
+    # O primeiro turno cria a sessão; a métrica de interesse é o turno em regime.
+    steady = sum(service.calls.values()) - service.calls["create_session"]
+    return {
+        "mode": "single_writer" if single_writer else "occ_refetch",
+        "calls": dict(service.calls),
+        "calls_per_turn": round(steady / turns, 2),
+        "ms_per_turn": round(elapsed / turns * 1000, 3),
+    }
+
+
+async def main_async(turns: int) -> list[dict]:
+    return [await _run(False, turns), await _run(True, turns)]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=50)
+    args = parser.parse_args()
+    for row in asyncio.run(main_async(args.turns)):
+        print(row)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Benchmark: tamanho do log de eventos da sessão e latência de recuperação ao longo de N turnos.
+
+Compara checkpoints com o state completo, checkpoints só com os campos alterados (delta) e
+delta + compactação periódica. Cada turno também grava um evento de conversa, como o Runner faz.
+
+Uso:
+    python -m benchmarks.checkpoint_log_size --turns 50
+"""
+
+import argparse
+import asyncio
+import time
+
+from google.adk.events import Event
+from google.genai import types
+from src.session_gateway import APP_NAME, USER_ID, NegotiationSessionGateway
+
+from benchmarks._support import CountingSessionService
+
+SESSION_ID = "bench-log-size"
+
+
+async def _run(mode: str, turns: int, compaction_threshold: int) -> dict:
+    service = CountingSessionService()
+    gw = NegotiationSessionGateway(
+        service=service,
+        delta_checkpoints=mode != "full",
+        compaction_event_threshold=compaction_threshold if mode == "delta+compaction" else 0,
+    )
+    recover_s = 0.0
+    for turn in range(turns):
+        start = time.perf_counter()
+        session, state = await gw.recover_or_create(SESSION_ID, "premium")
+        recover_s += time.perf_counter() - start
+        message = types.Content(role="user", parts=[types.Part(text=f"Mensagem {turn}: a taxa ainda está alta.")])
+        await service.append_event(session=session, event=Event(author="user", content=message))
+        state.rejection_count += 1
+        await gw.save_checkpoint(session, state)
+
+    stored = await service.get_session(app_name=APP_NAME, user_id=USER_ID, session_id=SESSION_ID)
+    return {
+        "mode": mode,
+        "events": len(stored.events),
+        "event_log_bytes": sum(len(e.model_dump_json()) for e in stored.events),
+        "compactions": gw.compactions,
+        "recover_ms_avg": round(recover_s / turns * 1000, 3),
+    }
+
+
+async def main_async(turns: int, compaction_threshold: int) -> list[dict]:
+    return [await _run(mode, turns, compaction_threshold) for mode in ("full", "delta", "delta+compaction")]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=50)
+    parser.add_argument("--compaction-threshold", type=int, default=40)
+    args = parser.parse_args()
+    for row in asyncio.run(main_async(args.turns, args.compaction_threshold)):
+        print(row)
+
+
+if __name__ == "__main__":
+    main()
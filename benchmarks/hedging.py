@@ -0,0 +1,158 @@
+"""
+Benchmark: p99 das leituras com e sem hedged requests, contra backends de latência com cauda pesada.
+
+O backend fake responde em ~`base_ms` na maior parte das chamadas e, com probabilidade
+`tail_prob`, numa cauda de Pareto (`tail_ms` × Pareto(α=1.5)), o formato típico de GC, filas
+e vizinhos barulhentos. Cada modo roda o mesmo volume de leituras concorrentes em
+LongTermMemoryGateway.search_customer_insights (consultas distintas, sem cache) e em
+NegotiationSessionGateway.recover_or_create (get_session), e reporta p50/p95/p99 e taxa de hedge.
+
+Uso:
+    python -m benchmarks.hedging --calls 2000 --concurrency 32
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import tempfile
+import time
+from pathlib import Path
+
+import yaml
+from src.memory_gateway import LongTermMemoryGateway
+from src.session_gateway import NegotiationSessionGateway
+
+from benchmarks._support import CountingSessionService, FakeMemoryDocument
+from benchmarks.agent_e2e import _percentile
+
+
+class HeavyTailLatency:
+    """Amostrador de latência (segundos): base com jitter e, com `tail_prob`, cauda de Pareto."""
+
+    def __init__(self, base_ms: float, tail_prob: float, tail_ms: float, seed: int = 7):
+        self.base_ms = base_ms
+        self.tail_prob = tail_prob
+        self.tail_ms = tail_ms
+        self._rng = random.Random(seed)
+
+    def sample(self) -> float:
+        if self._rng.random() < self.tail_prob:
+            return self.tail_ms * self._rng.paretovariate(1.5) / 1000
+        return self.base_ms * self._rng.uniform(0.8, 1.2) / 1000
+
+
+class HeavyTailMemoryService:
+    """Backend vetorial (search_memory síncrono, como o Vertex) com latência de cauda pesada."""
+
+    def __init__(self, latency: HeavyTailLatency):
+        self.latency = latency
+        self.calls = 0
+
+    def search_memory(self, query: str) -> list[FakeMemoryDocument]:
+        self.calls += 1
+        time.sleep(self.latency.sample())
+        return [FakeMemoryDocument("O cliente prefere parcelas menores.")]
+
+
+class HeavyTailSessionService(CountingSessionService):
+    """Session Service em memória cujo get_session async tem latência de cauda pesada."""
+
+    def __init__(self, latency: HeavyTailLatency):
+        super().__init__()
+        self.latency = latency
+        self.reads = 0
+
+    async def get_session(self, **kwargs):
+        self.reads += 1
+        await asyncio.sleep(self.latency.sample())
+        return await super().get_session(**kwargs)
+
+
+def _policy(directory: Path, hedging: bool, concurrency: int) -> Path:
+    hedge = {"enabled": hedging, "quantile": 0.95, "max_hedge_ratio": 0.1, "min_samples": 50}
+    # Executor com folga para as cópias: uma fila no executor mascararia a cauda do backend.
+    executor = {"max_workers": concurrency * 2}
+    policy = {
+        "vector_search": {"cache_ttl_seconds": 0, "hedging": hedge, "executor": executor},
+        "session": {"hedging": hedge},
+    }
+    path = directory / f"policy_{'hedged' if hedging else 'plain'}.yaml"
+    path.write_text(yaml.safe_dump(policy), encoding="utf-8")
+    return path
+
+
+async def _drive(call, calls: int, concurrency: int) -> list[float]:
+    latencies_ms: list[float] = []
+    next_index = iter(range(calls))
+
+    async def worker() -> None:
+        for i in next_index:
+            t0 = time.perf_counter()
+            await call(i)
+            latencies_ms.append((time.perf_counter() - t0) * 1000)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies_ms
+
+
+def _summary(backend: str, hedging: bool, latencies_ms: list[float], hedger, backend_calls: int) -> dict:
+    return {
+        "backend": backend,
+        "hedging": hedging,
+        "p50_ms": round(_percentile(latencies_ms, 50), 2),
+        "p95_ms": round(_percentile(latencies_ms, 95), 2),
+        "p99_ms": round(_percentile(latencies_ms, 99), 2),
+        "hedge_rate": round(hedger.hedged / max(1, len(latencies_ms)), 4),
+        "hedge_wins": hedger.hedge_wins,
+        "backend_calls": backend_calls,
+    }
+
+
+async def run(calls: int, concurrency: int, latency_args: dict, policy_dir: Path) -> list[dict]:
+    results = []
+    for hedging in (False, True):
+        policy = _policy(policy_dir, hedging, concurrency)
+
+        memory_service = HeavyTailMemoryService(HeavyTailLatency(**latency_args))
+        memory_gw = LongTermMemoryGateway(service=memory_service, policy_path=policy)
+        latencies = await _drive(
+            lambda i, gw=memory_gw: gw.search_customer_insights(f"Sessao: hedge-{i}"), calls, concurrency
+        )
+        results.append(_summary("memory", hedging, latencies, memory_gw.hedger, memory_service.calls))
+
+        session_service = HeavyTailSessionService(HeavyTailLatency(**latency_args))
+        session_gw = NegotiationSessionGateway(service=session_service, policy_path=policy)
+        for i in range(concurrency):
+            await session_gw.recover_or_create(f"hedge-{i}", "premium")
+        reads_before = session_service.reads
+        latencies = await _drive(
+            lambda i, gw=session_gw: gw.recover_or_create(f"hedge-{i % concurrency}", "premium"), calls, concurrency
+        )
+        reads = session_service.reads - reads_before
+        results.append(_summary("session", hedging, latencies, session_gw.hedger, reads))
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--base-ms", type=float, default=10.0)
+    parser.add_argument("--tail-prob", type=float, default=0.03)
+    parser.add_argument("--tail-ms", type=float, default=100.0)
+    args = parser.parse_args()
+
+    latency_args = {"base_ms": args.base_ms, "tail_prob": args.tail_prob, "tail_ms": args.tail_ms}
+    with tempfile.TemporaryDirectory() as tmp:
+        results = asyncio.run(run(args.calls, args.concurrency, latency_args, Path(tmp)))
+    print(json.dumps(results, indent=2))
+    for backend in ("memory", "session"):
+        plain, hedged = (r for r in results if r["backend"] == backend)
+        if plain["p99_ms"]:
+            change = (hedged["p99_ms"] - plain["p99_ms"]) / plain["p99_ms"] * 100
+            print(f"{backend}: p99 {plain['p99_ms']} ms -> {hedged['p99_ms']} ms ({change:+.1f}%)")
+
+
+if __name__ == "__main__":
+    main()
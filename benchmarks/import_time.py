@@ -0,0 +1,85 @@
+"""
+Benchmark de cold start: tempo de import dos módulos de entrada medido com `python -X importtime`.
+
+Cada módulo é importado num subprocesso novo (sem cache de módulos) e o relatório traz o tempo
+cumulativo, os maiores ofensores por tempo próprio e se algum SDK pesado foi carregado no import.
+O orçamento é relativo ao import de `REFERENCE_MODULE` medido na mesma máquina, para não depender
+da velocidade do runner; ele é verificado na suíte (tests/test_cold_start.py).
+
+Uso:
+    python -m benchmarks.import_time
+    python -m benchmarks.import_time --module src.agent_router --top 15
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+# SDK cujo import o warm-up adia para background; serve de referência de velocidade da máquina.
+REFERENCE_MODULE = "google.adk"
+
+# Fração máxima do import da referência que um módulo de entrada pode custar. Medido em ~0,11
+# (~300 ms contra ~2,6 s); a folga absorve o ruído de runners compartilhados, e o import eager do
+# SDK leva a razão para acima de 1.
+COLD_START_IMPORT_BUDGET_RATIO = 0.5
+
+ENTRY_MODULES = ("src.main", "src.agent_router", "src.batch_runner")
+
+# SDKs (e o serving multi-processo) que não podem ser carregados no import dos módulos de entrada
+HEAVY_MODULES = ("google.adk", "google.genai", "tiktoken", "vertexai", "src.worker_pool")
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+
+def measure(module: str, top: int = 10) -> dict:
+    """Importa `module` num processo novo com -X importtime e resume a saída."""
+    code = f"import sys, json; import {module}; print(json.dumps(sorted(sys.modules)))"
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=REPO_ROOT,
+    )
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = (part.strip() for part in line[len("import time:") :].split("|"))
+        rows.append((name, int(self_us), int(cumulative_us)))
+    loaded = json.loads(proc.stdout.strip().splitlines()[-1])
+    cumulative = next((c for name, _, c in reversed(rows) if name == module), 0)
+    return {
+        "module": module,
+        "import_ms": round(cumulative / 1000, 1),
+        "heavy_modules_loaded": sorted({m for m in loaded for h in HEAVY_MODULES if m == h or m.startswith(h + ".")}),
+        "top_self_ms": [
+            {"module": name, "self_ms": round(self_us / 1000, 2)}
+            for name, self_us, _ in sorted(rows, key=lambda r: r[1], reverse=True)[:top]
+        ],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", action="append", help=f"padrão: {', '.join(ENTRY_MODULES)}")
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+    results = [measure(module, args.top) for module in (args.module or ENTRY_MODULES)]
+    try:
+        reference_ms = measure(REFERENCE_MODULE, 0)["import_ms"]
+    except subprocess.CalledProcessError:
+        reference_ms = None  # SDK não instalado: só o relatório absoluto
+    report = {
+        "reference_module": REFERENCE_MODULE,
+        "reference_ms": reference_ms,
+        "budget_ratio": COLD_START_IMPORT_BUDGET_RATIO,
+        "results": results,
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
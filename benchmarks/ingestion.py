@@ -0,0 +1,86 @@
+"""
+Benchmark: vazão da ingestão write-behind (src/ingestion.py) contra o banco de memória fake.
+
+Cria `--sessions` sessões encerradas (human_handoff) no Session Service em memória, enfileira todas
+no IngestionQueue e mede o tempo até a fila drenar, para cada `--batch-size`. O FakeMemoryService
+cobra `--ingest-ms` por lote (um round trip), então lotes maiores amortizam a latência do backend.
+Também reporta o tempo de `enqueue`, que é o custo visto pelo turno.
+
+Uso:
+    python -m benchmarks.ingestion --sessions 2000 --batch-size 1 --batch-size 20 --batch-size 100
+"""
+
+import argparse
+import asyncio
+import json
+import tempfile
+import time
+from pathlib import Path
+
+import yaml
+from src.ingestion import IngestionQueue, IngestionSettings
+from src.memory_gateway import LongTermMemoryGateway
+from src.session_gateway import NegotiationSessionGateway
+
+from benchmarks._support import FakeMemoryService
+
+
+async def _seed(session_gw: NegotiationSessionGateway, sessions: int) -> list[str]:
+    ids = [f"encerrada-{i}" for i in range(sessions)]
+    for session_id in ids:
+        session, state = await session_gw.recover_or_create(session_id, "standard")
+        state.funnel_stage = "human_handoff"
+        await session_gw.save_checkpoint(session, state)
+    return ids
+
+
+async def run(sessions: int, batch_sizes: list[int], ingest_ms: float, policy_dir: Path) -> list[dict]:
+    policy = policy_dir / "policy.yaml"
+    policy.write_text(yaml.safe_dump({"vector_search": {"cache_ttl_seconds": 0}}), encoding="utf-8")
+    session_gw = NegotiationSessionGateway(project_id="", location="", policy_path=policy)
+    ids = await _seed(session_gw, sessions)
+
+    results = []
+    for batch_size in batch_sizes:
+        service = FakeMemoryService(ingest_latency_s=ingest_ms / 1000)
+        memory_gw = LongTermMemoryGateway(service=service, policy_path=policy)
+        settings = IngestionSettings(
+            enabled=True, queue_max_size=sessions, batch_size=batch_size, batch_interval_s=0.05
+        )
+        queue = IngestionQueue(session_gw.get_session, memory_gw.ingest_sessions, settings)
+
+        t0 = time.perf_counter()
+        for session_id in ids:
+            queue.enqueue(session_id)
+        enqueue_s = time.perf_counter() - t0
+        await queue.close()
+        elapsed = time.perf_counter() - t0
+
+        results.append(
+            {
+                "batch_size": batch_size,
+                "sessions": sessions,
+                "ingested": len(service.ingested_sessions),
+                "batches": service.ingest_batches,
+                "elapsed_s": round(elapsed, 3),
+                "sessions_per_s": round(len(service.ingested_sessions) / elapsed, 1) if elapsed else 0.0,
+                "enqueue_us_per_session": round(enqueue_s / sessions * 1e6, 2),
+            }
+        )
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, action="append", default=[])
+    parser.add_argument("--ingest-ms", type=float, default=20.0, help="latência do backend por lote")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        results = asyncio.run(run(args.sessions, args.batch_size or [1, 20, 100], args.ingest_ms, Path(tmp)))
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""
+Benchmark: custo de lookup, listagem por cliente e varredura de TTL no keyspace de sessões (SQLite).
+
+Compara dois layouts com as mesmas `--sessions` sessões (`--per-customer` por cliente, uma fração
+`--expired` já vencida):
+
+- legacy: todas as sessões sob o usuário "default" num único arquivo (o layout anterior ao
+  particionamento). Listar as sessões de um cliente exige ler o keyspace inteiro e filtrar.
+- partitioned: `user_id` = cliente e `--shards` app_names (ConsistentHashSharding), um arquivo
+  SQLite por shard (`{shard}` no sqlite_path).
+
+As sessões são carregadas direto em SQL (um milhão de create_session levaria minutos); lookups e
+listagens passam pelo NegotiationSessionGateway. A varredura reporta o tempo total e o maior
+`purge_expired` isolado, que é o tempo em que o lock de escrita do arquivo fica preso.
+
+Uso:
+    python -m benchmarks.session_keyspace --sessions 1000000 --shards 8
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import tempfile
+import time
+from collections.abc import Iterator
+from pathlib import Path
+
+import yaml
+from src.session_gateway import NegotiationSessionGateway
+from src.session_sharding import DEFAULT_USER_ID
+
+from benchmarks.agent_e2e import _percentile
+
+SEED_CHUNK = 50_000
+STATE_JSON = json.dumps({"funnel_stage": "rate_proposed", "customer_tier": "standard", "version": 1})
+
+
+def _gateway(directory: Path, layout: str, shards: int) -> NegotiationSessionGateway:
+    policy = directory / f"{layout}.yaml"
+    sqlite_path = directory / ("legacy.db" if layout == "legacy" else "partitioned-{shard}.db")
+    session = {"sqlite_path": str(sqlite_path), "shards": 1 if layout == "legacy" else shards}
+    # Sem varredura disparada pelas escritas: o benchmark mede purge_expired explicitamente.
+    session |= {"ttl_hours": 48, "sqlite_sweep_interval_s": 1e9, "sqlite_pool_size": 8}
+    policy.write_text(yaml.safe_dump({"session": session}), encoding="utf-8")
+    return NegotiationSessionGateway(project_id="", location="", policy_path=policy)
+
+
+def _key(layout: str, customer: int, n: int) -> tuple[str, str]:
+    """(user_id, session_id) da n-ésima sessão do cliente em cada layout."""
+    session_id = f"cliente-{customer}-s{n}"
+    return (DEFAULT_USER_ID if layout == "legacy" else f"cliente-{customer}"), session_id
+
+
+def _rows(layout: str, customers: int, per_customer: int, expired: float, now: float) -> Iterator[tuple]:
+    rng = random.Random(11)
+    for customer in range(customers):
+        for n in range(per_customer):
+            user_id, session_id = _key(layout, customer, n)
+            expires_at = now - 1 if rng.random() < expired else now + 48 * 3600
+            yield user_id, session_id, STATE_JSON, 1, now, expires_at
+
+
+def _seed(gw: NegotiationSessionGateway, layout: str, customers: int, per_customer: int, expired: float) -> None:
+    now = time.time()
+    batches: dict[int, list[tuple]] = {}
+
+    def flush(index: int) -> None:
+        service = gw.services[index]
+        with service._write_transaction() as conn:
+            conn.executemany(
+                "INSERT INTO sessions (app_name, user_id, id, state, version, update_time, expires_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                batches.pop(index),
+            )
+
+    for user_id, *rest in _rows(layout, customers, per_customer, expired, now):
+        shard = gw.shard_for(user_id)
+        batch = batches.setdefault(shard.index, [])
+        batch.append((shard.app_name, user_id, *rest))
+        if len(batch) >= SEED_CHUNK:
+            flush(shard.index)
+    for index in list(batches):
+        flush(index)
+
+
+async def _timed(coro) -> float:
+    start = time.perf_counter()
+    await coro
+    return time.perf_counter() - start
+
+
+async def _list_customer(gw: NegotiationSessionGateway, layout: str, customer: int) -> list:
+    if layout == "legacy":
+        # Sem user_id por cliente: lê todas as sessões e filtra pelo prefixo do id.
+        sessions = await gw.list_customer_sessions(DEFAULT_USER_ID)
+        return [s for s in sessions if s.id.startswith(f"cliente-{customer}-")]
+    return await gw.list_customer_sessions(f"cliente-{customer}")
+
+
+async def _measure(gw: NegotiationSessionGateway, layout: str, args: dict) -> dict:
+    customers, per_customer = args["customers"], args["per_customer"]
+    rng = random.Random(5)
+    lookups = []
+    for _ in range(args["lookups"]):
+        user_id, session_id = _key(layout, rng.randrange(customers), rng.randrange(per_customer))
+        lookups.append(await _timed(gw.get_session(session_id, user_id=user_id)))
+    listings = [await _timed(_list_customer(gw, layout, rng.randrange(customers))) for _ in range(args["list_samples"])]
+    sweeps, purged = [], 0
+    for service in gw.services:
+        start = time.perf_counter()
+        purged += await asyncio.to_thread(service.purge_expired)
+        sweeps.append(time.perf_counter() - start)
+    return {
+        "layout": layout,
+        "sessions": customers * per_customer,
+        "files": len(gw.services),
+        "lookup_p50_us": round(_percentile(lookups, 50) * 1e6, 1),
+        "lookup_p99_us": round(_percentile(lookups, 99) * 1e6, 1),
+        "list_customer_ms": round(_percentile(listings, 50) * 1000, 3),
+        "sweep_total_ms": round(sum(sweeps) * 1000, 1),
+        "sweep_max_lock_ms": round(max(sweeps) * 1000, 1),
+        "purged": purged,
+    }
+
+
+async def run(
+    sessions: int,
+    per_customer: int,
+    shards: int,
+    expired: float,
+    directory: Path,
+    *,
+    lookups: int = 2000,
+    list_samples: int = 3,
+) -> list[dict]:
+    customers = max(1, sessions // per_customer)
+    args = {"customers": customers, "per_customer": per_customer, "lookups": lookups, "list_samples": list_samples}
+    results = []
+    for layout in ("legacy", "partitioned"):
+        gw = _gateway(directory, layout, shards)
+        seed_start = time.perf_counter()
+        await asyncio.to_thread(_seed, gw, layout, customers, per_customer, expired)
+        seed_s = time.perf_counter() - seed_start
+        result = await _measure(gw, layout, args)
+        result["seed_s"] = round(seed_s, 1)
+        for service in gw.services:
+            service.close()
+        results.append(result)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=1_000_000)
+    parser.add_argument("--per-customer", type=int, default=4, help="sessões por cliente")
+    parser.add_argument("--shards", type=int, default=8)
+    parser.add_argument("--expired", type=float, default=0.1, help="fração das sessões já vencida")
+    parser.add_argument("--lookups", type=int, default=2000)
+    parser.add_argument("--list-samples", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        results = asyncio.run(
+            run(
+                args.sessions,
+                args.per_customer,
+                args.shards,
+                args.expired,
+                Path(tmp),
+                lookups=args.lookups,
+                list_samples=args.list_samples,
+            )
+        )
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
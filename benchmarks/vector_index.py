@@ -0,0 +1,105 @@
+"""
+Benchmark do índice vetorial local (LocalVectorIndex) em um único core.
+
+Gera N vetores aleatórios normalizados e mede a latência de search_vector (top-k + score mínimo).
+Com --mmap a matriz é salva em disco e carregada via memory map antes das consultas. Com
+--partitions o índice é particionado (IVF) e cada busca varre só --probes partições.
+
+Uso:
+    python -m benchmarks.vector_index --vectors 1000000 --dim 64 --queries 200
+    python -m benchmarks.vector_index --vectors 1000000 --partitions 1024 --probes 32
+"""
+
+import os
+
+# Single core: fixa o BLAS em uma thread antes de importar o NumPy.
+for _var in ("OPENBLAS_NUM_THREADS", "OMP_NUM_THREADS", "MKL_NUM_THREADS"):
+    os.environ.setdefault(_var, "1")
+
+import argparse  # noqa: E402
+import json  # noqa: E402
+import tempfile  # noqa: E402
+import time  # noqa: E402
+
+import numpy as np  # noqa: E402
+from src.vector_index import LocalVectorIndex  # noqa: E402
+
+
+def _percentile(samples: list[float], pct: float) -> float:
+    return float(np.percentile(np.asarray(samples), pct))
+
+
+def run(
+    vectors: int,
+    dim: int,
+    queries: int,
+    top_k: int,
+    min_score: float,
+    mmap: bool,
+    partitions: int = 0,
+    probes: int = 32,
+) -> dict:
+    rng = np.random.default_rng(7)
+    start = time.perf_counter()
+    embeddings = rng.standard_normal((vectors, dim), dtype=np.float32)
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+    documents = [f"insight-{i}" for i in range(vectors)]
+    index = LocalVectorIndex(embeddings, documents, partitions=partitions, probes=probes)
+    build_s = time.perf_counter() - start
+
+    tmp = None
+    if mmap:
+        tmp = tempfile.TemporaryDirectory()
+        index.save(tmp.name)
+        index = LocalVectorIndex.load(tmp.name, mmap=True, probes=probes)
+
+    # Consultas próximas de vetores existentes (garante candidatos acima do score mínimo).
+    targets = rng.integers(0, vectors, size=queries)
+    noise = rng.standard_normal((queries, dim), dtype=np.float32) * 0.05
+    query_vecs = embeddings[targets] + noise
+    query_vecs /= np.linalg.norm(query_vecs, axis=1, keepdims=True)
+
+    index.search_vector(query_vecs[0], top_k=top_k, min_score=min_score)  # warm-up (page cache / buffers)
+    latencies_ms = []
+    recall_hits = 0
+    for target, q in zip(targets, query_vecs, strict=True):
+        t0 = time.perf_counter()
+        hits = index.search_vector(q, top_k=top_k, min_score=min_score)
+        latencies_ms.append((time.perf_counter() - t0) * 1000)
+        recall_hits += bool(hits) and hits[0].content == f"insight-{target}"
+
+    if tmp is not None:
+        tmp.cleanup()
+    return {
+        "vectors": vectors,
+        "dim": dim,
+        "mmap": mmap,
+        "partitions": partitions,
+        "probes": probes if partitions else None,
+        "build_s": round(build_s, 3),
+        "p50_ms": round(_percentile(latencies_ms, 50), 3),
+        "p95_ms": round(_percentile(latencies_ms, 95), 3),
+        "p99_ms": round(_percentile(latencies_ms, 99), 3),
+        "recall_at_1": round(recall_hits / queries, 4),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", type=int, default=1_000_000)
+    parser.add_argument("--dim", type=int, default=64)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--min-score", type=float, default=0.70)
+    parser.add_argument("--mmap", action="store_true")
+    parser.add_argument("--partitions", type=int, default=0, help="partições IVF (0 = scan exato)")
+    parser.add_argument("--probes", type=int, default=32, help="partições varridas por busca")
+    args = parser.parse_args()
+    result = run(
+        args.vectors, args.dim, args.queries, args.top_k, args.min_score, args.mmap, args.partitions, args.probes
+    )
+    print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
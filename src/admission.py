@@ -0,0 +1,198 @@
+"""
+Controle de sobrecarga: executors limitados por backend e admissão de turnos no agente.
+
+Sem limites, o trabalho bloqueante de todos os Gateways divide o executor padrão do event loop (um
+Session Service lento ocupa as threads da busca vetorial e vice-versa) e as filas crescem sem
+teto num pico de tráfego, até todos os turnos estourarem o deadline juntos. Aqui:
+
+- `BoundedExecutor`: pool de threads próprio por backend (`<seção>.executor.max_workers`) com
+  limite de trabalho enfileirado (`max_queue`). Acima do limite a chamada falha na hora com
+  OverloadedError, sem ocupar fila.
+- `AdmissionController`: limita os turnos em voo no StatefulFinanceAgent (seção `admission`);
+  excedentes esperam numa fila curta (`max_queued_turns`, até `queue_timeout_s`) e, além dela, são
+  rejeitados na hora. O cliente recebe um erro rápido em vez de um timeout.
+
+Profundidade de fila e rejeições vão para a `instrumentation` (gauges e contadores).
+"""
+
+import asyncio
+import contextvars
+import functools
+import threading
+from collections import deque
+from collections.abc import AsyncIterator, Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, TypeVar
+
+from src.exceptions import OverloadedError
+from src.instrumentation import (
+    ADMISSION_IN_FLIGHT,
+    ADMISSION_QUEUE_DEPTH,
+    ADMISSION_REJECTED_TOTAL,
+    EXECUTOR_QUEUE_DEPTH,
+    EXECUTOR_REJECTED_TOTAL,
+    Instrumentation,
+)
+from src.policy import policy_section
+
+T = TypeVar("T")
+
+
+@dataclass(frozen=True)
+class ExecutorSettings:
+    """Tamanho do pool e da fila de um backend (subseção `executor` da seção do backend)."""
+
+    max_workers: int = 16
+    max_queue: int = 1024
+
+    @classmethod
+    def from_policy(cls, section: str, config_path: Path | str | None = None) -> "ExecutorSettings":
+        policy = policy_section(section, config_path).get("executor") or {}
+        return cls(**{k: v for k, v in policy.items() if k in cls.__dataclass_fields__})
+
+
+class BoundedExecutor:
+    """
+    Substituto de asyncio.to_thread com pool dedicado e fila limitada. `pending` conta chamadas
+    em execução + enfileiradas e só é liberado quando a thread termina (um chamador cancelado,
+    como a cópia perdedora de um hedge, continua ocupando a vaga até o fim).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        settings: ExecutorSettings | None = None,
+        *,
+        instrumentation: Instrumentation | None = None,
+    ):
+        self.name = name
+        self.settings = settings or ExecutorSettings()
+        self.instrumentation = instrumentation or Instrumentation()
+        self.pending = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=self.settings.max_workers, thread_name_prefix=f"{name}-io")
+
+    @property
+    def capacity(self) -> int:
+        return self.settings.max_workers + self.settings.max_queue
+
+    @property
+    def queue_depth(self) -> int:
+        return max(0, self.pending - self.settings.max_workers)
+
+    def _publish(self) -> None:
+        self.instrumentation.set_gauge(EXECUTOR_QUEUE_DEPTH, self.queue_depth, executor=self.name)
+
+    def _release(self, _future: Future) -> None:
+        with self._lock:
+            self.pending -= 1
+        self._publish()
+
+    async def run(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Executa `fn(*args, **kwargs)` no pool (propagando contextvars, como asyncio.to_thread)."""
+        with self._lock:
+            admitted = self.pending < self.capacity
+            if admitted:
+                self.pending += 1
+            else:
+                self.rejected += 1
+        if not admitted:
+            self.instrumentation.increment(EXECUTOR_REJECTED_TOTAL, executor=self.name)
+            raise OverloadedError(f"Executor {self.name} cheio ({self.capacity} chamadas pendentes)")
+        self._publish()
+        call = functools.partial(contextvars.copy_context().run, fn, *args, **kwargs)
+        future = self._pool.submit(call)
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._pool.shutdown(wait=wait, cancel_futures=True)
+
+
+@dataclass(frozen=True)
+class AdmissionSettings:
+    """Limites de turnos concorrentes do agente (seção `admission` do memory_policy.yaml)."""
+
+    enabled: bool = False
+    max_in_flight_turns: int = 256
+    max_queued_turns: int = 256
+    queue_timeout_s: float = 0.5
+
+    @classmethod
+    def from_policy(cls, config_path: Path | str | None = None) -> "AdmissionSettings":
+        section = policy_section("admission", config_path)
+        return cls(**{k: v for k, v in section.items() if k in cls.__dataclass_fields__})
+
+
+class AdmissionController:
+    """
+    Semáforo de turnos com fila limitada e timeout. `admit()` é um async context manager: dentro
+    dele o turno ocupa uma vaga; sem vaga, espera na fila (FIFO) até `queue_timeout_s`, e com a fila
+    cheia ou no timeout levanta OverloadedError. Não se prende a um event loop (cada espera cria
+    sua future no loop corrente).
+    """
+
+    def __init__(self, settings: AdmissionSettings | None = None, *, instrumentation: Instrumentation | None = None):
+        self.settings = settings or AdmissionSettings()
+        self.instrumentation = instrumentation or Instrumentation()
+        self.in_flight = 0
+        self.rejected = 0
+        self._waiters: deque[asyncio.Future] = deque()
+
+    def _publish(self) -> None:
+        self.instrumentation.set_gauge(ADMISSION_IN_FLIGHT, self.in_flight)
+        self.instrumentation.set_gauge(ADMISSION_QUEUE_DEPTH, len(self._waiters))
+
+    def _reject(self, reason: str) -> OverloadedError:
+        self.rejected += 1
+        self.instrumentation.increment(ADMISSION_REJECTED_TOTAL, reason=reason)
+        return OverloadedError(f"Turno rejeitado pelo controle de admissão ({reason})")
+
+    async def _acquire(self) -> None:
+        if self.in_flight < self.settings.max_in_flight_turns and not self._waiters:
+            self.in_flight += 1
+            self._publish()
+            return
+        if len(self._waiters) >= self.settings.max_queued_turns:
+            raise self._reject("queue_full")
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self._publish()
+        try:
+            # A vaga é transferida por _release (in_flight não muda ao passar de um turno ao próximo).
+            await asyncio.wait_for(waiter, self.settings.queue_timeout_s)
+        except BaseException as e:
+            # O timeout pode disputar com _release (3.12+): a vaga já entregue é devolvida.
+            if waiter.done() and not waiter.cancelled():
+                self._release()
+            if isinstance(e, TimeoutError):
+                raise self._reject("timeout") from None
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+            self._publish()
+
+    def _release(self) -> None:
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+        self._publish()
+
+    @asynccontextmanager
+    async def admit(self) -> AsyncIterator[None]:
+        if not self.settings.enabled:
+            yield
+            return
+        await self._acquire()
+        try:
+            yield
+        finally:
+            self._release()
@@ -1,28 +1,75 @@
+import asyncio
+import contextvars
 import logging
+import math
+import threading
+import time
+import uuid
+from collections.abc import AsyncIterator
+from contextvars import ContextVar
 from pathlib import Path
+from typing import TYPE_CHECKING, Any
 
-import jinja2
-import yaml
-from google.adk import Agent as LlmAgent
-from google.adk.runners import Runner
-from google.genai import types
-
+from src.admission import AdmissionController, AdmissionSettings
+from src.context_packer import ContextPacker, ScoredInsight
+from src.deadline import BudgetSettings, TurnBudget
+from src.exceptions import DeadlineExceededError
+from src.ingestion import IngestionQueue, IngestionSettings
+from src.instrumentation import (
+    DEADLINE_EXCEEDED_TOTAL,
+    INSIGHT_TOKENS_TRIMMED_TOTAL,
+    RESPONSE_CACHE_TOTAL,
+    STAGE_SECONDS,
+    STAGES_SHED_TOTAL,
+    Instrumentation,
+)
 from src.memory_gateway import LongTermMemoryGateway
-from src.session_gateway import APP_NAME, USER_ID, NegotiationSessionGateway
+from src.policy import policy_section
+from src.prompts import shared_prompt_registry
+from src.response_cache import ResponseCache, response_key
+from src.session_gateway import NegotiationSessionGateway
+from src.session_sharding import DEFAULT_USER_ID, SessionKey, SessionShard
+from src.telemetry import FinOpsTelemetry
+
+if TYPE_CHECKING:
+    from google.genai import types
 
 logger = logging.getLogger(__name__)
 
-# Caminho padrão da política (relativo ao CWD do processo)
-DEFAULT_POLICY_PATH = Path("config/memory_policy.yaml")
+BASE_INSTRUCTION = "Voce e um negociador de financiamentos. O contexto sera dinamicamente injetado."
+
+HANDOFF_MESSAGE = "[SYSTEM] Negociação encerrada pelo agente. Aguarde a transferência para um especialista."
+
+# System prompt renderizado do turno corrente. O runner de cada turno roda numa task com contexto
+# próprio, então só ele enxerga o seu valor: o LlmAgent é compartilhado entre sessões, mas a
+# instrução viaja com a invocação.
+_TURN_INSTRUCTION: ContextVar[str] = ContextVar("turn_instruction", default=BASE_INSTRUCTION)
+
+# Estágios do funil em que a Long-Term Memory é injetada no prompt
+MEMORY_STAGES = ("rate_proposed", "analyzing_credit")
+
+_STREAM_END = object()
+
+
+def _turn_instruction_provider(_ctx: Any) -> str:
+    """InstructionProvider do ADK: devolve o prompt do turno em execução no contexto atual."""
+    return _TURN_INSTRUCTION.get()
 
 
 def _load_max_rejections(config_path: Path | None = None) -> int:
-    path = config_path or DEFAULT_POLICY_PATH
-    if not path.exists():
-        return 3
-    with open(path, encoding="utf-8") as f:
-        data = yaml.safe_load(f) or {}
-    return (data.get("session") or {}).get("max_rejections", 3)
+    return policy_section("session", config_path).get("max_rejections", 3)
+
+
+def _event_text(event: Any) -> str:
+    if not (event.content and event.content.parts):
+        return ""
+    return "".join(part.text for part in event.content.parts if getattr(part, "text", None))
+
+
+def _conversation_history(session: Any) -> list[str]:
+    """Turnos anteriores (autor e texto) que o modelo veria; entram na chave do cache de respostas."""
+    events = getattr(session, "events", None) or []
+    return [f"{event.author}: {_event_text(event)}" for event in events if event.content]
 
 
 class StatefulFinanceAgent:
@@ -30,6 +77,8 @@ class StatefulFinanceAgent:
     Agente Mestre orquestrador de memória.
     Integra LlmAgent do Google ADK com os Gateways de curto e longo prazo.
     Dependências injetadas (IoC) para testes e substituição de infraestrutura.
+    O LlmAgent é compartilhado entre sessões (o system prompt de cada turno vai por ContextVar);
+    as etapas do turno estão descritas em `_stream_turn`.
     """
 
     def __init__(
@@ -38,73 +87,368 @@ class StatefulFinanceAgent:
         memory_gw: LongTermMemoryGateway,
         *,
         policy_path: Path | None = None,
+        model: Any = "gemini-2.0-flash",
+        telemetry: FinOpsTelemetry | None = None,
+        instrumentation: Instrumentation | None = None,
+        packer: ContextPacker | None = None,
+        response_cache: ResponseCache | None = None,
+        ingestion: IngestionQueue | None = None,
+        admission: AdmissionController | None = None,
     ):
         self.session_gw = session_gw
         self.memory_gw = memory_gw
+        self.telemetry = telemetry
+        self.instrumentation = instrumentation or Instrumentation()
         self._max_rejections = _load_max_rejections(policy_path)
-
-        self.jinja_env = jinja2.Environment(loader=jinja2.FileSystemLoader("prompts"))
-        self.negotiator_template = self.jinja_env.get_template("negotiator.jinja2")
-        self.injector_template = self.jinja_env.get_template("context_injector.jinja2")
-
-        self.llm_agent = LlmAgent(
-            name="StatefulAutoFinanceNegotiator",
-            model="gemini-2.0-flash",
-            instruction="Voce e um negociador de financiamentos. O contexto sera dinamicamente injetado.",
+        self.speculative_prefetch = bool(policy_section("vector_search", policy_path).get("speculative_prefetch"))
+        self.budget_settings = BudgetSettings.from_policy(policy_path)
+        # Com telemetria, os insights são contados com o mesmo tokenizer do relatório de FinOps.
+        self.packer = packer or ContextPacker.from_policy(
+            policy_path, count_tokens=telemetry.count_tokens if telemetry else None
         )
-        self.runner = Runner(
-            app_name=APP_NAME,
-            agent=self.llm_agent,
-            session_service=self.session_gw.service,
+
+        self.response_cache = response_cache or ResponseCache.from_policy(policy_path)
+        ingestion_settings = IngestionSettings.from_policy(policy_path)
+        if ingestion is None and ingestion_settings.enabled:
+            ingestion = IngestionQueue(
+                self._load_ingested_session,
+                memory_gw.ingest_sessions,
+                ingestion_settings,
+                instrumentation=self.instrumentation,
+            )
+        self.ingestion = ingestion
+        self.admission = admission or AdmissionController(
+            AdmissionSettings.from_policy(policy_path), instrumentation=self.instrumentation
         )
 
-    async def process_message(
+        # Templates compilados uma vez por processo; o system prompt é memoizado pelo estado da FSM.
+        self.prompts = shared_prompt_registry(policy_path)
+        # Parte estática do injector (sem mensagem nem insights): contada uma vez pelo cache da telemetria.
+        self._injector_frame = self.prompts.render("context_injector.jinja2", base_prompt="", long_term_insights="")
+
+        self.model = model
+        self._runners: dict[int, Any] = {}
+        self._runner_lock = threading.Lock()
+
+    def _build_runner(self, shard: SessionShard | None = None) -> Any:
+        shard = shard or self.session_gw.sharding.shards[0]
+        with self._runner_lock:
+            if shard.index not in self._runners:
+                from google.adk import Agent as LlmAgent
+                from google.adk.agents.run_config import RunConfig, StreamingMode
+                from google.adk.runners import Runner
+
+                if not self._runners:
+                    self.llm_agent = LlmAgent(
+                        name="StatefulAutoFinanceNegotiator",
+                        model=self.model,
+                        instruction=_turn_instruction_provider,
+                    )
+                    self.run_config = RunConfig(streaming_mode=StreamingMode.SSE)
+                # O Runner lê e grava a sessão pelo seu app_name: um por shard.
+                self._runners[shard.index] = Runner(
+                    app_name=shard.app_name,
+                    agent=self.llm_agent,
+                    session_service=self.session_gw.service_for(shard),
+                )
+            return self._runners[shard.index]
+
+    @property
+    def _runner(self) -> Any | None:
+        return self._runners.get(self.session_gw.sharding.shards[0].index)
+
+    @property
+    def runner(self) -> Any:
+        """Runner do ADK do primeiro shard, criado sob demanda (import do SDK fora do caminho de import do módulo)."""
+        return self._runner if self._runner is not None else self._build_runner()
+
+    def runner_for(self, user_id: str) -> Any:
+        """
+        Runner do shard do cliente. Cada shard do Session Gateway (app_name próprio) tem o seu
+        Runner, criado sob demanda, todos compartilhando o mesmo LlmAgent.
+        """
+        shard = self.session_gw.shard_for(user_id)
+        runner = self._runners.get(shard.index)
+        return runner if runner is not None else self._build_runner(shard)
+
+    def warm_up(self) -> None:
+        """
+        Cria o runner e resolve o cliente do LLM antes do primeiro turno. Seguro para rodar numa
+        thread em background; falha ao criar o cliente (ex: sem credenciais) só é logada, e o
+        primeiro turno tenta de novo.
+        """
+        self._build_runner()
+        from google.genai import types  # noqa: F401
+
+        self.session_gw.warm_up()
+        try:
+            llm = self.llm_agent.canonical_model
+            getattr(llm, "api_client", None)
+        except Exception as e:
+            logger.warning("Warm-up do cliente LLM falhou; será criado no primeiro turno. Erro: %s", e)
+
+    async def close(self) -> None:
+        """Shutdown: drena a fila de ingestão (sessões encerradas ainda não gravadas na memória)."""
+        if self.ingestion is not None:
+            await self.ingestion.close()
+
+    async def _load_ingested_session(self, key: SessionKey) -> Any:
+        return await self.session_gw.get_session(key.session_id, user_id=key.user_id)
+
+    async def _run_llm(
+        self,
+        session_id: str,
+        user_id: str,
+        new_message: "types.Content",
+        system_prompt: str,
+        budget: TurnBudget,
+    ) -> AsyncIterator[Any]:
+        """
+        Executa o runner numa task com contexto próprio e repassa os eventos à medida que chegam.
+        Levanta DeadlineExceededError se o próximo evento não chegar na janela do LLM.
+        """
+        timeout = budget.time_for("llm")
+        if timeout <= 0:
+            raise DeadlineExceededError("Orçamento do turno esgotado antes do LLM")
+        loop_deadline = None if math.isinf(timeout) else asyncio.get_running_loop().time() + timeout
+        runner = self.runner_for(user_id)
+        queue: asyncio.Queue = asyncio.Queue()
+        context = contextvars.copy_context()
+        context.run(_TURN_INSTRUCTION.set, system_prompt)
+
+        async def pump() -> None:
+            try:
+                async for event in runner.run_async(
+                    user_id=user_id,
+                    session_id=session_id,
+                    new_message=new_message,
+                    run_config=self.run_config,
+                ):
+                    queue.put_nowait(event)
+            finally:
+                queue.put_nowait(_STREAM_END)
+
+        task = asyncio.create_task(pump(), context=context)
+        try:
+            while True:
+                try:
+                    async with asyncio.timeout_at(loop_deadline):
+                        event = await queue.get()
+                except TimeoutError:
+                    raise DeadlineExceededError(f"LLM excedeu {timeout * 1000:.0f} ms do orçamento do turno") from None
+                if event is _STREAM_END:
+                    break
+                yield event
+            await task  # propaga erro do runner/LLM
+        finally:
+            if not task.done():
+                task.cancel()
+
+    async def _timed_memory_search(self, query: str, budget: TurnBudget) -> tuple[tuple[ScoredInsight, ...], float]:
+        start = time.perf_counter()
+        insights = await self.memory_gw.search_insights(query=query, deadline=budget)
+        return insights, time.perf_counter() - start
+
+    def _discard_prefetch(self, prefetch: asyncio.Task | None) -> None:
+        """Descarta o prefetch; a busca em voo termina no cache do gateway (não é desperdiçada)."""
+        if prefetch is None:
+            return
+        prefetch.cancel()
+        if self.telemetry:
+            self.telemetry.record_prefetch(None)
+
+    def _record_shed(self, budget: TurnBudget) -> None:
+        for stage, reason in budget.shed:
+            self.instrumentation.increment(STAGES_SHED_TOTAL, stage=stage, reason=reason)
+            if self.telemetry:
+                self.telemetry.record_shed(stage)
+
+    async def stream_message(
         self,
         session_id: str,
         customer_message: str,
         customer_tier: str = "standard",
-    ) -> str:
-        """Fluxo orquestrado (async): injeta estado e memória vetorial no prompt."""
-        adk_session, state = await self.session_gw.recover_or_create(session_id, customer_tier)
+        *,
+        customer_id: str | None = None,
+        budget: TurnBudget | None = None,
+    ) -> AsyncIterator[str]:
+        """
+        Fluxo orquestrado em streaming: injeta estado e memória vetorial no prompt e produz os chunks.
+        O checkpoint é salvo após o último chunk; `budget` conta desde a chamada, incluindo a admissão.
+        """
+        budget = budget or TurnBudget(self.budget_settings)
+        key = SessionKey(customer_id or DEFAULT_USER_ID, session_id)
+        async with self.admission.admit(), self.session_gw.session_lock(session_id, key.user_id) as waited_s:
+            self.instrumentation.observe(STAGE_SECONDS, waited_s, stage="lock_wait")
+            try:
+                async for chunk in self._stream_turn(key, customer_message, customer_tier, budget):
+                    yield chunk
+            except DeadlineExceededError:
+                self.instrumentation.increment(DEADLINE_EXCEEDED_TOTAL)
+                raise
+            finally:
+                self._record_shed(budget)
+
+    async def _stream_turn(
+        self, key: SessionKey, customer_message: str, customer_tier: str, budget: TurnBudget
+    ) -> AsyncIterator[str]:
+        """
+        Etapas do turno (session_recover, memory_search, LLM, checkpoint_save), cada uma medida em
+        `turn_stage_seconds` e limitada pelo `budget`.
+        """
+        session_id = key.session_id
+        query = f"Sessao: {session_id}"
+        prefetch = asyncio.create_task(self._timed_memory_search(query, budget)) if self.speculative_prefetch else None
+        started = time.perf_counter()
+        try:
+            with self.instrumentation.span("session_recover"):
+                adk_session, state = await budget.run(
+                    "session_recover",
+                    self.session_gw.recover_or_create(session_id, customer_tier, user_id=key.user_id, deadline=budget),
+                )
+        except BaseException:
+            self._discard_prefetch(prefetch)
+            raise
+        recover_s = time.perf_counter() - started
 
         if state.funnel_stage == "human_handoff":
-            return "[SYSTEM] Negociação encerrada pelo agente. Aguarde a transferência para um especialista."
+            self._discard_prefetch(prefetch)
+            if self.telemetry:
+                self.telemetry.record_turn_without_llm()
+            yield HANDOFF_MESSAGE
+            return
 
-        system_prompt = self.negotiator_template.render(
-            funnel_stage=state.funnel_stage,
-            proposed_rate=state.proposed_rate,
-            rejection_count=state.rejection_count,
-            customer_tier=state.customer_tier,
-        )
-        self.llm_agent.instruction = system_prompt
+        with self.instrumentation.span("render"):
+            system_prompt = self.prompts.render(
+                "negotiator.jinja2",
+                funnel_stage=state.funnel_stage,
+                proposed_rate=state.proposed_rate,
+                rejection_count=state.rejection_count,
+                customer_tier=state.customer_tier,
+            )
 
         contextual_prompt = customer_message
-        if state.funnel_stage in ("rate_proposed", "analyzing_credit"):
-            insights = await self.memory_gw.search_customer_insights(query=f"Sessao: {session_id}")
+        injected_insights = ""
+        prompt_fragments = [system_prompt]
+        if state.funnel_stage in MEMORY_STAGES:
+            with self.instrumentation.span("memory_search"):
+                if prefetch is not None:
+                    prefetched = await budget.run_optional("memory_search", prefetch, None)
+                    if prefetched is None:
+                        insights = ()
+                        self._discard_prefetch(prefetch)
+                    else:
+                        insights, memory_s = prefetched
+                        # Economia = tempo sequencial (sessão + memória) - tempo real com as duas em paralelo
+                        if self.telemetry:
+                            self.telemetry.record_prefetch(recover_s + memory_s - (time.perf_counter() - started))
+                else:
+                    insights = await budget.run_optional(
+                        "memory_search", self.memory_gw.search_insights(query=query, deadline=budget), ()
+                    )
             if insights:
-                contextual_prompt = self.injector_template.render(
-                    base_prompt=customer_message,
-                    long_term_insights=insights,
-                )
+                # Contagem de tokens dos insights novos (tiktoken) no executor, como em record_turn.
+                packed = await asyncio.to_thread(self.packer.pack, insights)
+                self.instrumentation.increment(INSIGHT_TOKENS_TRIMMED_TOTAL, packed.trimmed_tokens)
+                if self.telemetry:
+                    self.telemetry.record_packing(packed.tokens, packed.trimmed_tokens)
+                if packed.text:
+                    # Mensagem e insights variam a cada turno: render direto, sem poluir o cache.
+                    contextual_prompt = self.prompts.get("context_injector.jinja2").render(
+                        base_prompt=customer_message,
+                        long_term_insights=packed.text,
+                    )
+                    prompt_fragments += [self._injector_frame, packed.text]
+                    injected_insights = packed.text
+        else:
+            self._discard_prefetch(prefetch)
+
+        from google.genai import types
 
         new_message = types.Content(
             role="user",
             parts=[types.Part(text=contextual_prompt)],
         )
-        response_text = ""
-        async for event in self.runner.run_async(
-            user_id=USER_ID,
-            session_id=session_id,
-            new_message=new_message,
-        ):
-            if event.content and event.content.parts:
-                for part in event.content.parts:
-                    if getattr(part, "text", None):
-                        response_text = part.text
 
+        cache_key = cached = None
+        if self.response_cache.cacheable(state.funnel_stage):
+            cache_key = response_key(
+                system_prompt, customer_message, injected_insights, _conversation_history(adk_session)
+            )
+            cached = await self.response_cache.get(cache_key)
+            self.instrumentation.increment(RESPONSE_CACHE_TOTAL, outcome="miss" if cached is None else "hit")
+            if self.telemetry:
+                self.telemetry.record_response_cache(cached is not None)
+
+        response: list[str] = []
+        if cached is not None:
+            await self._append_cached_turn(adk_session, new_message, cached)
+            response.append(cached)
+            yield cached
+        else:
+            # Em SSE o ADK emite chunks parciais e, no fim, um evento com o texto agregado: este
+            # último só é repassado se o modelo não tiver feito streaming.
+            # O tempo do LLM é medido fora de um span: o bloco contém yields (o consumidor não conta).
+            streamed = False
+            llm_s = 0.0
+            llm_started = time.perf_counter()
+            async for event in self._run_llm(session_id, key.user_id, new_message, system_prompt, budget):
+                text = _event_text(event)
+                if not text:
+                    continue
+                if event.partial:
+                    streamed = True
+                elif streamed:
+                    streamed = False
+                    continue
+                llm_s += time.perf_counter() - llm_started
+                if not response:
+                    self.instrumentation.observe(STAGE_SECONDS, llm_s, stage="llm_first_chunk")
+                response.append(text)
+                yield text
+                llm_started = time.perf_counter()
+            self.instrumentation.observe(STAGE_SECONDS, llm_s + time.perf_counter() - llm_started, stage="llm_stream")
+
+        stage_before = state.funnel_stage
         state.increment_rejection(max_rejections=self._max_rejections)
-        if state.funnel_stage == "human_handoff":
-            pass  # Handoff ja refletido no state
-        await self.session_gw.save_checkpoint(adk_session, state)
+        with self.instrumentation.span("checkpoint_save"):
+            await budget.run("checkpoint_save", self.session_gw.save_checkpoint(adk_session, state, deadline=budget))
+        if self.ingestion is not None:
+            stages = self.ingestion.settings.stages
+            if state.funnel_stage in stages and stage_before not in stages:
+                # Write-behind: o turno não espera a ingestão na Long-Term Memory.
+                self.ingestion.enqueue(key)
+        if cached is None:
+            # Só turnos completos (checkpoint salvo) entram no cache; um hit não gasta tokens do modelo.
+            if cache_key is not None:
+                await self.response_cache.put(cache_key, "".join(response))
+            if self.telemetry:
+                await self.telemetry.record_turn(prompt_fragments, customer_message, "".join(response))
+        elif self.telemetry:
+            self.telemetry.record_turn_without_llm()
+
+    async def _append_cached_turn(self, session: Any, new_message: "types.Content", response: str) -> None:
+        """Grava no histórico da sessão o par mensagem/resposta que o runner gravaria, sem chamar o modelo."""
+        from google.adk.events.event import Event
+        from google.genai import types
 
-        return response_text
+        invocation_id = f"e-{uuid.uuid4()}"
+        reply = types.Content(role="model", parts=[types.Part(text=response)])
+        for author, content in (("user", new_message), (self.runner_for(session.user_id).agent.name, reply)):
+            event = Event(invocation_id=invocation_id, author=author, content=content)
+            await self.session_gw.append_event(session, event)
+
+    async def process_message(
+        self,
+        session_id: str,
+        customer_message: str,
+        customer_tier: str = "standard",
+        *,
+        customer_id: str | None = None,
+        budget: TurnBudget | None = None,
+    ) -> str:
+        """Fluxo orquestrado (async): injeta estado e memória vetorial no prompt."""
+        stream = self.stream_message(
+            session_id, customer_message, customer_tier, customer_id=customer_id, budget=budget
+        )
+        return "".join([chunk async for chunk in stream])
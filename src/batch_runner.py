@@ -0,0 +1,234 @@
+"""
+Processamento em lote (replays offline e campanhas de reengajamento).
+
+Lê linhas (session_id, message, tier, customer_id opcional) de um iterável ou JSONL, executa os turnos com concorrência
+limitada e rate limit por backend, e grava cada resultado em JSONL assim que fica pronto: a memória
+fica estável independentemente do tamanho da campanha.
+
+Uso:
+    python -m src.batch_runner entrada.jsonl saida.jsonl --concurrency 64 --rate llm=20 --rate session=100
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import time
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+from typing import Any, TextIO
+
+from src.resilience import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+# Chamadas estimadas por turno em cada backend (recover_or_create + save_checkpoint na sessão).
+CALLS_PER_TURN = {"llm": 1.0, "session": 2.0, "memory": 1.0}
+
+
+@dataclass(frozen=True)
+class BatchRow:
+    index: int
+    session_id: str
+    message: str
+    tier: str = "standard"
+    customer_id: str | None = None
+
+
+@dataclass(frozen=True)
+class InvalidRow:
+    """Linha de entrada que não pôde ser lida: vira registro de erro na saída, sem abortar o lote."""
+
+    index: int
+    line_number: int
+    reason: str
+
+
+@dataclass
+class BatchSummary:
+    rows: int = 0
+    succeeded: int = 0
+    failed: int = 0
+    total_cost: float = 0.0
+    elapsed_s: float = 0.0
+
+
+def iter_jsonl_rows(lines: Iterable[str]) -> Iterator[BatchRow | InvalidRow]:
+    """
+    Converte linhas JSONL ({"session_id", "message", "tier"?, "customer_id"?}) em BatchRow, sob demanda.
+    Linhas malformadas (JSON inválido, campo obrigatório ausente) viram InvalidRow com o número da linha.
+    """
+    index = 0
+    for line_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            data = json.loads(line)
+            row: BatchRow | InvalidRow = BatchRow(
+                index=index,
+                session_id=data["session_id"],
+                message=data["message"],
+                tier=data.get("tier", "standard"),
+                customer_id=data.get("customer_id"),
+            )
+        except json.JSONDecodeError as e:
+            row = InvalidRow(index, line_number, f"JSON inválido: {e}")
+        except KeyError as e:
+            row = InvalidRow(index, line_number, f"campo obrigatório ausente: {e}")
+        except TypeError:
+            row = InvalidRow(index, line_number, "a linha não é um objeto JSON")
+        yield row
+        index += 1
+
+
+def _as_rows(rows: Iterable[BatchRow | InvalidRow | tuple | dict]) -> Iterator[BatchRow | InvalidRow]:
+    for index, row in enumerate(rows):
+        if isinstance(row, BatchRow | InvalidRow):
+            yield row
+        elif isinstance(row, dict):
+            yield BatchRow(
+                index, row["session_id"], row["message"], row.get("tier", "standard"), row.get("customer_id")
+            )
+        else:
+            yield BatchRow(index, *row)
+
+
+async def _turn_cost(telemetry: Any | None, previous_usage: Any, message: str, response: str) -> float:
+    """
+    Custo medido pelo agente no turno (zero em hits do cache de respostas e handoffs, que não chamam
+    o LLM); sem registro (agente que não reporta uso), estima por mensagem + resposta.
+    """
+    if telemetry is None:
+        return 0.0
+    usage = telemetry.last_turn_usage()
+    if usage is not None and usage is not previous_usage:
+        return usage.cost_usd
+    return await asyncio.to_thread(telemetry.calculate_stateful_cost, message, response)
+
+
+async def run_batch(
+    agent: Any,
+    rows: Iterable[BatchRow | InvalidRow | tuple | dict],
+    out: TextIO,
+    *,
+    concurrency: int = 32,
+    rate_limits: dict[str, float] | None = None,
+    telemetry: Any | None = None,
+) -> BatchSummary:
+    """
+    Executa `agent.process_message` para cada linha com no máximo `concurrency` turnos em voo.
+    `rate_limits` (chamadas/s por backend: llm, session, memory) limita o início dos turnos.
+    Cada resultado vira uma linha JSONL em `out`; linhas inválidas viram registros de erro.
+    """
+    buckets = []
+    for backend, rate in (rate_limits or {}).items():
+        tokens = CALLS_PER_TURN.get(backend, 1.0)
+        buckets.append((TokenBucket(rate, capacity=max(rate, tokens)), tokens))
+    summary = BatchSummary()
+    # Fila limitada: o produtor só lê novas linhas quando há workers livres (memória estável).
+    queue: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 2)
+    started = time.perf_counter()
+
+    async def produce() -> None:
+        try:
+            for row in _as_rows(rows):
+                await queue.put(row)
+        finally:
+            # Sentinelas mesmo se a leitura falhar: os workers encerram e o erro sobe via `await producer`.
+            for _ in range(concurrency):
+                await queue.put(None)
+
+    async def work() -> None:
+        while (row := await queue.get()) is not None:
+            if isinstance(row, InvalidRow):
+                logger.warning("Linha %d ignorada: %s", row.line_number, row.reason)
+                invalid = {"index": row.index, "line": row.line_number, "status": "error", "error": row.reason}
+                summary.failed += 1
+                summary.rows += 1
+                out.write(json.dumps(invalid, ensure_ascii=False) + "\n")
+                continue
+            for bucket, tokens in buckets:
+                await bucket.acquire(tokens)
+            t0 = time.perf_counter()
+            record: dict[str, Any] = {"index": row.index, "session_id": row.session_id, "tier": row.tier}
+            previous_usage = telemetry.last_turn_usage() if telemetry else None
+            try:
+                # customer_id só é repassado quando presente (agentes sem particionamento seguem compatíveis).
+                kwargs = {"customer_id": row.customer_id} if row.customer_id else {}
+                response = await agent.process_message(row.session_id, row.message, row.tier, **kwargs)
+            except Exception as e:
+                logger.warning("Falha no turno da linha %d (%s): %s", row.index, row.session_id, e)
+                record.update(status="error", error=f"{type(e).__name__}: {e}")
+                summary.failed += 1
+            else:
+                cost = await _turn_cost(telemetry, previous_usage, row.message, response)
+                record.update(status="ok", response=response, cost_usd=round(cost, 8))
+                summary.succeeded += 1
+                summary.total_cost += cost
+            record["latency_ms"] = round((time.perf_counter() - t0) * 1000, 3)
+            summary.rows += 1
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    producer = asyncio.create_task(produce())
+    try:
+        await asyncio.gather(*(work() for _ in range(concurrency)))
+        await producer
+    finally:
+        producer.cancel()
+    out.flush()
+    summary.elapsed_s = time.perf_counter() - started
+    return summary
+
+
+def _parse_rate_limits(values: list[str]) -> dict[str, float]:
+    limits = {}
+    for value in values:
+        backend, _, rate = value.partition("=")
+        limits[backend.strip()] = float(rate)
+    return limits
+
+
+async def _main_async(args: argparse.Namespace) -> BatchSummary:
+    from src.agent_router import StatefulFinanceAgent
+    from src.memory_gateway import LongTermMemoryGateway
+    from src.session_gateway import NegotiationSessionGateway
+    from src.telemetry import FinOpsTelemetry
+
+    telemetry = FinOpsTelemetry()
+    agent = StatefulFinanceAgent(
+        session_gw=NegotiationSessionGateway(),
+        memory_gw=LongTermMemoryGateway(),
+        telemetry=telemetry,
+    )
+    try:
+        with open(args.input, encoding="utf-8") as src, open(args.output, "w", encoding="utf-8") as out:
+            return await run_batch(
+                agent,
+                iter_jsonl_rows(src),
+                out,
+                concurrency=args.concurrency,
+                rate_limits=_parse_rate_limits(args.rate),
+                telemetry=telemetry,
+            )
+    finally:
+        await agent.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="JSONL com session_id, message e tier (opcional)")
+    parser.add_argument("output", help="JSONL de saída (um resultado por linha)")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--rate", action="append", default=[], help="backend=chamadas/s (llm, session, memory)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s - %(message)s")
+    summary = asyncio.run(_main_async(args))
+    print(
+        f"{summary.rows} linhas ({summary.succeeded} ok, {summary.failed} erros) em {summary.elapsed_s:.1f}s; "
+        f"custo total ${summary.total_cost:.6f}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+import asyncio
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Hashable
+from dataclasses import dataclass
+from typing import Any
+
+
+@dataclass
+class CacheStats:
+    """Contadores do cache (expostos para telemetria)."""
+
+    hits: int = 0
+    misses: int = 0
+    coalesced: int = 0
+    evictions: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses + self.coalesced
+        return (self.hits + self.coalesced) / lookups if lookups else 0.0
+
+
+class AsyncTTLCache:
+    """
+    Cache LRU + TTL para coroutines, com coalescência de requisições:
+    chamadas concorrentes para a mesma chave compartilham um único load em voo.
+    Erros não são cacheados (são propagados a todos os que aguardavam); cancelar um chamador
+    não interrompe o load compartilhado, que termina e popula o cache.
+    `ttl_s <= 0` ou `max_entries <= 0` desativa o armazenamento (a coalescência continua).
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_s: float = 300.0, clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.stats = CacheStats()
+        self._clock = clock
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._inflight: dict[Hashable, asyncio.Future] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_s > 0 and self.max_entries > 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> tuple[bool, Any]:
+        """Retorna (encontrado, valor) sem carregar; remove a entrada se expirada."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        expires_at, value = entry
+        if expires_at <= self._clock():
+            del self._entries[key]
+            return False, None
+        self._entries.move_to_end(key)
+        return True, value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        if not self.enabled:
+            return
+        self._entries[key] = (self._clock() + self.ttl_s, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats.evictions += 1
+
+    def invalidate(self, key: Hashable) -> None:
+        self._entries.pop(key, None)
+
+    async def get_or_load(self, key: Hashable, loader: Callable[..., Awaitable[Any]], *args: Any) -> Any:
+        found, value = self.get(key)
+        if found:
+            self.stats.hits += 1
+            return value
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.stats.coalesced += 1
+        else:
+            self.stats.misses += 1
+            # O load roda numa task própria: cancelar um chamador não cancela os demais.
+            task = asyncio.ensure_future(loader(*args))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t, key=key: self._on_loaded(key, t))
+        return await asyncio.shield(task)
+
+    def _on_loaded(self, key: Hashable, task: asyncio.Future) -> None:
+        self._inflight.pop(key, None)
+        if not task.cancelled() and task.exception() is None:
+            self.put(key, task.result())
@@ -0,0 +1,163 @@
+"""
+Empacotamento dos insights de Long-Term Memory no orçamento de tokens do prompt.
+
+A busca vetorial pode devolver documentos longos e repetidos (clientes antigos acumulam insights
+quase idênticos). O `ContextPacker` ordena os insights por score, descarta quase-duplicatas
+(Jaccard de palavras) e preenche `vector_search.insight_token_budget` de forma gulosa. A contagem
+de tokens de cada insight fica num LRU, e o pacote informa quantos tokens foram podados em relação
+ao texto integral, para a telemetria de FinOps.
+"""
+
+import re
+import threading
+from collections import OrderedDict
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass
+from pathlib import Path
+
+from src.policy import policy_section
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+@dataclass(frozen=True)
+class ScoredInsight:
+    """Insight recuperado com sua similaridade (None quando o backend não informa score)."""
+
+    content: str
+    score: float | None = None
+
+
+@dataclass(frozen=True)
+class PackedContext:
+    """Resultado do empacotamento: `text` vai para o context_injector."""
+
+    insights: tuple[ScoredInsight, ...]
+    text: str
+    tokens: int
+    trimmed_tokens: int
+    duplicates: int
+    over_budget: int
+
+
+def _approx_token_counts(texts: Sequence[str]) -> list[int]:
+    return [len(t) // 4 for t in texts]
+
+
+def _words(text: str) -> frozenset[str]:
+    return frozenset(_WORD_RE.findall(text.lower()))
+
+
+def _jaccard(a: frozenset[str], b: frozenset[str]) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def format_insights(contents: Sequence[str]) -> str:
+    """Um insight por linha (lista) no bloco de memória do context_injector."""
+    return "\n".join(f"- {content}" for content in contents)
+
+
+class ContextPacker:
+    """
+    Ordena, deduplica e corta insights para caber em `max_tokens`.
+    `count_tokens` conta uma lista de textos de uma vez (ex: FinOpsTelemetry.count_tokens);
+    sem ele, usa a aproximação de ~4 caracteres por token.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_tokens: int = 400,
+        dedupe_threshold: float = 0.85,
+        count_tokens: Callable[[Sequence[str]], list[int]] | None = None,
+        token_cache_max_entries: int = 4096,
+    ):
+        self.max_tokens = max_tokens
+        self.dedupe_threshold = dedupe_threshold
+        self.count_tokens = count_tokens or _approx_token_counts
+        self.token_cache_max_entries = token_cache_max_entries
+        self._token_cache: OrderedDict[str, int] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_policy(
+        cls,
+        config_path: Path | None = None,
+        *,
+        count_tokens: Callable[[Sequence[str]], list[int]] | None = None,
+    ) -> "ContextPacker":
+        policy = policy_section("vector_search", config_path)
+        return cls(
+            max_tokens=policy.get("insight_token_budget", 400),
+            dedupe_threshold=policy.get("insight_dedupe_threshold", 0.85),
+            count_tokens=count_tokens,
+        )
+
+    def _token_counts(self, texts: Sequence[str]) -> list[int]:
+        """Tokens de cada texto (com a marca de lista), contando de uma vez só os que não estão no LRU."""
+        lines = [f"- {t}" for t in texts]
+        with self._lock:
+            missing = [line for line in dict.fromkeys(lines) if line not in self._token_cache]
+        if missing:
+            counted = dict(zip(missing, self.count_tokens(missing), strict=True))
+            with self._lock:
+                for line, count in counted.items():
+                    self._token_cache[line] = count
+                    self._token_cache.move_to_end(line)
+                while len(self._token_cache) > self.token_cache_max_entries:
+                    self._token_cache.popitem(last=False)
+        else:
+            counted = {}
+        with self._lock:
+            out = []
+            for line in lines:
+                count = counted.get(line)
+                if count is None:
+                    count = self._token_cache[line]
+                    self._token_cache.move_to_end(line)
+                out.append(count)
+            return out
+
+    def pack(self, insights: Sequence[ScoredInsight]) -> PackedContext:
+        # Score desc (negativos inclusive); sem score vão por último, na ordem do backend (sorted é estável).
+        ranked = sorted(
+            (i for i in insights if i.content.strip()),
+            key=lambda i: (i.score is None, -(i.score or 0.0)),
+        )
+        kept: list[ScoredInsight] = []
+        kept_words: list[frozenset[str]] = []
+        duplicates = 0
+        for insight in ranked:
+            words = _words(insight.content)
+            if any(_jaccard(words, other) >= self.dedupe_threshold for other in kept_words):
+                duplicates += 1
+                continue
+            kept.append(insight)
+            kept_words.append(words)
+
+        counts = self._token_counts([i.content for i in ranked])
+        by_content = dict(zip((i.content for i in ranked), counts, strict=True))
+        full_tokens = sum(counts)
+
+        packed: list[ScoredInsight] = []
+        tokens = 0
+        over_budget = 0
+        for insight in kept:
+            cost = by_content[insight.content]
+            if tokens + cost > self.max_tokens:
+                # Um insight longo não bloqueia os seguintes, que podem caber.
+                over_budget += 1
+                continue
+            packed.append(insight)
+            tokens += cost
+
+        return PackedContext(
+            insights=tuple(packed),
+            text=format_insights([i.content for i in packed]),
+            tokens=tokens,
+            trimmed_tokens=full_tokens - tokens,
+            duplicates=duplicates,
+            over_budget=over_budget,
+        )
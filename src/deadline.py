@@ -0,0 +1,119 @@
+"""
+Orçamento de latência por turno (deadline), opt-in pela seção `deadline`.
+
+Com `deadline.enabled`, cada turno cria um `TurnBudget` com o SLA total (`deadline.turn_budget_s`)
+e o repassa aos Gateways e ao runner. Os estágios rodam na ordem de `STAGES` e cada um tem uma
+fração do orçamento (`deadline.stage_shares`): a fração dos estágios seguintes fica reservada, então
+uma leitura de sessão ou busca vetorial lenta não consome o tempo do LLM nem do checkpoint, e o tempo que um
+estágio não usa passa para os próximos. Estágios opcionais (Long-Term Memory) ficam limitados à
+própria fração e são pulados quando ela não cabe no que resta, ou cancelados ao estourá-la.
+Desligado, o `TurnBudget` não limita nenhum estágio (só os timeouts dos próprios backends valem).
+"""
+
+import asyncio
+import math
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, TypeVar
+
+from src.exceptions import DeadlineExceededError
+from src.policy import policy_section
+
+T = TypeVar("T")
+
+# Estágios do turno, na ordem em que consomem o orçamento
+STAGES = ("session_recover", "memory_search", "llm", "checkpoint_save")
+OPTIONAL_STAGES = frozenset({"memory_search"})
+
+DEFAULT_STAGE_SHARES = {"session_recover": 0.1, "memory_search": 0.1, "llm": 0.7, "checkpoint_save": 0.1}
+
+
+@dataclass(frozen=True)
+class BudgetSettings:
+    """Parâmetros do orçamento por turno (seção `deadline` do memory_policy.yaml)."""
+
+    enabled: bool = False
+    turn_budget_s: float = 30.0
+    stage_shares: dict[str, float] = field(default_factory=lambda: dict(DEFAULT_STAGE_SHARES))
+    min_optional_stage_s: float = 0.05
+
+    @classmethod
+    def from_policy(cls, config_path: Path | str | None = None) -> "BudgetSettings":
+        section = policy_section("deadline", config_path)
+        kwargs = {k: v for k, v in section.items() if k in cls.__dataclass_fields__}
+        if "stage_shares" in kwargs:
+            kwargs["stage_shares"] = {**DEFAULT_STAGE_SHARES, **kwargs["stage_shares"]}
+        return cls(**kwargs)
+
+
+def _discard(awaitable: Awaitable[Any]) -> None:
+    """Descarta um awaitable que não será aguardado (sem warning de coroutine nunca aguardada)."""
+    if asyncio.iscoroutine(awaitable):
+        awaitable.close()
+    elif isinstance(awaitable, asyncio.Future):
+        awaitable.cancel()
+
+
+class TurnBudget:
+    """
+    Deadline absoluto de um turno. `time_for(stage)` é a janela do estágio agora; `run` e
+    `run_optional` aplicam essa janela a um awaitable. Estágios opcionais descartados ficam em
+    `shed` como (estágio, motivo): "budget" (pulado) ou "timeout" (cancelado).
+    """
+
+    def __init__(self, settings: BudgetSettings | None = None, *, clock: Callable[[], float] = time.monotonic):
+        self.settings = settings or BudgetSettings()
+        self.clock = clock
+        self.started = clock()
+        self.deadline = self.started + self.settings.turn_budget_s if self.settings.enabled else math.inf
+        self.shed: list[tuple[str, str]] = []
+
+    def remaining(self) -> float:
+        return max(0.0, self.deadline - self.clock())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def _share_s(self, stage: str) -> float:
+        return self.settings.turn_budget_s * self.settings.stage_shares.get(stage, 0.0)
+
+    def time_for(self, stage: str) -> float:
+        """Tempo restante menos a fração reservada aos estágios seguintes (opcionais: no máximo a própria)."""
+        if not self.settings.enabled:
+            return math.inf
+        later = STAGES[STAGES.index(stage) + 1 :] if stage in STAGES else ()
+        available = self.remaining() - sum(self._share_s(s) for s in later)
+        if stage in OPTIONAL_STAGES:
+            available = min(available, self._share_s(stage))
+        return max(0.0, available)
+
+    async def run(self, stage: str, awaitable: Awaitable[T]) -> T:
+        """Aguarda um estágio obrigatório; estourar a janela levanta DeadlineExceededError."""
+        timeout = self.time_for(stage)
+        if timeout <= 0:
+            _discard(awaitable)
+            raise DeadlineExceededError(f"Orçamento do turno esgotado antes de {stage}")
+        if math.isinf(timeout):
+            return await awaitable
+        try:
+            return await asyncio.wait_for(awaitable, timeout)
+        except TimeoutError:
+            raise DeadlineExceededError(f"{stage} excedeu {timeout * 1000:.0f} ms do orçamento do turno") from None
+
+    async def run_optional(self, stage: str, awaitable: Awaitable[T], default: T) -> T:
+        """Aguarda um estágio opcional; sem tempo suficiente, ou ao estourar a janela, devolve `default`."""
+        timeout = self.time_for(stage)
+        if timeout < self.settings.min_optional_stage_s:
+            _discard(awaitable)
+            self.shed.append((stage, "budget"))
+            return default
+        if math.isinf(timeout):
+            return await awaitable
+        try:
+            return await asyncio.wait_for(awaitable, timeout)
+        except TimeoutError:
+            self.shed.append((stage, "timeout"))
+            return default
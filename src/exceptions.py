@@ -26,3 +26,27 @@ class ConcurrentWriteError(MemorySystemError):
     """Raised when OCC detects a version conflict (another writer saved the checkpoint)."""
 
     pass
+
+
+class WorkerUnavailableError(MemorySystemError):
+    """Raised when no serving worker can take the request (pool closed or worker process died)."""
+
+    pass
+
+
+class CircuitOpenError(MemorySystemError):
+    """Raised without calling the backend while its circuit breaker is open (fail fast)."""
+
+    pass
+
+
+class DeadlineExceededError(MemorySystemError):
+    """Raised when a mandatory turn stage does not fit in the remaining latency budget."""
+
+    pass
+
+
+class OverloadedError(MemorySystemError):
+    """Raised when a turn or backend call is shed because in-flight work is above its limit."""
+
+    pass
@@ -0,0 +1,53 @@
+"""
+Hashing consistente (`HashRing`), compartilhado pelo roteamento de workers (src/worker_pool.py)
+e pelo particionamento de sessões (src/session_sharding.py). Sem dependências além da stdlib.
+"""
+
+import bisect
+import hashlib
+from collections.abc import Iterable
+
+from src.exceptions import WorkerUnavailableError
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """
+    Anel de hashing consistente com `vnodes` pontos por nó. Adicionar um nó move só ~1/N das chaves,
+    e todas para o nó novo; remover um nó redistribui só as chaves dele.
+    """
+
+    def __init__(self, nodes: Iterable[int] = (), *, vnodes: int = 64):
+        self.vnodes = vnodes
+        self._points: list[int] = []
+        self._owners: list[int] = []
+        for node in nodes:
+            self.add(node)
+
+    @property
+    def nodes(self) -> set[int]:
+        return set(self._owners)
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    def add(self, node: int) -> None:
+        for replica in range(self.vnodes):
+            point = _hash(f"{node}#{replica}")
+            index = bisect.bisect(self._points, point)
+            self._points.insert(index, point)
+            self._owners.insert(index, node)
+
+    def remove(self, node: int) -> None:
+        keep = [(p, o) for p, o in zip(self._points, self._owners, strict=True) if o != node]
+        self._points = [p for p, _ in keep]
+        self._owners = [o for _, o in keep]
+
+    def node_for(self, key: str) -> int:
+        if not self._points:
+            raise WorkerUnavailableError("Anel de workers vazio")
+        index = bisect.bisect(self._points, _hash(key)) % len(self._points)
+        return self._owners[index]
@@ -0,0 +1,181 @@
+"""
+Ingestão write-behind de negociações encerradas na Long-Term Memory (seção `ingestion`).
+
+Quando um turno leva a sessão a um estágio terminal (`contract_signed`, `human_handoff`), o agente
+enfileira o session_id numa fila assíncrona limitada e segue: nenhum turno espera a ingestão. Um
+worker em background agrupa os ids por tamanho (`batch_size`) ou tempo (`batch_interval_s`), lê as
+sessões completas e as grava em lote pelo LongTermMemoryGateway, que aplica o retry da política.
+Fila cheia descarta o id (contado em `ingestion_dropped_total`) em vez de bloquear o turno;
+`close()` drena o que já foi enfileirado antes do shutdown.
+"""
+
+import asyncio
+import contextlib
+import logging
+import time
+from collections.abc import Awaitable, Callable, Hashable, Sequence
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from src.instrumentation import INGESTION_BATCHES_TOTAL, INGESTION_DROPPED_TOTAL, Instrumentation
+from src.policy import policy_section
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STAGES = ("contract_signed", "human_handoff")
+
+
+@dataclass(frozen=True)
+class IngestionSettings:
+    """Parâmetros da fila de ingestão (seção `ingestion` do memory_policy.yaml)."""
+
+    enabled: bool = False
+    stages: tuple[str, ...] = TERMINAL_STAGES
+    queue_max_size: int = 1000
+    batch_size: int = 20
+    batch_interval_s: float = 2.0
+    flush_timeout_s: float = 30.0
+
+    @classmethod
+    def from_policy(cls, config_path: Path | str | None = None) -> "IngestionSettings":
+        section = policy_section("ingestion", config_path)
+        kwargs = {k: v for k, v in section.items() if k in cls.__dataclass_fields__}
+        if "stages" in kwargs:
+            kwargs["stages"] = tuple(kwargs["stages"])
+        return cls(**kwargs)
+
+
+@dataclass
+class IngestionStats:
+    """Contadores da fila (expostos para benchmarks e testes)."""
+
+    enqueued: int = 0
+    dropped: int = 0
+    ingested: int = 0
+    failed: int = 0
+    batches: int = 0
+
+
+class IngestionQueue:
+    """
+    Fila limitada + worker de lotes. `load_session(session_id)` devolve a sessão completa (ex:
+    NegotiationSessionGateway.get_session) e `ingest(sessions)` grava um lote (ex:
+    LongTermMemoryGateway.ingest_sessions). Os ids são opacos: o agente enfileira SessionKey
+    (cliente + sessão). O worker sobe no primeiro `enqueue`, dentro do event loop.
+    Um lote que falha após os retries do gateway é descartado e contado em `stats.failed`.
+    """
+
+    def __init__(
+        self,
+        load_session: Callable[[Hashable], Awaitable[Any]],
+        ingest: Callable[[Sequence[Any]], Awaitable[None]],
+        settings: IngestionSettings | None = None,
+        *,
+        instrumentation: Instrumentation | None = None,
+    ):
+        self.load_session = load_session
+        self.ingest = ingest
+        self.settings = settings or IngestionSettings(enabled=True)
+        self.instrumentation = instrumentation or Instrumentation()
+        self.stats = IngestionStats()
+        self._queue: asyncio.Queue[Hashable] | None = None
+        self._worker: asyncio.Task | None = None
+        self._closing = False
+
+    async def __aenter__(self) -> "IngestionQueue":
+        return self
+
+    async def __aexit__(self, *exc: object) -> None:
+        await self.close()
+
+    def _ensure_worker(self) -> asyncio.Queue[Hashable]:
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.settings.queue_max_size)
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run(), name="ingestion-worker")
+        return self._queue
+
+    def enqueue(self, session_id: Hashable) -> bool:
+        """Agenda a sessão para ingestão sem esperar; retorna False se a fila estiver cheia ou fechada."""
+        if self._closing:
+            self._drop(session_id, "closed")
+            return False
+        queue = self._ensure_worker()
+        try:
+            queue.put_nowait(session_id)
+        except asyncio.QueueFull:
+            self._drop(session_id, "queue_full")
+            return False
+        self.stats.enqueued += 1
+        return True
+
+    def _drop(self, session_id: Hashable, reason: str) -> None:
+        self.stats.dropped += 1
+        self.instrumentation.increment(INGESTION_DROPPED_TOTAL, reason=reason)
+        logger.warning("Ingestão da sessão %s descartada (%s).", session_id, reason)
+
+    async def _next_batch(self, queue: asyncio.Queue[Hashable]) -> list[Hashable]:
+        """Espera o primeiro id e junta os seguintes até `batch_size` ou `batch_interval_s`."""
+        batch = [await queue.get()]
+        deadline = time.monotonic() + self.settings.batch_interval_s
+        while len(batch) < self.settings.batch_size:
+            if self._closing:
+                # Shutdown: junta o que já está na fila sem esperar o intervalo.
+                if queue.empty():
+                    break
+                batch.append(queue.get_nowait())
+                continue
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(queue.get(), timeout))
+            except TimeoutError:
+                break
+        return batch
+
+    async def _ingest_batch(self, session_ids: list[Hashable]) -> None:
+        sessions = await asyncio.gather(*(self.load_session(s) for s in session_ids), return_exceptions=True)
+        found = [s for s in sessions if s is not None and not isinstance(s, BaseException)]
+        try:
+            if found:
+                await self.ingest(found)
+        except Exception as e:
+            self.stats.failed += len(session_ids)
+            self.instrumentation.increment(INGESTION_BATCHES_TOTAL, outcome="failed")
+            logger.error("Falha ao ingerir lote de %d sessões na Long-Term Memory: %s", len(session_ids), e)
+            return
+        self.stats.batches += 1
+        self.stats.ingested += len(found)
+        self.stats.failed += len(session_ids) - len(found)
+        self.instrumentation.increment(INGESTION_BATCHES_TOTAL, outcome="ok")
+
+    async def _run(self) -> None:
+        queue = self._queue
+        while True:
+            batch = await self._next_batch(queue)
+            try:
+                await self._ingest_batch(batch)
+            finally:
+                for _ in batch:
+                    queue.task_done()
+
+    async def flush(self) -> None:
+        """Espera a ingestão de tudo o que já foi enfileirado."""
+        if self._queue is not None and self._worker is not None:
+            await self._queue.join()
+
+    async def close(self) -> None:
+        """Recusa novos ids, drena a fila (até `flush_timeout_s`) e encerra o worker."""
+        self._closing = True
+        try:
+            await asyncio.wait_for(self.flush(), self.settings.flush_timeout_s)
+        except TimeoutError:
+            pending = self._queue.qsize() if self._queue is not None else 0
+            logger.error("Shutdown da ingestão expirou com %d sessões pendentes.", pending)
+        if self._worker is not None:
+            self._worker.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._worker
+            self._worker = None
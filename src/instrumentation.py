@@ -0,0 +1,236 @@
+"""
+Instrumentação do hot path: spans por estágio do turno, histogramas de latência e contadores de
+retry/degradação dos Gateways.
+
+As métricas vão para um sink plugável (`MetricsSink`). Sem sink a instrumentação fica desativada e
+`span()` devolve um context manager no-op compartilhado (custo de uma chamada de método).
+
+Uso:
+    sink = InMemorySink()
+    instrumentation = Instrumentation(sink)
+    with instrumentation.span("llm_stream"):
+        ...
+    print(PrometheusTextExporter(sink).render())
+"""
+
+import bisect
+import threading
+import time
+from collections.abc import Sequence
+from typing import Protocol
+
+# Buckets (segundos) do histograma de latência por estágio: de cache hit local a LLM lento.
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Nomes das métricas emitidas pelo agente e pelos Gateways
+STAGE_SECONDS = "turn_stage_seconds"
+RETRIES_TOTAL = "gateway_retries_total"
+DEGRADED_TOTAL = "gateway_degraded_total"
+BREAKER_TRANSITIONS_TOTAL = "circuit_breaker_transitions_total"
+HEDGES_TOTAL = "gateway_hedges_total"
+STAGES_SHED_TOTAL = "turn_stages_shed_total"
+DEADLINE_EXCEEDED_TOTAL = "turn_deadline_exceeded_total"
+INSIGHT_TOKENS_TRIMMED_TOTAL = "insight_tokens_trimmed_total"
+RESPONSE_CACHE_TOTAL = "response_cache_lookups_total"
+INGESTION_BATCHES_TOTAL = "ingestion_batches_total"
+INGESTION_DROPPED_TOTAL = "ingestion_dropped_total"
+EXECUTOR_QUEUE_DEPTH = "executor_queue_depth"
+EXECUTOR_REJECTED_TOTAL = "executor_rejected_total"
+ADMISSION_IN_FLIGHT = "admission_in_flight_turns"
+ADMISSION_QUEUE_DEPTH = "admission_queue_depth"
+ADMISSION_REJECTED_TOTAL = "admission_rejected_total"
+
+Labels = tuple[tuple[str, str], ...]
+
+
+class MetricsSink(Protocol):
+    """Destino das métricas; implementações devem ser thread-safe (gateways usam asyncio.to_thread)."""
+
+    def observe(self, name: str, value: float, labels: Labels) -> None: ...
+
+    def set_gauge(self, name: str, value: float, labels: Labels) -> None: ...
+
+    def increment(self, name: str, value: float, labels: Labels) -> None: ...
+
+
+class Histogram:
+    """Histograma cumulativo com buckets fixos (formato Prometheus)."""
+
+    __slots__ = ("buckets", "counts", "count", "sum")
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # último = +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self) -> list[tuple[float, int]]:
+        """Pares (limite superior, contagem acumulada), incluindo +Inf."""
+        total = 0
+        out = []
+        for bound, count in zip((*self.buckets, float("inf")), self.counts, strict=True):
+            total += count
+            out.append((bound, total))
+        return out
+
+    def quantile(self, q: float) -> float:
+        """Estimativa pelo limite superior do bucket que contém o quantil `q`."""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        for bound, total in self.cumulative():
+            if total >= target:
+                return bound
+        return float("inf")
+
+
+class InMemorySink:
+    """Sink em memória: histogramas, contadores e gauges por (nome, labels), para testes e exportação."""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.histograms: dict[tuple[str, Labels], Histogram] = {}
+        self.counters: dict[tuple[str, Labels], float] = {}
+        self.gauges: dict[tuple[str, Labels], float] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name: str, value: float, labels: Labels) -> None:
+        with self._lock:
+            histogram = self.histograms.get((name, labels))
+            if histogram is None:
+                histogram = self.histograms[(name, labels)] = Histogram(self.buckets)
+            histogram.observe(value)
+
+    def increment(self, name: str, value: float, labels: Labels) -> None:
+        with self._lock:
+            self.counters[(name, labels)] = self.counters.get((name, labels), 0.0) + value
+
+    def set_gauge(self, name: str, value: float, labels: Labels) -> None:
+        with self._lock:
+            self.gauges[(name, labels)] = value
+
+    def histogram(self, name: str, **labels: str) -> Histogram | None:
+        return self.histograms.get((name, _labels(labels)))
+
+    def counter(self, name: str, **labels: str) -> float:
+        return self.counters.get((name, _labels(labels)), 0.0)
+
+    def gauge(self, name: str, **labels: str) -> float:
+        return self.gauges.get((name, _labels(labels)), 0.0)
+
+
+def _labels(labels: dict[str, str]) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(labels: Labels, extra: tuple[str, str] | None = None) -> str:
+    pairs = [*labels, extra] if extra else list(labels)
+    if not pairs:
+        return ""
+    escaped = (v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped, strict=True)) + "}"
+
+
+def _format_bound(bound: float) -> str:
+    return "+Inf" if bound == float("inf") else repr(bound)
+
+
+class PrometheusTextExporter:
+    """Exporta um InMemorySink no formato de exposição de texto do Prometheus (0.0.4)."""
+
+    def __init__(self, sink: InMemorySink):
+        self.sink = sink
+
+    def render(self) -> str:
+        with self.sink._lock:
+            histograms = {key: (h.cumulative(), h.count, h.sum) for key, h in self.sink.histograms.items()}
+            counters = dict(self.sink.counters)
+            gauges = dict(self.sink.gauges)
+
+        lines: list[str] = []
+        for name in sorted({name for name, _ in counters}):
+            lines.append(f"# TYPE {name} counter")
+            for (metric, labels), value in sorted(counters.items()):
+                if metric == name:
+                    lines.append(f"{name}{_format_labels(labels)} {value:g}")
+        for name in sorted({name for name, _ in gauges}):
+            lines.append(f"# TYPE {name} gauge")
+            for (metric, labels), value in sorted(gauges.items()):
+                if metric == name:
+                    lines.append(f"{name}{_format_labels(labels)} {value:g}")
+        for name in sorted({name for name, _ in histograms}):
+            lines.append(f"# TYPE {name} histogram")
+            for (metric, labels), (cumulative, count, total) in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                for bound, acc in cumulative:
+                    lines.append(f"{name}_bucket{_format_labels(labels, ('le', _format_bound(bound)))} {acc}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {total:g}")
+                lines.append(f"{name}_count{_format_labels(labels)} {count}")
+        return "\n".join(lines) + "\n" if lines else ""
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        return None
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class _Span:
+    __slots__ = ("_sink", "_labels", "_start")
+
+    def __init__(self, sink: MetricsSink, labels: Labels):
+        self._sink = sink
+        self._labels = labels
+
+    def __enter__(self) -> "_Span":
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self._sink.observe(STAGE_SECONDS, time.perf_counter() - self._start, self._labels)
+
+
+class Instrumentation:
+    """
+    Fachada usada pelo agente e pelos Gateways. `span(stage)` mede a duração do bloco no
+    histograma `turn_stage_seconds{stage=...}`; `increment` alimenta contadores e `set_gauge`
+    publica o valor corrente (ex: profundidade de fila).
+    Sem sink, todas as operações são no-op.
+    """
+
+    def __init__(self, sink: MetricsSink | None = None):
+        self.sink = sink
+
+    @property
+    def enabled(self) -> bool:
+        return self.sink is not None
+
+    def span(self, stage: str) -> _Span | _NoopSpan:
+        if self.sink is None:
+            return _NOOP_SPAN
+        return _Span(self.sink, (("stage", stage),))
+
+    def increment(self, name: str, value: float = 1.0, **labels: str) -> None:
+        if self.sink is not None:
+            self.sink.increment(name, value, _labels(labels))
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        if self.sink is not None:
+            self.sink.observe(name, value, _labels(labels))
+
+    def set_gauge(self, name: str, value: float, **labels: str) -> None:
+        if self.sink is not None:
+            self.sink.set_gauge(name, value, _labels(labels))
@@ -7,6 +7,7 @@ load_dotenv(override=True)
 
 from src.agent_router import StatefulFinanceAgent
 from src.memory_gateway import LongTermMemoryGateway
+from src.readiness import start_warm_up  # noqa: E402
 from src.session_gateway import NegotiationSessionGateway
 from src.telemetry import FinOpsTelemetry
 
@@ -22,8 +23,10 @@ async def run_lab_async() -> None:
 
     session_gw = NegotiationSessionGateway()
     memory_gw = LongTermMemoryGateway()
-    agent = StatefulFinanceAgent(session_gw=session_gw, memory_gw=memory_gw)
     telemetry = FinOpsTelemetry()
+    agent = StatefulFinanceAgent(session_gw=session_gw, memory_gw=memory_gw, telemetry=telemetry)
+    # SDKs do ADK/Gemini e o tokenizer carregam em background; o primeiro turno espera a prontidão.
+    readiness = start_warm_up(agent, telemetry)
 
     messages = [
         "Olá, gostaria de financiar um SUV elétrico de R$ 350.000.",
@@ -31,25 +34,28 @@ async def run_lab_async() -> None:
         "Ainda acho alto. Não vou fechar o financiamento assim.",
     ]
 
+    await asyncio.to_thread(readiness.wait)
+    print(f"\n[SISTEMA] Warm-up concluido: {readiness.status()['durations_ms']}")
     print(f"\n[SISTEMA] Iniciando recuperacao de Checkpoint (Sessao: {session_id})...")
 
-    total_cost = 0.0
     for i, msg in enumerate(messages, 1):
         print(f"\n[Turno {i}]")
         print(f"Cliente: {msg}")
 
-        response_text = await agent.process_message(
+        print("Agente: ", end="", flush=True)
+        async for chunk in agent.stream_message(
             session_id=session_id,
             customer_message=msg,
             customer_tier="premium",
-        )
-
-        print(f"Agente: {response_text}")
-        cost = telemetry.calculate_stateful_cost(msg, response_text)
-        total_cost += cost
+        ):
+            print(chunk, end="", flush=True)
+        print()
 
+    # Drena a ingestão write-behind das sessões encerradas antes de sair
+    await agent.close()
     print("\n")
-    telemetry.print_savings_report(total_cost)
+    # Custo médio por turno, medido pelo agente sobre o prompt efetivamente enviado
+    telemetry.print_savings_report()
 
 
 def run_lab() -> None:
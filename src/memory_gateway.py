@@ -1,26 +1,35 @@
 import asyncio
 import logging
 import os
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Any
 
-from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential
-
-from src.exceptions import VectorSearchError
+from src.admission import BoundedExecutor, ExecutorSettings
+from src.caching import AsyncTTLCache
+from src.context_packer import ScoredInsight
+from src.deadline import TurnBudget
+from src.exceptions import CircuitOpenError, OverloadedError, VectorSearchError
+from src.instrumentation import (
+    BREAKER_TRANSITIONS_TOTAL,
+    DEGRADED_TOTAL,
+    HEDGES_TOTAL,
+    RETRIES_TOTAL,
+    Instrumentation,
+)
+from src.policy import policy_section
+from src.resilience import AsyncRetrier, BreakerSettings, CircuitBreaker, Hedger, HedgeSettings, RetrySettings
 
 logger = logging.getLogger(__name__)
 
-RETRY_POLICY = dict(
-    stop=stop_after_attempt(3),
-    wait=wait_exponential(multiplier=1, min=2, max=10),
-    retry=retry_if_exception_type(Exception),
-    reraise=True,
-)
-
 
 class LongTermMemoryGateway:
     """
     Abstração da Memória de Longo Prazo.
     Oculta a complexidade de conexão com o Vertex AI Vector Search.
     Implementa "Graceful Degradation" e retry com Exponential Backoff.
+    Backends: serviço injetado, índice local NumPy (`local_index` ou LOCAL_VECTOR_INDEX_PATH),
+    Vertex AI (VECTOR_SEARCH_ENDPOINT_ID) ou, sem nenhum deles, o mock em memória.
     """
 
     def __init__(
@@ -28,13 +37,55 @@ class LongTermMemoryGateway:
         project_id: str | None = None,
         location: str | None = None,
         index_endpoint: str | None = None,
+        *,
+        service: Any | None = None,
+        policy_path: Path | None = None,
+        retrier: AsyncRetrier | None = None,
+        local_index: Any | None = None,
+        instrumentation: Instrumentation | None = None,
+        breaker: CircuitBreaker | None = None,
+        executor: BoundedExecutor | None = None,
     ):
         self.project_id = project_id or os.environ.get("GOOGLE_CLOUD_PROJECT")
         self.location = location or os.environ.get("GOOGLE_CLOUD_REGION")
         self.index_endpoint = index_endpoint or os.environ.get("VECTOR_SEARCH_ENDPOINT_ID")
+        self.retrier = retrier or AsyncRetrier(RetrySettings.from_policy(policy_path))
+        self.instrumentation = instrumentation or Instrumentation()
+        vector_policy = policy_section("vector_search", policy_path)
+        self.max_documents = vector_policy.get("max_documents", 3)
+        self.min_similarity_score = vector_policy.get("min_similarity_score", 0.0)
+        self.cache = AsyncTTLCache(
+            max_entries=vector_policy.get("cache_max_entries", 1024),
+            ttl_s=vector_policy.get("cache_ttl_seconds", 300),
+        )
+        breaker_policy = vector_policy.get("circuit_breaker") or {}
+        self.probe_query = breaker_policy.get("probe_query", "healthcheck")
+        self.breaker = breaker or CircuitBreaker(
+            "vector_search",
+            BreakerSettings.from_policy("vector_search", policy_path),
+            probe=self._probe,
+            on_transition=self._count_transition,
+        )
+        self.hedger = Hedger(HedgeSettings.from_policy("vector_search", policy_path), on_hedge=self._count_hedge)
+        self.executor = executor or BoundedExecutor(
+            "vector_search",
+            ExecutorSettings.from_policy("vector_search", policy_path),
+            instrumentation=self.instrumentation,
+        )
+
+        local_index_path = os.environ.get("LOCAL_VECTOR_INDEX_PATH")
+        if local_index is None and local_index_path and service is None:
+            from src.vector_index import LocalVectorIndex
 
-        self.is_mock = not bool(self.index_endpoint)
-        if not self.is_mock:
+            local_index = LocalVectorIndex.load(local_index_path, probes=vector_policy.get("local_index_probes", 32))
+        self.local_index = local_index
+
+        self.is_mock = service is None and local_index is None and not bool(self.index_endpoint)
+        if service is not None:
+            self.service = service
+        elif local_index is not None:
+            logger.info("Long-Term Memory servida pelo índice vetorial local (%d insights).", len(local_index))
+        elif not self.is_mock:
             from google.adk.memory import VertexAiMemoryBankService
 
             self.service = VertexAiMemoryBankService(
@@ -45,32 +96,107 @@ class LongTermMemoryGateway:
         else:
             logger.warning("VECTOR_SEARCH_ENDPOINT_ID não configurado. Usando Mock de Banco Vetorial.")
 
-    def _search_customer_insights_sync(self, query: str) -> str:
-        """Lógica síncrona com retry; chamada via asyncio.to_thread."""
+    def _search_insights_sync(self, query: str) -> tuple[ScoredInsight, ...]:
+        """
+        Uma tentativa síncrona; chamada no executor do gateway (o retry fica no event loop).
+        `max_documents` e `min_similarity_score` da política limitam os documentos retornados.
+        """
+        if self.local_index is not None:
+            hits = self.local_index.search(query, top_k=self.max_documents, min_score=self.min_similarity_score)
+            return tuple(hits)
         if self.is_mock:
             if "sessao_premium" in query:
-                return "O cliente é conservador, negocia as taxas com agressividade e só fecha com taxas < 1.0%."
-            return "Nenhum histórico prévio encontrado para este CPF."
+                return (
+                    ScoredInsight(
+                        "O cliente é conservador, negocia as taxas com agressividade e só fecha com taxas < 1.0%."
+                    ),
+                )
+            return (ScoredInsight("Nenhum histórico prévio encontrado para este CPF."),)
 
         try:
             results = self.service.search_memory(query=query)
-            return " ".join([doc.content for doc in results]) if results else ""
+            return tuple(
+                ScoredInsight(doc.content, getattr(doc, "score", None)) for doc in (results or [])[: self.max_documents]
+            )
         except Exception as e:
             logger.error("Falha na consulta Vetorial. Degrading gracefully... Erro: %s", e)
             raise VectorSearchError(str(e)) from e
 
-    @retry(**RETRY_POLICY)
-    def _search_customer_insights_sync_retry(self, query: str) -> str:
-        """Busca com retry; após esgotar retries, o caller pode degradar (retornar '')."""
-        return self._search_customer_insights_sync(query)
+    def _count_retry(self, exc: BaseException) -> None:
+        self.instrumentation.increment(RETRIES_TOTAL, gateway="memory", operation="search", error=type(exc).__name__)
 
-    async def search_customer_insights(self, query: str) -> str:
+    def _count_transition(self, name: str, old_state: str, new_state: str) -> None:
+        self.instrumentation.increment(
+            BREAKER_TRANSITIONS_TOTAL, breaker=name, from_state=old_state, to_state=new_state
+        )
+
+    def _count_hedge(self, won: bool) -> None:
+        self.instrumentation.increment(HEDGES_TOTAL, gateway="memory", outcome="won" if won else "lost")
+
+    async def _probe(self) -> None:
+        await self.executor.run(self._search_insights_sync, self.probe_query)
+
+    async def _search_with_retry(self, query: str, deadline: TurnBudget | None = None) -> tuple[ScoredInsight, ...]:
+        """Busca com retry, CircuitBreaker e Hedger, no executor da Long-Term Memory."""
+        # O breaker fica dentro do retry: cada tentativa conta na janela e, se o circuito abrir no
+        # meio, as tentativas restantes falham na hora (CircuitOpenError não é retentável).
+        # Executor cheio também não: retentar só aumentaria a fila.
+        return await self.retrier.call(
+            self.breaker.call,
+            self.hedger.call,
+            self.executor.run,
+            self._search_insights_sync,
+            query,
+            retry_if=lambda e: not isinstance(e, CircuitOpenError | OverloadedError),
+            on_retry=self._count_retry,
+            deadline=deadline,
+        )
+
+    async def search_insights(self, query: str, *, deadline: TurnBudget | None = None) -> tuple[ScoredInsight, ...]:
         """
-        Busca conhecimento do cliente (RAG context). Não bloqueia o event loop.
-        Em falha persistente após retries, retorna string vazia (graceful degradation).
+        Busca conhecimento do cliente (RAG context), um ScoredInsight por documento. Não bloqueia o event loop.
+        Em falha persistente, circuito aberto ou executor cheio, retorna tupla vazia (graceful degradation).
         """
         try:
-            return await asyncio.to_thread(self._search_customer_insights_sync_retry, query)
+            return await self.cache.get_or_load(query, self._search_with_retry, query, deadline)
+        except CircuitOpenError:
+            self.instrumentation.increment(DEGRADED_TOTAL, gateway="memory", reason="circuit_open")
+            return ()
+        except OverloadedError:
+            self.instrumentation.increment(DEGRADED_TOTAL, gateway="memory", reason="overloaded")
+            return ()
         except Exception:
             logger.warning("Long-Term Memory indisponível após retries. Degradando para contexto vazio.")
-            return ""
+            self.instrumentation.increment(DEGRADED_TOTAL, gateway="memory", reason="empty_context")
+            return ()
+
+    async def _ingest_once(self, sessions: list[Any]) -> None:
+        add_batch = getattr(self.service, "add_sessions_to_memory", None)
+        if add_batch is not None:
+            await add_batch(sessions)
+            return
+        # API do ADK (BaseMemoryService): uma chamada por sessão, em paralelo.
+        await asyncio.gather(*(self.service.add_session_to_memory(session) for session in sessions))
+
+    async def ingest_sessions(self, sessions: Sequence[Any]) -> None:
+        """
+        Grava um lote de sessões ADK no banco de memória, com retry; falha persistente propaga.
+        Sem backend de escrita (mock ou índice local), o lote é ignorado.
+        """
+        if not sessions:
+            return
+        if self.is_mock or self.local_index is not None:
+            logger.debug("Long-Term Memory sem backend de escrita; %d sessões não ingeridas.", len(sessions))
+            return
+        await self.retrier.call(
+            self._ingest_once,
+            list(sessions),
+            on_retry=lambda e: self.instrumentation.increment(
+                RETRIES_TOTAL, gateway="memory", operation="ingest", error=type(e).__name__
+            ),
+        )
+
+    async def search_customer_insights(self, query: str, *, deadline: TurnBudget | None = None) -> str:
+        """Como `search_insights`, com os documentos concatenados (string vazia na degradação)."""
+        insights = await self.search_insights(query, deadline=deadline)
+        return " ".join(insight.content for insight in insights)
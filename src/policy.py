@@ -0,0 +1,21 @@
+from pathlib import Path
+from typing import Any
+
+import yaml
+
+# Caminho padrão da política (relativo ao CWD do processo)
+DEFAULT_POLICY_PATH = Path("config/memory_policy.yaml")
+
+
+def load_policy(config_path: Path | str | None = None) -> dict[str, Any]:
+    """Carrega memory_policy.yaml; arquivo ausente equivale a política vazia (defaults do código)."""
+    path = Path(config_path) if config_path else DEFAULT_POLICY_PATH
+    if not path.exists():
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return yaml.safe_load(f) or {}
+
+
+def policy_section(name: str, config_path: Path | str | None = None) -> dict[str, Any]:
+    """Retorna uma seção da política (ex: 'session', 'vector_search'), ou {} se ausente."""
+    return load_policy(config_path).get(name) or {}
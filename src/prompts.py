@@ -0,0 +1,138 @@
+"""
+Registro compartilhado de templates de prompt (Jinja2).
+
+Os templates são carregados de `prompts/` relativo ao pacote (independe do CWD), compilados uma vez
+por processo e, com `bytecode_cache`, o bytecode fica em disco para as próximas instâncias. O
+system prompt depende só do estado da FSM (estágio × tier × recusas × taxa), então `render`
+memoiza o resultado por contexto. Recarga por mtime é opt-in (`prompts.auto_reload`).
+"""
+
+import logging
+import os
+import stat
+import threading
+from collections import OrderedDict
+from collections.abc import Hashable
+from pathlib import Path
+from typing import Any
+
+import jinja2
+
+from src.policy import policy_section
+
+logger = logging.getLogger(__name__)
+
+PROMPTS_DIR = Path(__file__).resolve().parent.parent / "prompts"
+
+
+def _bytecode_cache(directory: Path | str | None) -> jinja2.BytecodeCache | None:
+    """
+    Bytecode cache só em diretório privado: o Jinja executa o que lê de lá. Sem `directory`, usa o
+    diretório padrão do Jinja (por uid, 0700, com checagem de dono); um diretório explícito é criado
+    com 0700 e recusado (cache desligado) se for de outro usuário ou tiver escrita para grupo/outros.
+    """
+    if directory is None:
+        return jinja2.FileSystemBytecodeCache()
+    path = Path(directory)
+    path.mkdir(mode=0o700, parents=True, exist_ok=True)
+    info = path.stat()
+    foreign_owner = hasattr(os, "getuid") and info.st_uid != os.getuid()
+    if foreign_owner or info.st_mode & (stat.S_IWGRP | stat.S_IWOTH):
+        logger.warning("Bytecode cache desligado: %s não é um diretório privado do usuário.", path)
+        return None
+    return jinja2.FileSystemBytecodeCache(str(path))
+
+
+class PromptRegistry:
+    """
+    Templates pré-compilados com render memoizado (LRU por nome + contexto).
+    O contexto precisa ser hashable para ser memoizado; senão o template é renderizado direto.
+    Com `auto_reload=True`, cada render compara o mtime do arquivo e recompila se mudou.
+    """
+
+    def __init__(
+        self,
+        directory: Path | str = PROMPTS_DIR,
+        *,
+        auto_reload: bool = False,
+        bytecode_cache: bool = False,
+        bytecode_cache_dir: Path | str | None = None,
+        render_cache_max_entries: int = 1024,
+    ):
+        self.directory = Path(directory)
+        self.auto_reload = auto_reload
+        self.render_cache_max_entries = render_cache_max_entries
+        cache = _bytecode_cache(bytecode_cache_dir) if bytecode_cache or bytecode_cache_dir is not None else None
+        # O registro controla a recarga (mtime); o Environment não re-verifica a cada get_template.
+        self.env = jinja2.Environment(
+            loader=jinja2.FileSystemLoader(str(self.directory)),
+            bytecode_cache=cache,
+            auto_reload=False,
+        )
+        self.hits = 0
+        self.misses = 0
+        self._templates: dict[str, tuple[jinja2.Template, float]] = {}
+        self._rendered: OrderedDict[tuple[str, Hashable], str] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _mtime(self, name: str) -> float:
+        return os.stat(self.directory / name).st_mtime
+
+    def get(self, name: str, /) -> jinja2.Template:
+        """Template compilado (carregado na primeira chamada e, com auto_reload, quando o arquivo muda)."""
+        with self._lock:
+            cached = self._templates.get(name)
+            if cached is not None and not (self.auto_reload and self._mtime(name) != cached[1]):
+                return cached[0]
+            if cached is not None:
+                # Arquivo alterado: descarta o template e os renders memoizados dele.
+                self.env.cache.clear()
+                for key in [k for k in self._rendered if k[0] == name]:
+                    del self._rendered[key]
+            template = self.env.get_template(name)
+            self._templates[name] = (template, self._mtime(name))
+            return template
+
+    def render(self, name: str, /, **context: Any) -> str:
+        """Renderiza `name` com memoização por contexto (use para entradas de domínio finito)."""
+        template = self.get(name)
+        try:
+            key = (name, tuple(sorted(context.items())))
+            hash(key)
+        except TypeError:
+            return template.render(**context)
+        with self._lock:
+            rendered = self._rendered.get(key)
+            if rendered is not None:
+                self._rendered.move_to_end(key)
+                self.hits += 1
+                return rendered
+            self.misses += 1
+        rendered = template.render(**context)
+        with self._lock:
+            self._rendered[key] = rendered
+            while len(self._rendered) > self.render_cache_max_entries:
+                self._rendered.popitem(last=False)
+        return rendered
+
+
+_registries: dict[tuple, PromptRegistry] = {}
+_registries_lock = threading.Lock()
+
+
+def shared_prompt_registry(policy_path: Path | None = None) -> PromptRegistry:
+    """Registro do processo para a configuração da seção `prompts` (compartilhado entre agentes)."""
+    policy = policy_section("prompts", policy_path)
+    auto_reload = bool(policy.get("auto_reload", False))
+    bytecode_cache = bool(policy.get("bytecode_cache", True))
+    max_entries = policy.get("render_cache_max_entries", 1024)
+    key = (auto_reload, bytecode_cache, max_entries)
+    with _registries_lock:
+        registry = _registries.get(key)
+        if registry is None:
+            registry = _registries[key] = PromptRegistry(
+                auto_reload=auto_reload,
+                bytecode_cache=bytecode_cache,
+                render_cache_max_entries=max_entries,
+            )
+        return registry
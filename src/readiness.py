@@ -0,0 +1,86 @@
+"""
+Sinal de prontidão para cold start (scale-from-zero).
+
+Os módulos do agente não importam os SDKs pesados (ADK, google-genai, tiktoken) no import; eles
+são carregados no `warm_up()` de cada componente. `start_warm_up` dispara esses warm-ups em
+threads de background e devolve um `Readiness` que o processo pode expor (health check) ou
+aguardar antes de aceitar tráfego.
+
+Uso:
+    readiness = start_warm_up(agent, telemetry)
+    ...
+    readiness.wait(timeout=30)
+"""
+
+import logging
+import threading
+import time
+from collections.abc import Callable
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+
+class Readiness:
+    """
+    Estado dos warm-ups em background. `ready` fica True quando todos terminam; um warm-up que
+    falha não impede a prontidão (o componente refaz o trabalho no primeiro uso), mas o erro fica
+    em `errors`.
+    """
+
+    def __init__(self):
+        self.durations_s: dict[str, float] = {}
+        self.errors: dict[str, str] = {}
+        self._pending: set[str] = set()
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._done.set()
+
+    @property
+    def ready(self) -> bool:
+        return self._done.is_set()
+
+    def wait(self, timeout: float | None = None) -> bool:
+        """Bloqueia até todos os warm-ups terminarem; retorna `ready`."""
+        return self._done.wait(timeout)
+
+    def status(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "ready": self.ready,
+                "pending": sorted(self._pending),
+                "durations_ms": {k: round(v * 1000, 1) for k, v in self.durations_s.items()},
+                "errors": dict(self.errors),
+            }
+
+    def start(self, tasks: dict[str, Callable[[], Any]]) -> None:
+        """Executa cada tarefa numa thread daemon e registra duração ou erro sob o seu nome."""
+        with self._lock:
+            # Todas ficam pendentes antes da primeira thread iniciar: `ready` não pisca entre elas.
+            self._pending.update(tasks)
+            if self._pending:
+                self._done.clear()
+        for name, fn in tasks.items():
+            threading.Thread(target=self._run, args=(name, fn), name=f"warm-up-{name}", daemon=True).start()
+
+    def _run(self, name: str, fn: Callable[[], Any]) -> None:
+        start = time.perf_counter()
+        try:
+            fn()
+        except Exception as e:
+            logger.warning("Warm-up de %s falhou: %s", name, e)
+            with self._lock:
+                self.errors[name] = f"{type(e).__name__}: {e}"
+        finally:
+            with self._lock:
+                self.durations_s[name] = time.perf_counter() - start
+                self._pending.discard(name)
+                if not self._pending:
+                    self._done.set()
+
+
+def start_warm_up(*components: Any) -> Readiness:
+    """Dispara `warm_up()` de cada componente em background (ex: agente, telemetria)."""
+    readiness = Readiness()
+    readiness.start({type(component).__name__: component.warm_up for component in components})
+    return readiness
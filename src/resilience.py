@@ -0,0 +1,504 @@
+"""
+Primitivas de resiliência assíncronas compartilhadas pelos Gateways.
+
+O backoff roda no event loop (asyncio.sleep via tenacity.AsyncRetrying): uma tempestade de 429
+não prende threads do executor em time.sleep. Cada gateway tem seu RetryBudget e todos dividem
+um TokenBucket de retries, então o volume de retries fica limitado mesmo sob throttling em massa.
+O CircuitBreaker corta as chamadas a um backend fora do ar: com o circuito aberto cada chamada
+falha em microssegundos e só sondas em background tocam o backend até ele voltar. O Hedger ataca a
+cauda de latência: uma chamada que passa do p95 observado ganha uma cópia, e vence a primeira.
+"""
+
+import asyncio
+import functools
+import logging
+import threading
+import time
+from collections import deque
+from collections.abc import AsyncIterator, Awaitable, Callable, Hashable
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, TypeVar
+
+from tenacity import AsyncRetrying, wait_random_exponential
+
+from src.exceptions import CircuitOpenError, OverloadedError
+from src.policy import policy_section
+
+if TYPE_CHECKING:
+    from src.deadline import TurnBudget
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class TokenBucket:
+    """Token bucket thread-safe: `rate_per_s` tokens/segundo até `capacity`."""
+
+    def __init__(self, rate_per_s: float, capacity: float):
+        self.rate_per_s = rate_per_s
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        """Consome `tokens` se disponíveis; nunca bloqueia."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate_per_s)
+            self._updated = now
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return True
+            return False
+
+    async def acquire(self, tokens: float = 1.0) -> None:
+        """Aguarda (sem bloquear o event loop) até haver `tokens` disponíveis; usado como rate limiter."""
+        while not self.try_acquire(tokens):
+            await asyncio.sleep(tokens / self.rate_per_s)
+
+
+class RetryBudget:
+    """
+    Orçamento de retries por gateway: cada requisição deposita `ratio` tokens e cada retry
+    consome 1. Com ratio=0.2, no máximo ~20% das chamadas viram retry (além da reserva inicial).
+    """
+
+    def __init__(self, ratio: float = 0.2, reserve: float = 10.0, max_tokens: float = 100.0):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self._tokens = reserve
+        self._lock = threading.Lock()
+
+    def record_request(self) -> None:
+        with self._lock:
+            self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def try_withdraw(self) -> bool:
+        with self._lock:
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                return True
+            return False
+
+
+@dataclass(frozen=True)
+class RetrySettings:
+    """Parâmetros de retry (seção `retry` do memory_policy.yaml)."""
+
+    max_attempts: int = 3
+    initial_wait_s: float = 1.0
+    max_wait_s: float = 10.0
+    budget_ratio: float = 0.2
+    budget_reserve: float = 10.0
+    bucket_rate_per_s: float = 50.0
+    bucket_capacity: float = 100.0
+
+    @classmethod
+    def from_policy(cls, config_path: Path | str | None = None) -> "RetrySettings":
+        section = policy_section("retry", config_path)
+        return cls(**{k: v for k, v in section.items() if k in cls.__dataclass_fields__})
+
+
+_shared_bucket: TokenBucket | None = None
+_shared_bucket_lock = threading.Lock()
+
+
+def shared_retry_bucket(settings: RetrySettings) -> TokenBucket:
+    """TokenBucket de retries do processo (criado na primeira chamada, compartilhado entre gateways)."""
+    global _shared_bucket
+    with _shared_bucket_lock:
+        if _shared_bucket is None:
+            _shared_bucket = TokenBucket(settings.bucket_rate_per_s, settings.bucket_capacity)
+        return _shared_bucket
+
+
+class AsyncRetrier:
+    """
+    Retry assíncrono com Exponential Backoff + full jitter.
+    Um retry só acontece se o erro for retentável, o RetryBudget do gateway permitir e houver
+    token no bucket compartilhado; caso contrário o erro é propagado imediatamente.
+    """
+
+    def __init__(
+        self,
+        settings: RetrySettings | None = None,
+        *,
+        budget: RetryBudget | None = None,
+        bucket: TokenBucket | None = None,
+    ):
+        self.settings = settings or RetrySettings()
+        self.budget = budget or RetryBudget(self.settings.budget_ratio, self.settings.budget_reserve)
+        self.bucket = bucket or shared_retry_bucket(self.settings)
+        self.retries = 0
+        self.denied_retries = 0
+
+    def _withdraw_retry(self) -> bool:
+        if self.budget.try_withdraw() and self.bucket.try_acquire():
+            self.retries += 1
+            return True
+        self.denied_retries += 1
+        return False
+
+    def _should_stop(self, state: Any, deadline: "TurnBudget | None") -> bool:
+        # Avaliado depois do sorteio do backoff: o budget só é consumido por um retry que vai acontecer.
+        if state.attempt_number >= self.settings.max_attempts:
+            return True
+        if deadline is not None and state.upcoming_sleep >= deadline.remaining():
+            return True
+        return not self._withdraw_retry()
+
+    async def call(
+        self,
+        fn: Callable[..., Awaitable[T]],
+        *args: Any,
+        retry_if: Callable[[BaseException], bool] = lambda _e: True,
+        on_retry: Callable[[BaseException], None] | None = None,
+        deadline: "TurnBudget | None" = None,
+        **kwargs: Any,
+    ) -> T:
+        """
+        Executa `await fn(*args, **kwargs)` com retry; re-levanta o último erro ao desistir.
+        `on_retry(exc)` é chamado antes de cada backoff; `deadline` impede backoffs além do turno.
+        """
+        self.budget.record_request()
+        retrying = AsyncRetrying(
+            stop=lambda state: self._should_stop(state, deadline),
+            wait=wait_random_exponential(
+                multiplier=self.settings.initial_wait_s,
+                max=self.settings.max_wait_s,
+            ),
+            retry=lambda state: (
+                state.outcome.failed
+                and isinstance(state.outcome.exception(), Exception)
+                and retry_if(state.outcome.exception())
+            ),
+            before_sleep=(lambda state: on_retry(state.outcome.exception())) if on_retry else None,
+            reraise=True,
+        )
+        return await retrying(fn, *args, **kwargs)
+
+
+@dataclass(frozen=True)
+class BreakerSettings:
+    """Parâmetros do circuit breaker (subseção `circuit_breaker` da seção do backend no memory_policy.yaml)."""
+
+    window_size: int = 50
+    min_calls: int = 20
+    error_rate_threshold: float = 0.8
+    slow_call_s: float = 2.0
+    slow_call_rate_threshold: float = 0.8
+    open_duration_s: float = 30.0
+    probe_timeout_s: float = 5.0
+
+    @classmethod
+    def from_policy(cls, section: str, config_path: Path | str | None = None) -> "BreakerSettings":
+        policy = policy_section(section, config_path).get("circuit_breaker") or {}
+        return cls(**{k: v for k, v in policy.items() if k in cls.__dataclass_fields__})
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker com estados closed → open → half_open.
+
+    Closed: as chamadas passam e o resultado (falha, lentidão acima de `slow_call_s`) entra numa
+    janela das últimas `window_size` chamadas; com `min_calls` na janela, taxa de erro ou de
+    chamadas lentas acima do limite abre o circuito. Open: toda chamada levanta CircuitOpenError
+    sem tocar o backend. Após `open_duration_s` o circuito fica half_open: com `probe`, uma sonda
+    em background decide (sucesso fecha, falha reabre) e as chamadas continuam falhando rápido;
+    sem `probe`, uma única chamada de teste passa. `on_transition(name, old, new)` recebe cada
+    mudança de estado (logs, métricas, alertas).
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        name: str,
+        settings: BreakerSettings | None = None,
+        *,
+        probe: Callable[[], Awaitable[Any]] | None = None,
+        on_transition: Callable[[str, str, str], None] | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.settings = settings or BreakerSettings()
+        self.probe = probe
+        self.on_transition = on_transition
+        self.clock = clock
+        self.state = self.CLOSED
+        self.rejected = 0
+        self._window: deque[tuple[bool, bool]] = deque(maxlen=self.settings.window_size)
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._probe_task: asyncio.Task | None = None
+
+    def _transition(self, new_state: str) -> None:
+        old_state, self.state = self.state, new_state
+        if old_state == new_state:
+            return
+        log = logger.warning if new_state == self.OPEN else logger.info
+        log("Circuit breaker %s: %s -> %s", self.name, old_state, new_state)
+        if self.on_transition is not None:
+            self.on_transition(self.name, old_state, new_state)
+
+    def _open(self) -> None:
+        self._opened_at = self.clock()
+        self._window.clear()
+        self._trial_in_flight = False
+        self._transition(self.OPEN)
+        if self.probe is not None:
+            self._ensure_probe()
+
+    def _close(self) -> None:
+        self._window.clear()
+        self._trial_in_flight = False
+        self._transition(self.CLOSED)
+
+    def _record(self, failed: bool, duration_s: float) -> None:
+        if self.state == self.HALF_OPEN:
+            # Chamada de teste (sem probe): decide sozinha o próximo estado.
+            if failed:
+                self._open()
+            else:
+                self._close()
+            return
+        self._window.append((failed, duration_s >= self.settings.slow_call_s))
+        calls = len(self._window)
+        if calls < self.settings.min_calls:
+            return
+        failures = sum(f for f, _ in self._window)
+        slow = sum(s for _, s in self._window)
+        if (
+            failures / calls >= self.settings.error_rate_threshold
+            or slow / calls >= self.settings.slow_call_rate_threshold
+        ):
+            self._open()
+
+    def _ensure_probe(self) -> None:
+        task = self._probe_task
+        if task is not None and not task.done() and not task.get_loop().is_closed():
+            return
+        self._probe_task = asyncio.get_running_loop().create_task(self._probe_until_closed())
+
+    async def _probe_until_closed(self) -> None:
+        while self.state != self.CLOSED:
+            delay = self._opened_at + self.settings.open_duration_s - self.clock()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._transition(self.HALF_OPEN)
+            try:
+                await asyncio.wait_for(self.probe(), self.settings.probe_timeout_s)
+            except Exception as e:
+                logger.info("Sonda do circuit breaker %s falhou: %s", self.name, e)
+                self._open()
+            else:
+                self._close()
+
+    def _admit(self) -> None:
+        """Levanta CircuitOpenError se a chamada não pode tocar o backend agora."""
+        if self.state == self.CLOSED:
+            return
+        if self.probe is not None:
+            self._ensure_probe()
+        elif self.state == self.OPEN and self.clock() - self._opened_at >= self.settings.open_duration_s:
+            self._transition(self.HALF_OPEN)
+        if self.state == self.HALF_OPEN and self.probe is None and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return
+        self.rejected += 1
+        raise CircuitOpenError(f"Circuito {self.name} {self.state}")
+
+    async def call(self, fn: Callable[..., Awaitable[T]], *args: Any, **kwargs: Any) -> T:
+        """Executa `await fn(*args, **kwargs)` se o circuito permitir e registra o resultado."""
+        self._admit()
+        start = self.clock()
+        try:
+            result = await fn(*args, **kwargs)
+        except OverloadedError:
+            # Rejeição local (executor cheio): o backend não foi chamado, não conta na janela.
+            self._trial_in_flight = False
+            raise
+        except Exception:
+            self._record(True, self.clock() - start)
+            raise
+        except BaseException:
+            # Cancelada (ex: deadline do turno): a chamada de teste não decidiu; libera a vaga.
+            self._trial_in_flight = False
+            raise
+        self._record(False, self.clock() - start)
+        return result
+
+
+@dataclass(frozen=True)
+class HedgeSettings:
+    """Parâmetros de hedging (subseção `hedging` da seção do backend no memory_policy.yaml)."""
+
+    enabled: bool = False
+    quantile: float = 0.95
+    max_hedge_ratio: float = 0.05
+    min_samples: int = 50
+    window_size: int = 500
+    min_delay_s: float = 0.005
+
+    @classmethod
+    def from_policy(cls, section: str, config_path: Path | str | None = None) -> "HedgeSettings":
+        policy = policy_section(section, config_path).get("hedging") or {}
+        return cls(**{k: v for k, v in policy.items() if k in cls.__dataclass_fields__})
+
+
+def _discard_exception(task: asyncio.Future) -> None:
+    """Marca a exceção de uma task descartada como lida (sem "Task exception was never retrieved")."""
+    if not task.cancelled():
+        task.exception()
+
+
+class Hedger:
+    """
+    Hedged requests para leituras idempotentes. Se a chamada não terminar até o quantil
+    `quantile` das últimas `window_size` latências da chamada original, uma segunda chamada
+    idêntica é disparada; a primeira resposta bem-sucedida vence. Se a original vence, a cópia é
+    cancelada; se a cópia vence, a original termina em segundo plano para que a sua latência
+    real entre na janela (a cauda não encolhe com os hedges). Um RetryBudget com
+    `max_hedge_ratio` limita os hedges a essa fração do tráfego. `on_hedge(won)` recebe cada hedge
+    disparado, com `won=True` se a cópia respondeu primeiro.
+    """
+
+    def __init__(
+        self,
+        settings: HedgeSettings | None = None,
+        *,
+        on_hedge: Callable[[bool], None] | None = None,
+    ):
+        self.settings = settings or HedgeSettings()
+        self.on_hedge = on_hedge
+        self.budget = RetryBudget(self.settings.max_hedge_ratio, reserve=0.0, max_tokens=10.0)
+        self.calls = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self._latencies: deque[float] = deque(maxlen=self.settings.window_size)
+        # Originais que perderam para a cópia e seguem até terminar (referência forte até lá).
+        self._draining: set[asyncio.Future] = set()
+
+    def _record_primary(self, start: float, task: asyncio.Future) -> None:
+        if not task.cancelled() and task.exception() is None:
+            self._latencies.append(time.perf_counter() - start)
+
+    def hedge_delay(self) -> float | None:
+        """Espera antes do hedge (quantil observado), ou None enquanto não há amostras suficientes."""
+        if len(self._latencies) < self.settings.min_samples:
+            return None
+        ordered = sorted(self._latencies)
+        index = min(len(ordered) - 1, int(self.settings.quantile * len(ordered)))
+        return max(self.settings.min_delay_s, ordered[index])
+
+    async def call(self, fn: Callable[..., Awaitable[T]], *args: Any, **kwargs: Any) -> T:
+        """Executa `await fn(*args, **kwargs)`, com uma cópia se a primeira passar do quantil."""
+        if not self.settings.enabled:
+            return await fn(*args, **kwargs)
+        self.calls += 1
+        self.budget.record_request()
+        delay = self.hedge_delay()
+        start = time.perf_counter()
+        primary = asyncio.ensure_future(fn(*args, **kwargs))
+        primary.add_done_callback(functools.partial(self._record_primary, start))
+        hedge: asyncio.Future | None = None
+        pending = {primary}
+        winner = None
+        try:
+            if delay is not None:
+                done, _ = await asyncio.wait(pending, timeout=delay)
+                if not done and self.budget.try_withdraw():
+                    hedge = asyncio.ensure_future(fn(*args, **kwargs))
+                    # Se as duas falharem, só uma exceção sobe: a da outra é recolhida aqui.
+                    hedge.add_done_callback(_discard_exception)
+                    pending.add(hedge)
+                    self.hedged += 1
+            while pending and winner is None:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                # Se a primeira a terminar falhou, a outra ainda pode responder.
+                winner = next((t for t in done if t.exception() is None), None)
+            if hedge is not None:
+                self.hedge_wins += winner is hedge
+                if self.on_hedge is not None:
+                    self.on_hedge(winner is hedge)
+            if winner is None:
+                return done.pop().result()
+            return winner.result()
+        finally:
+            for task in pending:
+                if task is primary and winner is not None:
+                    self._draining.add(task)
+                    task.add_done_callback(self._draining.discard)
+                else:
+                    task.cancel()
+
+
+@dataclass
+class LockStats:
+    """Métricas do lock por sessão: `contended` conta turnos que esperaram outro da mesma sessão
+    (cada um seria um ConcurrentWriteError sem o lock)."""
+
+    acquisitions: int = 0
+    contended: int = 0
+    wait_s_total: float = 0.0
+    wait_s_max: float = 0.0
+
+
+class _LockEntry:
+    __slots__ = ("lock", "users")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.users = 0
+
+
+class KeyedAsyncLock:
+    """
+    Lock assíncrono por chave (ex: session_id). Turnos da mesma chave são serializados; chaves
+    diferentes seguem em paralelo. A entrada é removida assim que ninguém a segura nem espera,
+    então a memória é proporcional aos turnos em voo, não ao número de sessões já vistas.
+    """
+
+    def __init__(self):
+        self.stats = LockStats()
+        self._entries: dict[Hashable, _LockEntry] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @asynccontextmanager
+    async def hold(self, key: Hashable) -> AsyncIterator[float]:
+        """Adquire o lock de `key`; o valor do contexto é o tempo de espera em segundos."""
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._entries[key] = _LockEntry()
+        entry.users += 1
+        contended = entry.lock.locked()
+        start = time.perf_counter()
+        try:
+            await entry.lock.acquire()
+        except BaseException:
+            self._release_ref(key, entry)
+            raise
+        waited = time.perf_counter() - start
+        self.stats.acquisitions += 1
+        if contended:
+            self.stats.contended += 1
+        self.stats.wait_s_total += waited
+        self.stats.wait_s_max = max(self.stats.wait_s_max, waited)
+        try:
+            yield waited
+        finally:
+            entry.lock.release()
+            self._release_ref(key, entry)
+
+    def _release_ref(self, key: Hashable, entry: _LockEntry) -> None:
+        entry.users -= 1
+        if entry.users == 0 and self._entries.get(key) is entry:
+            del self._entries[key]
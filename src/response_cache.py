@@ -0,0 +1,194 @@
+"""
+Cache de respostas do LLM para turnos determinísticos (seção `response_cache` do memory_policy.yaml).
+
+Boa parte do tráfego são aberturas idênticas (`initial_contact`, mesmo tier, sem insights): o
+prompt efetivo é o mesmo e a resposta pode ser reaproveitada sem chamar o modelo. A chave é o hash
+de (system prompt renderizado, mensagem normalizada, insights injetados, histórico da conversa),
+então qualquer diferença no que o modelo veria gera outra chave. Só os estágios da allowlist
+(`stages`) usam o cache; estágios sensíveis a taxa ficam de fora.
+
+Dois níveis: LRU+TTL em memória (AsyncTTLCache) e, com `disk_path`, uma tabela SQLite
+compartilhada entre processos e restarts. As operações de disco rodam em asyncio.to_thread.
+O disco é limitado a `disk_max_entries` (as respostas que expiram primeiro saem antes) e as
+expiradas são varridas a cada `sweep_interval_s`, aproveitando as gravações.
+"""
+
+import asyncio
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections.abc import Callable, Iterable, Sequence
+from pathlib import Path
+
+from src.caching import AsyncTTLCache, CacheStats
+from src.policy import policy_section
+
+_SPACES_RE = re.compile(r"\s+")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    response TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_expires_at ON responses (expires_at);
+"""
+
+
+def normalize_message(message: str) -> str:
+    """Forma canônica da mensagem: NFKC, sem caixa, espaços colapsados e sem pontuação final."""
+    text = unicodedata.normalize("NFKC", message).casefold()
+    return _SPACES_RE.sub(" ", text).strip().rstrip(".!?… ")
+
+
+def response_key(system_prompt: str, message: str, insights: str = "", history: Iterable[str] = ()) -> str:
+    """Hash da entrada efetiva do modelo; `history` são os textos dos turnos anteriores da sessão."""
+    digest = hashlib.blake2b(digest_size=16)
+    for part in (system_prompt, normalize_message(message), insights, *history):
+        data = part.encode("utf-8")
+        # Prefixo de tamanho: fronteiras entre partes não se confundem.
+        digest.update(len(data).to_bytes(8, "little"))
+        digest.update(data)
+    return digest.hexdigest()
+
+
+class _DiskTier:
+    """Tabela SQLite (WAL) de respostas com expiração por relógio de parede e teto de linhas."""
+
+    def __init__(
+        self,
+        path: Path | str,
+        ttl_s: float,
+        *,
+        max_entries: int | None = None,
+        sweep_interval_s: float = 60.0,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self.sweep_interval_s = sweep_interval_s
+        self.clock = clock
+        self._last_sweep = clock()
+        self._sweep_lock = threading.Lock()
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response FROM responses WHERE key = ? AND expires_at > ?", (key, self.clock())
+            ).fetchone()
+        return row[0] if row else None
+
+    def put(self, key: str, response: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, response, expires_at) VALUES (?, ?, ?)",
+                (key, response, self.clock() + self.ttl_s),
+            )
+            if self.max_entries is not None:
+                # Percorre só `max_entries` entradas do índice de expires_at; o excedente sai.
+                self._conn.execute(
+                    "DELETE FROM responses WHERE key IN "
+                    "(SELECT key FROM responses ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                )
+        self._maybe_sweep()
+
+    def _maybe_sweep(self) -> None:
+        if self.clock() - self._last_sweep < self.sweep_interval_s:
+            return
+        if self._sweep_lock.acquire(blocking=False):
+            try:
+                self._last_sweep = self.clock()
+                self.purge_expired()
+            finally:
+                self._sweep_lock.release()
+
+    def purge_expired(self) -> int:
+        with self._lock:
+            return self._conn.execute("DELETE FROM responses WHERE expires_at <= ?", (self.clock(),)).rowcount
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class ResponseCache:
+    """
+    Cache de respostas em dois níveis. `cacheable(stage)` diz se o estágio está na allowlist;
+    `get`/`put` recebem a chave de `response_key`. Hits e misses ficam em `stats`.
+    Desligado (`enabled: false`, o padrão), `cacheable` é sempre falso.
+    `disk_max_entries=None` deixa o disco sem teto (só o TTL limpa).
+    """
+
+    def __init__(
+        self,
+        *,
+        enabled: bool = True,
+        stages: Sequence[str] = ("initial_contact",),
+        max_entries: int = 4096,
+        ttl_s: float = 3600.0,
+        disk_path: Path | str | None = None,
+        disk_max_entries: int | None = 65536,
+        sweep_interval_s: float = 60.0,
+    ):
+        self.enabled = enabled and ttl_s > 0
+        self.stages = frozenset(stages)
+        self.stats = CacheStats()
+        self._memory = AsyncTTLCache(max_entries=max_entries, ttl_s=ttl_s)
+        self._disk = (
+            _DiskTier(disk_path, ttl_s, max_entries=disk_max_entries, sweep_interval_s=sweep_interval_s)
+            if self.enabled and disk_path
+            else None
+        )
+
+    @classmethod
+    def from_policy(cls, config_path: Path | str | None = None) -> "ResponseCache":
+        policy = policy_section("response_cache", config_path)
+        return cls(
+            enabled=bool(policy.get("enabled", False)),
+            stages=policy.get("stages", ["initial_contact"]),
+            max_entries=policy.get("max_entries", 4096),
+            ttl_s=policy.get("ttl_seconds", 3600),
+            disk_path=policy.get("disk_path"),
+            disk_max_entries=policy.get("disk_max_entries", 65536),
+            sweep_interval_s=policy.get("sweep_interval_s", 60),
+        )
+
+    def cacheable(self, stage: str) -> bool:
+        return self.enabled and stage in self.stages
+
+    async def get(self, key: str) -> str | None:
+        found, response = self._memory.get(key)
+        if not found and self._disk is not None:
+            response = await asyncio.to_thread(self._disk.get, key)
+            if response is not None:
+                self._memory.put(key, response)
+        if response is None:
+            self.stats.misses += 1
+        else:
+            self.stats.hits += 1
+        return response
+
+    async def put(self, key: str, response: str) -> None:
+        if not self.enabled or not response:
+            return
+        self._memory.put(key, response)
+        if self._disk is not None:
+            await asyncio.to_thread(self._disk.put, key, response)
+
+    def purge_expired(self) -> int:
+        """Remove do disco as respostas expiradas (a memória expira na leitura); `put` também varre periodicamente."""
+        return self._disk.purge_expired() if self._disk is not None else 0
+
+    def close(self) -> None:
+        if self._disk is not None:
+            self._disk.close()
@@ -1,40 +1,72 @@
-import asyncio
+import contextlib
+import functools
 import logging
 import os
 import uuid
+from collections import OrderedDict
+from collections.abc import Mapping, Sequence
+from pathlib import Path
 from typing import Any
 
-from google.adk.events.event import Event
-from google.adk.events.event_actions import EventActions
-from google.adk.sessions import VertexAiSessionService
-from tenacity import retry, retry_if_exception, retry_if_exception_type, stop_after_attempt, wait_exponential
-
-from src.exceptions import ConcurrentWriteError, SessionRecoveryError
+from src.admission import BoundedExecutor, ExecutorSettings
+from src.deadline import TurnBudget
+from src.exceptions import ConcurrentWriteError, OverloadedError, SessionRecoveryError
+from src.instrumentation import DEGRADED_TOTAL, HEDGES_TOTAL, RETRIES_TOTAL, Instrumentation
+from src.policy import policy_section
+from src.resilience import AsyncRetrier, Hedger, HedgeSettings, KeyedAsyncLock, RetrySettings
+from src.session_sharding import APP_NAME, DEFAULT_USER_ID, SessionShard, ShardingStrategy, sharding_from_policy
 from src.state_models import NegotiationState
 
 logger = logging.getLogger(__name__)
 
-# Nomes usados na API de sessões do ADK (app_name / user_id)
-APP_NAME = "agente-3-the-memory"
-USER_ID = "default"
+# Usuário do layout legado (todas as sessões sob um único user_id); mantido por compatibilidade.
+USER_ID = DEFAULT_USER_ID
+
+# Limite do cache de versões vistas (single_writer); LRU para manter memória estável.
+SEEN_VERSIONS_MAX = 10_000
+
+
+def _session_id(session: Any) -> str | None:
+    return getattr(session, "id", None) or getattr(session, "session_id", None)
+
+
+def _user_id(session: Any) -> str:
+    return getattr(session, "user_id", None) or DEFAULT_USER_ID
 
-# Política de retry: Exponential Backoff para throttling (429) e falhas transitórias
-RETRY_POLICY = dict(
-    stop=stop_after_attempt(3),
-    wait=wait_exponential(multiplier=1, min=2, max=10),
-    retry=retry_if_exception_type(Exception),
-    reraise=True,
-)
+
+def _session_key(user_id: str, session_id: str) -> str:
+    """Chave da sessão no processo (lock e versões vistas): o mesmo session_id pode existir em clientes diferentes."""
+    return f"{user_id}/{session_id}"
+
+
+def _not_occ_conflict(exc: BaseException) -> bool:
+    """Conflito OCC não é transitório: repetir o save não resolve."""
+    return not isinstance(exc, ConcurrentWriteError | OverloadedError)
+
+
+def _not_overloaded(exc: BaseException) -> bool:
+    """Executor cheio: retentar só aumentaria a fila, o turno falha rápido."""
+    return not isinstance(exc, OverloadedError)
 
 
 def _session_state_only(session: Any) -> dict:
     """Extrai apenas o state de sessão (sem prefixos app:, user:, temp:)."""
     state = getattr(session, "state", None) or {}
-    return {
-        k: v
-        for k, v in state.items()
-        if not k.startswith(("app:", "user:", "temp:"))
-    }
+    return {k: v for k, v in state.items() if not k.startswith(("app:", "user:", "temp:"))}
+
+
+def _state_from_session(session: Any, tier: str) -> NegotiationState:
+    """Reconstrói a FSM do state da sessão; sessão vazia ou corrompida recomeça do initial_contact."""
+    session_state = _session_state_only(session)
+    if session_state:
+        try:
+            return NegotiationState(**session_state)
+        except Exception as e:
+            logger.error("Checkpoint corrompido! Resetando. Erro: %s", e)
+    state = NegotiationState(funnel_stage="initial_contact", customer_tier=tier)
+    # O state persistido não tem (ou tem inválido) o FSM: o próximo checkpoint envia o estado completo.
+    state.mark_all_dirty()
+    return state
 
 
 class NegotiationSessionGateway:
@@ -43,46 +75,180 @@ class NegotiationSessionGateway:
     Protege a aplicação se a conexão com o Vertex Session Service falhar, e
     garante a validação do estado usando Pydantic.
     Suporta retry com Exponential Backoff e OCC (Optimistic Concurrency Control).
-    Compatível com a API do Google ADK (get_session/create_session com app_name, user_id; append_event para persistir state).
+    Compatível com a API do Google ADK (get_session/create_session com app_name, user_id;
+    append_event para persistir state). Backends: Vertex, SqliteSessionService
+    (SESSION_SQLITE_PATH ou `session.sqlite_path`) ou o InMemorySessionService do ADK.
     """
 
-    def __init__(self, project_id: str | None = None, location: str | None = None):
+    def __init__(
+        self,
+        project_id: str | None = None,
+        location: str | None = None,
+        *,
+        service: Any | None = None,
+        single_writer: bool | None = None,
+        policy_path: Path | None = None,
+        retrier: AsyncRetrier | None = None,
+        delta_checkpoints: bool | None = None,
+        compaction_event_threshold: int | None = None,
+        compaction_keep_recent_events: int | None = None,
+        instrumentation: Instrumentation | None = None,
+        executor: BoundedExecutor | None = None,
+        sharding: ShardingStrategy | None = None,
+        services: Sequence[Any] | None = None,
+        legacy_service: Any | None = None,
+        legacy_fallback: bool | None = None,
+    ):
         self.project_id = project_id or os.environ.get("GOOGLE_CLOUD_PROJECT")
         self.location = location or os.environ.get("GOOGLE_CLOUD_LOCATION") or os.environ.get("GOOGLE_CLOUD_REGION")
         use_vertex_session = os.environ.get("USE_VERTEX_SESSION", "").strip().lower() in ("1", "true")
+        if single_writer is None:
+            single_writer = os.environ.get("SESSION_SINGLE_WRITER", "").strip().lower() in ("1", "true")
+        self.single_writer = single_writer
+        self._seen_versions: OrderedDict[str, int] = OrderedDict()
+        self._session_locks = KeyedAsyncLock()
+        self.retrier = retrier or AsyncRetrier(RetrySettings.from_policy(policy_path))
+        self.instrumentation = instrumentation or Instrumentation()
+        session_policy = policy_section("session", policy_path)
+        self.delta_checkpoints = (
+            session_policy.get("delta_checkpoints", True) if delta_checkpoints is None else delta_checkpoints
+        )
+        self.compaction_event_threshold = (
+            session_policy.get("compaction_event_threshold", 0)
+            if compaction_event_threshold is None
+            else compaction_event_threshold
+        )
+        self.compaction_keep_recent_events = (
+            session_policy.get("compaction_keep_recent_events", 10)
+            if compaction_keep_recent_events is None
+            else compaction_keep_recent_events
+        )
+        if 0 < self.compaction_event_threshold <= self.compaction_keep_recent_events:
+            # A sessão recém-compactada já estaria no limite: compactaria de novo a cada turno.
+            raise ValueError("compaction_event_threshold deve ser maior que compaction_keep_recent_events")
+        self.hedger = Hedger(HedgeSettings.from_policy("session", policy_path), on_hedge=self._count_hedge)
+        self.compactions = 0
+        self.migrations = 0
+        self.sharding = sharding or sharding_from_policy(session_policy)
+        self.legacy_fallback = (
+            session_policy.get("legacy_fallback", False) if legacy_fallback is None else legacy_fallback
+        )
+        self.executor = executor or BoundedExecutor(
+            "session", ExecutorSettings.from_policy("session", policy_path), instrumentation=self.instrumentation
+        )
 
-        self.is_mock = not (bool(self.project_id) and use_vertex_session)
-        if self.is_mock:
+        sqlite_path = os.environ.get("SESSION_SQLITE_PATH") or session_policy.get("sqlite_path")
+        if service is not None:
+            services = [service]
+        if not services and sqlite_path and not (self.project_id and use_vertex_session):
+            from src.sqlite_session_service import SqliteSessionService
+
+            # Com "{shard}" no caminho, um arquivo por shard: cada um com o seu lock de escrita do WAL.
+            paths = (
+                [sqlite_path.replace("{shard}", f"{shard.index:02d}") for shard in self.sharding.shards]
+                if "{shard}" in sqlite_path
+                else [sqlite_path]
+            )
+            services = [
+                SqliteSessionService(
+                    path,
+                    ttl_hours=session_policy.get("ttl_hours"),
+                    pool_size=session_policy.get("sqlite_pool_size", 4),
+                    sweep_interval_s=session_policy.get("sqlite_sweep_interval_s", 60),
+                    executor=self.executor,
+                )
+                for path in paths
+            ]
+            logger.info("Sessões persistidas em SQLite (WAL): %s", ", ".join(paths))
+
+        self.is_mock = not services and not (bool(self.project_id) and use_vertex_session)
+        # Vertex gera os ids de sessão; demais backends aceitam o session_id do chamador.
+        self._backend_assigns_ids = False
+        if services:
+            self.services = list(services)
+        elif self.is_mock:
             from google.adk.sessions import InMemorySessionService
 
-            self.service = InMemorySessionService()
+            self.services = [InMemorySessionService()]
             if self.project_id:
-                logger.warning(
-                    "Sessao em memoria (USE_VERTEX_SESSION nao ativo). Vertex AI apenas para o modelo LLM."
-                )
+                logger.warning("Sessao em memoria (USE_VERTEX_SESSION nao ativo). Vertex AI apenas para o modelo LLM.")
             else:
                 logger.warning("GOOGLE_CLOUD_PROJECT nao definido. Usando Session Gateway mock em memoria.")
         else:
-            self.service = VertexAiSessionService(self.project_id, self.location)
+            from google.adk.sessions import VertexAiSessionService
+
+            self.services = [VertexAiSessionService(self.project_id, self.location)]
+            self._backend_assigns_ids = True
+        # Instância do shard 0; com uma só instância, o Session Service de todas as sessões.
+        self.service = self.services[0]
+        # Onde estão as sessões do layout legado (app_name APP_NAME, user_id DEFAULT_USER_ID).
+        self.legacy_service = legacy_service or self.service
+
+    def warm_up(self) -> None:
+        """Pré-carrega o SDK usado no checkpoint (o import é tardio para não pesar no cold start)."""
+        from google.adk.events.event import Event  # noqa: F401
+
+    @property
+    def lock_stats(self):
+        """Espera acumulada/máxima e número de conflitos OCC evitados pelo lock por sessão."""
+        return self._session_locks.stats
 
-    @retry(**RETRY_POLICY)
-    def _recover_or_create_sync(self, session_id: str, tier: str) -> tuple[Any, NegotiationState]:
-        """Lógica síncrona com retry; chamada via asyncio.to_thread a partir de recover_or_create."""
+    def session_lock(self, session_id: str, user_id: str | None = None):
+        """
+        Context manager async que serializa turnos da mesma sessão neste processo (sessões
+        diferentes seguem em paralelo), evitando conflitos OCC e chamadas de LLM desperdiçadas.
+        """
+        return self._session_locks.hold(_session_key(user_id or DEFAULT_USER_ID, session_id))
+
+    def shard_for(self, user_id: str | None = None) -> SessionShard:
+        """
+        Partição (app_name e instância) das sessões do cliente: as sessões ficam sob `user_id` = id
+        do cliente e o `sharding` (`session.shards`) escolhe o shard entre `services`. Com SQLite,
+        `{shard}` no caminho abre um arquivo por shard.
+        """
+        return self.sharding.shard_for(user_id or DEFAULT_USER_ID)
+
+    def service_for(self, shard: SessionShard) -> Any:
+        """Instância de Session Service que guarda o shard."""
+        return self.services[shard.index % len(self.services)]
+
+    def _route(self, user_id: str) -> tuple[Any, str]:
+        shard = self.sharding.shard_for(user_id)
+        return self.service_for(shard), shard.app_name
+
+    def _remember_version(self, session: Any, version: int) -> None:
+        """Registra a última versão persistida/lida desta sessão (cache LRU do single_writer)."""
+        session_id = _session_id(session)
+        if not session_id:
+            return
+        key = _session_key(_user_id(session), session_id)
+        self._seen_versions[key] = version
+        self._seen_versions.move_to_end(key)
+        if len(self._seen_versions) > SEEN_VERSIONS_MAX:
+            self._seen_versions.popitem(last=False)
+
+    def _recover_or_create_sync(
+        self, session_id: str, tier: str, user_id: str, create: bool = True
+    ) -> tuple[Any, NegotiationState] | None:
+        """
+        Uma tentativa síncrona; chamada no executor do gateway (`session.executor`, isolado da busca
+        vetorial; cheio, levanta OverloadedError). O retry fica no event loop.
+        Com `create=False`, devolve None se a sessão não existir (a migração legada decide antes).
+        """
+        service, app_name = self._route(user_id)
         try:
-            session = self.service.get_session_sync(
-                app_name=APP_NAME,
-                user_id=USER_ID,
-                session_id=session_id,
-            )
+            session = service.get_session_sync(app_name=app_name, user_id=user_id, session_id=session_id)
         except Exception as e:
             raise SessionRecoveryError(f"Falha ao recuperar Checkpoint ADK para {session_id}: {str(e)}") from e
 
         if session is None:
+            if not create:
+                return None
             state = NegotiationState(funnel_stage="initial_contact", customer_tier=tier)
             try:
-                session = self.service.create_session_sync(
-                    app_name=APP_NAME,
-                    user_id=USER_ID,
+                session = service.create_session_sync(
+                    app_name=app_name,
+                    user_id=user_id,
                     session_id=session_id,
                     state=state.model_dump(),
                 )
@@ -90,54 +256,113 @@ class NegotiationSessionGateway:
                 raise SessionRecoveryError(f"Falha ao criar sessão ADK para {session_id}: {str(e)}") from e
             return session, state
 
-        session_state = _session_state_only(session)
-        if not session_state:
-            state = NegotiationState(funnel_stage="initial_contact", customer_tier=tier)
-        else:
-            try:
-                state = NegotiationState(**session_state)
-            except Exception as e:
-                logger.error("Checkpoint corrompido! Resetando. Erro: %s", e)
-                state = NegotiationState(funnel_stage="initial_contact", customer_tier=tier)
+        return session, _state_from_session(session, tier)
+
+    def _count_hedge(self, won: bool) -> None:
+        self.instrumentation.increment(HEDGES_TOTAL, gateway="session", outcome="won" if won else "lost")
+
+    async def _get_session(self, session_id: str, user_id: str) -> Any:
+        """Leitura da sessão pela API async; com `session.hedging` vira hedged request (leitura idempotente)."""
+        service, app_name = self._route(user_id)
+        return await self.hedger.call(service.get_session, app_name=app_name, user_id=user_id, session_id=session_id)
+
+    async def get_session(self, session_id: str, *, user_id: str | None = None) -> Any | None:
+        """Sessão ADK completa (estado e eventos), ou None se não existir; usada pela ingestão."""
+        return await self._get_session(session_id, user_id or DEFAULT_USER_ID)
+
+    async def list_customer_sessions(self, user_id: str) -> list[Any]:
+        """Sessões do cliente (sem eventos); lê só a partição dele, não o keyspace inteiro."""
+        service, app_name = self._route(user_id)
+        response = await service.list_sessions(app_name=app_name, user_id=user_id)
+        return list(response.sessions)
+
+    async def append_event(self, session: Any, event: Any) -> Any:
+        """append_event na instância de Session Service do shard da sessão."""
+        service, _ = self._route(_user_id(session))
+        return await service.append_event(session=session, event=event)
+
+    def _retry_counter(self, operation: str):
+        def count(exc: BaseException) -> None:
+            self.instrumentation.increment(
+                RETRIES_TOTAL, gateway="session", operation=operation, error=type(exc).__name__
+            )
 
+        return count
+
+    async def recover_or_create(
+        self,
+        session_id: str,
+        tier: str = "standard",
+        *,
+        user_id: str | None = None,
+        deadline: TurnBudget | None = None,
+    ) -> tuple[Any, NegotiationState]:
+        """
+        Recupera sessão (ou cria) de forma não bloqueante, com retry em caso de falha de rede.
+        `user_id` é o id do cliente (partição da sessão; sem ele, DEFAULT_USER_ID).
+        """
+        user_id = user_id or DEFAULT_USER_ID
+        fallback = self.legacy_fallback and user_id != DEFAULT_USER_ID
+        attempt = functools.partial(
+            self.retrier.call,
+            self._recover_attempt,
+            session_id,
+            tier,
+            user_id,
+            retry_if=_not_overloaded,
+            on_retry=self._retry_counter("recover"),
+            deadline=deadline,
+        )
+        recovered = await attempt(not fallback)
+        if recovered is None:
+            migrated = await self.migrate_legacy_session(session_id, user_id)
+            if migrated is not None:
+                recovered = migrated, _state_from_session(migrated, tier)
+            else:
+                recovered = await attempt(True)
+        session, state = recovered
+        self._remember_version(session, state.version)
         return session, state
 
-    async def recover_or_create(self, session_id: str, tier: str = "standard") -> tuple[Any, NegotiationState]:
-        """Recupera sessão (ou cria) de forma não bloqueante, com retry em caso de falha de rede."""
+    async def _recover_attempt(
+        self, session_id: str, tier: str, user_id: str, create: bool
+    ) -> tuple[Any, NegotiationState] | None:
         if self.is_mock:
-            return await asyncio.to_thread(self._recover_or_create_sync, session_id, tier)
-        # Vertex: só API async
+            return await self.executor.run(self._recover_or_create_sync, session_id, tier, user_id, create)
+        return await self._recover_or_create_async(session_id, tier, user_id, create)
+
+    async def _recover_or_create_async(
+        self, session_id: str, tier: str, user_id: str, create: bool = True
+    ) -> tuple[Any, NegotiationState] | None:
+        """Caminho async (Vertex ou serviço injetado)."""
         try:
-            session = await self.service.get_session(
-                app_name=APP_NAME, user_id=USER_ID, session_id=session_id
-            )
+            session = await self._get_session(session_id, user_id)
+        except OverloadedError:
+            raise
         except Exception as e:
             raise SessionRecoveryError(f"Falha ao recuperar Checkpoint ADK para {session_id}: {str(e)}") from e
         if session is None:
+            if not create:
+                return None
             state = NegotiationState(funnel_stage="initial_contact", customer_tier=tier)
-            session = await self.service.create_session(
-                app_name=APP_NAME, user_id=USER_ID, state=state.model_dump()
+            create_kwargs = {} if self._backend_assigns_ids else {"session_id": session_id}
+            service, app_name = self._route(user_id)
+            session = await service.create_session(
+                app_name=app_name, user_id=user_id, state=state.model_dump(), **create_kwargs
             )
             return session, state
-        session_state = _session_state_only(session)
-        if not session_state:
-            state = NegotiationState(funnel_stage="initial_contact", customer_tier=tier)
-        else:
-            try:
-                state = NegotiationState(**session_state)
-            except Exception as e:
-                logger.error("Checkpoint corrompido! Resetando. Erro: %s", e)
-                state = NegotiationState(funnel_stage="initial_contact", customer_tier=tier)
-        return session, state
+        return session, _state_from_session(session, tier)
 
     def _occ_check_and_bump_sync(self, session: Any, state: NegotiationState) -> None:
         """Verifica OCC e incrementa versão; falha com ConcurrentWriteError se houver conflito."""
-        session_id = getattr(session, "id", None) or getattr(session, "session_id", None)
+        session_id = _session_id(session)
+        user_id = _user_id(session)
+        service, app_name = self._route(user_id)
         try:
             current = (
-                self.service.get_session_sync(
-                    app_name=APP_NAME,
-                    user_id=USER_ID,
+                service.get_session_sync(
+                    app_name=app_name,
+                    user_id=user_id,
                     session_id=session_id,
                 )
                 if session_id
@@ -156,47 +381,165 @@ class NegotiationSessionGateway:
             )
         state.bump_version()
 
-    def _save_checkpoint_sync_retry(self, session: Any, state: NegotiationState) -> None:
-        """Executa OCC check e bump; o persist real é feito via append_event no save_checkpoint async."""
-        @retry(
-            stop=stop_after_attempt(3),
-            wait=wait_exponential(multiplier=1, min=2, max=10),
-            retry=retry_if_exception(lambda e: not isinstance(e, ConcurrentWriteError)),
-            reraise=True,
-        )
-        def _do():
-            self._occ_check_and_bump_sync(session, state)
-
-        _do()
+    async def _occ_check_and_bump_async(self, session: Any, state: NegotiationState) -> None:
+        """OCC pela API async (Vertex ou serviço injetado)."""
+        session_id = _session_id(session)
+        current = await self._get_session(session_id, _user_id(session))
+        if current is None:
+            raise SessionRecoveryError(f"Sessão {session_id} não encontrada ao salvar checkpoint.")
+        current_state = _session_state_only(current)
+        current_version = current_state.get("version", 1)
+        if current_version != state.version:
+            raise ConcurrentWriteError(f"OCC conflict: expected version {state.version}, found {current_version}.")
+        state.bump_version()
 
-    async def save_checkpoint(self, session: Any, state: NegotiationState) -> None:
-        """Salva a FSM atualizada (OCC) via append_event com state_delta."""
-        if self.is_mock:
+    async def save_checkpoint(
+        self, session: Any, state: NegotiationState, *, deadline: TurnBudget | None = None
+    ) -> None:
+        """
+        Salva a FSM atualizada (OCC) via append_event com state_delta; `deadline` limita os retries.
+        Históricos acima de `session.compaction_event_threshold` são compactados em seguida.
+        """
+        service, _ = self._route(_user_id(session))
+        backend_cas = getattr(service, "supports_version_cas", False)
+        seen = self._seen_versions.get(_session_key(_user_id(session), _session_id(session)))
+        if backend_cas or (self.single_writer and seen == state.version):
+            # OCC garantido pelo backend (CAS no append) ou único writer com versão conhecida:
+            # sem re-fetch da sessão.
+            state.bump_version()
+        else:
+            check = (
+                functools.partial(self.executor.run, self._occ_check_and_bump_sync)
+                if self.is_mock
+                else self._occ_check_and_bump_async
+            )
             try:
-                await asyncio.to_thread(self._save_checkpoint_sync_retry, session, state)
+                await self.retrier.call(
+                    check,
+                    session,
+                    state,
+                    retry_if=_not_occ_conflict,
+                    on_retry=self._retry_counter("checkpoint"),
+                    deadline=deadline,
+                )
             except ConcurrentWriteError:
+                self.instrumentation.increment(DEGRADED_TOTAL, gateway="session", reason="occ_conflict")
+                raise
+            except OverloadedError:
+                self.instrumentation.increment(DEGRADED_TOTAL, gateway="session", reason="overloaded")
                 raise
             except Exception as e:
                 logger.error("CRÍTICO: Falha ao salvar checkpoint ADK após retries. Causa: %s", e)
+                self.instrumentation.increment(DEGRADED_TOTAL, gateway="session", reason="checkpoint_failed")
                 raise
-        else:
-            session_id = getattr(session, "id", None) or getattr(session, "session_id", None)
-            current = await self.service.get_session(
-                app_name=APP_NAME, user_id=USER_ID, session_id=session_id
-            )
-            if current is None:
-                raise SessionRecoveryError(f"Sessão {session_id} não encontrada ao salvar checkpoint.")
-            current_state = _session_state_only(current)
-            current_version = current_state.get("version", 1)
-            if current_version != state.version:
-                raise ConcurrentWriteError(
-                    f"OCC conflict: expected version {state.version}, found {current_version}."
-                )
-            state.bump_version()
+
+        state_delta = state.dirty_delta() if self.delta_checkpoints else state.model_dump()
+        # Import tardio: o SDK do ADK só é carregado no primeiro checkpoint (ou no warm-up).
+        from google.adk.events.event import Event
+        from google.adk.events.event_actions import EventActions
 
         event = Event(
             author="StatefulFinanceAgent",
             invocation_id=str(uuid.uuid4()),
-            actions=EventActions(state_delta=state.model_dump()),
+            actions=EventActions(state_delta=state_delta),
         )
-        await self.service.append_event(session=session, event=event)
+        try:
+            await service.append_event(session=session, event=event)
+        except ConcurrentWriteError:
+            self.instrumentation.increment(DEGRADED_TOTAL, gateway="session", reason="occ_conflict")
+            raise
+        state.mark_clean()
+        self._remember_version(session, state.version)
+
+        if self.compaction_event_threshold > 0:
+            events = getattr(session, "events", None) or []
+            if len(events) >= self.compaction_event_threshold:
+                await self.compact_session(session)
+
+    async def compact_session(self, session: Any) -> Any:
+        """
+        Recria a sessão com o state consolidado e só os `compaction_keep_recent_events` eventos mais recentes.
+        Se a recriação falhar, restaura a sessão original a partir do snapshot e propaga a exceção.
+        """
+        if self._backend_assigns_ids:
+            logger.info("Compactação indisponível: o backend de sessão gera os ids.")
+            return session
+        session_id = _session_id(session)
+        user_id = _user_id(session)
+        current = await self._get_session(session_id, user_id)
+        if current is None:
+            return session
+
+        keep = self.compaction_keep_recent_events
+        conversation = [e for e in current.events if e.content]
+        recent = conversation[-keep:] if keep > 0 else []
+        service, app_name = self._route(user_id)
+        await service.delete_session(app_name=app_name, user_id=user_id, session_id=session_id)
+        try:
+            compacted = await self._copy_session(current, service, app_name, user_id, recent)
+        except BaseException:
+            await self._restore_session(current, service, app_name, user_id)
+            raise
+        self.compactions += 1
+        logger.info("Sessão %s compactada: %d eventos -> %d.", session_id, len(current.events), len(recent))
+        return compacted
+
+    async def _restore_session(self, snapshot: Any, service: Any, app_name: str, user_id: str) -> None:
+        """Desfaz uma compactação interrompida: apaga a cópia parcial e regrava o snapshot completo."""
+        session_id = _session_id(snapshot)
+        self.instrumentation.increment(DEGRADED_TOTAL, gateway="session", reason="compaction_failed")
+        try:
+            with contextlib.suppress(Exception):
+                await service.delete_session(app_name=app_name, user_id=user_id, session_id=session_id)
+            await self._copy_session(snapshot, service, app_name, user_id, list(snapshot.events))
+        except Exception as e:
+            logger.error(
+                "CRÍTICO: Falha ao restaurar a sessão %s após compactação interrompida. Causa: %s", session_id, e
+            )
+        else:
+            logger.warning("Compactação da sessão %s falhou; histórico original restaurado.", session_id)
+
+    async def _copy_session(self, source: Any, service: Any, app_name: str, user_id: str, events: list) -> Any:
+        """Cria a sessão com o state consolidado de `source` e regrava `events` sem state_delta."""
+        from google.adk.events.event_actions import EventActions
+
+        copy = await service.create_session(
+            app_name=app_name,
+            user_id=user_id,
+            session_id=_session_id(source),
+            state=_session_state_only(source),
+        )
+        for event in events:
+            await service.append_event(session=copy, event=event.model_copy(update={"actions": EventActions()}))
+        return copy
+
+    async def migrate_legacy_session(self, session_id: str, user_id: str) -> Any | None:
+        """
+        Move a sessão do layout legado para a partição do cliente, com state e histórico.
+        Devolve a sessão migrada, ou None se não houver sessão legada.
+        """
+        if self._backend_assigns_ids or user_id == DEFAULT_USER_ID:
+            return None
+        legacy = await self.legacy_service.get_session(
+            app_name=APP_NAME, user_id=DEFAULT_USER_ID, session_id=session_id
+        )
+        if legacy is None:
+            return None
+        service, app_name = self._route(user_id)
+        migrated = await self._copy_session(legacy, service, app_name, user_id, list(legacy.events))
+        await self.legacy_service.delete_session(app_name=APP_NAME, user_id=DEFAULT_USER_ID, session_id=session_id)
+        self.migrations += 1
+        logger.info("Sessão %s migrada do layout legado para o cliente %s (%s).", session_id, user_id, app_name)
+        return migrated
+
+    async def migrate_legacy_sessions(self, customer_ids: Mapping[str, str]) -> int:
+        """
+        Migração em lote: `customer_ids` mapeia session_id -> id do cliente (ex: exportado do CRM).
+        Cada sessão migra sob o seu lock; retorna quantas foram movidas.
+        """
+        migrated = 0
+        for session_id, user_id in customer_ids.items():
+            async with self.session_lock(session_id, user_id):
+                if await self.migrate_legacy_session(session_id, user_id) is not None:
+                    migrated += 1
+        return migrated
@@ -0,0 +1,75 @@
+"""
+Particionamento do keyspace de sessões por cliente (seção `session`, chave `shards`).
+
+As sessões ficam sob `user_id = customer_id` (não mais todas sob o usuário "default"), então listar as
+sessões de um cliente ou varrer o TTL percorre só a partição dele. Um `ShardingStrategy` mapeia cada
+cliente para um `SessionShard`: o `app_name` usado na API do ADK e o índice da instância de Session
+Service (o NegotiationSessionGateway aceita várias, ex: um arquivo SQLite por shard). Com `shards: 1`
+o `app_name` continua o legado, e as sessões sem cliente seguem sob DEFAULT_USER_ID.
+
+`ConsistentHashSharding` usa o mesmo anel do worker pool: aumentar o número de shards move só
+~1/N dos clientes, mas as sessões dos clientes movidos ficam no shard antigo até serem copiadas.
+A migração pronta (NegotiationSessionGateway.migrate_legacy_session) é a do layout legado.
+"""
+
+from dataclasses import dataclass
+from typing import NamedTuple, Protocol
+
+from src.hashring import HashRing
+
+# Nomes usados na API de sessões do ADK (app_name / user_id)
+APP_NAME = "agente-3-the-memory"
+# Usuário único do layout legado: sessões sem customer_id (e as criadas antes do particionamento)
+DEFAULT_USER_ID = "default"
+
+
+class SessionKey(NamedTuple):
+    """Identidade completa de uma sessão no ADK (o app_name vem do shard do cliente)."""
+
+    user_id: str
+    session_id: str
+
+
+@dataclass(frozen=True)
+class SessionShard:
+    """Partição do keyspace: `app_name` no ADK e índice da instância de Session Service."""
+
+    index: int
+    app_name: str
+
+
+class ShardingStrategy(Protocol):
+    """Mapeia um cliente (user_id do ADK) para a sua partição; deve ser estável entre processos."""
+
+    shards: tuple[SessionShard, ...]
+
+    def shard_for(self, user_id: str) -> SessionShard: ...
+
+
+class SingleShard:
+    """Todas as sessões num único app_name (o layout legado, padrão)."""
+
+    def __init__(self, app_name: str = APP_NAME):
+        self.shards = (SessionShard(0, app_name),)
+
+    def shard_for(self, user_id: str) -> SessionShard:
+        return self.shards[0]
+
+
+class ConsistentHashSharding:
+    """Distribui os clientes em `count` app_names (`<app_name>-00`, `-01`, ...) por hashing consistente."""
+
+    def __init__(self, count: int, *, app_name: str = APP_NAME, vnodes: int = 64):
+        if count < 1:
+            raise ValueError("count deve ser >= 1")
+        self.shards = tuple(SessionShard(i, f"{app_name}-{i:02d}") for i in range(count))
+        self._ring = HashRing(range(count), vnodes=vnodes)
+
+    def shard_for(self, user_id: str) -> SessionShard:
+        return self.shards[self._ring.node_for(user_id)]
+
+
+def sharding_from_policy(session_policy: dict) -> ShardingStrategy:
+    """`session.shards` > 1 liga o ConsistentHashSharding; senão SingleShard com o app_name legado."""
+    count = int(session_policy.get("shards", 1) or 1)
+    return ConsistentHashSharding(count) if count > 1 else SingleShard()
@@ -0,0 +1,377 @@
+"""
+Session Service durável local (SQLite em modo WAL) com a API de sessões do ADK.
+
+Substitui o InMemorySessionService quando os checkpoints precisam sobreviver a restarts ou ser
+compartilhados entre processos do mesmo host. Pontos principais:
+
+- WAL + busy_timeout: leitores não bloqueiam o writer e vários processos usam o mesmo arquivo.
+- Compare-and-swap de `version`: um append cujo state_delta traz `version` só é aplicado se a
+  versão gravada for a que o chamador leu (BEGIN IMMEDIATE); senão levanta ConcurrentWriteError.
+- Pool de conexões: as operações rodam em asyncio.to_thread (ou no `executor` injetado, ex: o
+  BoundedExecutor do NegotiationSessionGateway) com conexões reaproveitadas.
+- TTL (`session.ttl_hours`): cada escrita renova `expires_at`; sessões expiradas somem das
+  leituras e são removidas por uma varredura indexada (`purge_expired`), também disparada
+  periodicamente pelas escritas.
+"""
+
+import asyncio
+import json
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, TypeVar
+
+from google.adk.errors.already_exists_error import AlreadyExistsError
+from google.adk.events.event import Event
+from google.adk.sessions import BaseSessionService, Session
+from google.adk.sessions.base_session_service import GetSessionConfig, ListSessionsResponse
+
+from src.exceptions import ConcurrentWriteError
+
+T = TypeVar("T")
+
+APP_PREFIX = "app:"
+USER_PREFIX = "user:"
+TEMP_PREFIX = "temp:"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    id TEXT NOT NULL,
+    state TEXT NOT NULL,
+    version INTEGER,
+    update_time REAL NOT NULL,
+    expires_at REAL,
+    PRIMARY KEY (app_name, user_id, id)
+);
+CREATE INDEX IF NOT EXISTS sessions_expires_at ON sessions (expires_at);
+CREATE TABLE IF NOT EXISTS events (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    timestamp REAL NOT NULL,
+    data TEXT NOT NULL,
+    FOREIGN KEY (app_name, user_id, session_id)
+        REFERENCES sessions (app_name, user_id, id) ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS events_session ON events (app_name, user_id, session_id, seq);
+CREATE TABLE IF NOT EXISTS app_states (
+    app_name TEXT PRIMARY KEY,
+    state TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS user_states (
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    state TEXT NOT NULL,
+    PRIMARY KEY (app_name, user_id)
+);
+"""
+
+
+def _split_state(state: dict[str, Any] | None) -> tuple[dict, dict, dict]:
+    """Separa o state em (app, user, session), descartando chaves temp:."""
+    app, user, session = {}, {}, {}
+    for key, value in (state or {}).items():
+        if key.startswith(APP_PREFIX):
+            app[key.removeprefix(APP_PREFIX)] = value
+        elif key.startswith(USER_PREFIX):
+            user[key.removeprefix(USER_PREFIX)] = value
+        elif not key.startswith(TEMP_PREFIX):
+            session[key] = value
+    return app, user, session
+
+
+class SqliteSessionService(BaseSessionService):
+    """
+    Session Service do ADK persistido em SQLite (WAL), seguro entre threads e processos.
+    `supports_version_cas` indica ao NegotiationSessionGateway que o OCC é garantido no append.
+    """
+
+    supports_version_cas = True
+
+    def __init__(
+        self,
+        path: Path | str,
+        *,
+        ttl_hours: float | None = None,
+        pool_size: int = 4,
+        sweep_interval_s: float = 60.0,
+        clock: Callable[[], float] = time.time,
+        executor: Any | None = None,
+    ):
+        self.path = str(path)
+        self.executor = executor
+        self.ttl_s = ttl_hours * 3600 if ttl_hours else None
+        self.sweep_interval_s = sweep_interval_s
+        self._clock = clock
+        self._last_sweep = clock()
+        self._sweep_lock = threading.Lock()
+        self._pool: queue.Queue[sqlite3.Connection] = queue.Queue()
+        for _ in range(max(1, pool_size)):
+            self._pool.put(self._connect())
+        with self._connection() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30.0, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        conn.execute("PRAGMA busy_timeout=30000")
+        return conn
+
+    @contextmanager
+    def _connection(self) -> Iterator[sqlite3.Connection]:
+        conn = self._pool.get()
+        try:
+            yield conn
+        finally:
+            self._pool.put(conn)
+
+    @contextmanager
+    def _write_transaction(self) -> Iterator[sqlite3.Connection]:
+        """Transação com lock de escrita desde o início (o CAS de version não sofre corrida)."""
+        with self._connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    async def _run(self, fn: Callable[..., T], *args: Any) -> T:
+        if self.executor is not None:
+            return await self.executor.run(fn, *args)
+        return await asyncio.to_thread(fn, *args)
+
+    def close(self) -> None:
+        while not self._pool.empty():
+            self._pool.get_nowait().close()
+
+    def _expires_at(self, now: float) -> float | None:
+        return now + self.ttl_s if self.ttl_s else None
+
+    def _maybe_sweep(self) -> None:
+        if not self.ttl_s or self._clock() - self._last_sweep < self.sweep_interval_s:
+            return
+        if self._sweep_lock.acquire(blocking=False):
+            try:
+                self._last_sweep = self._clock()
+                self.purge_expired()
+            finally:
+                self._sweep_lock.release()
+
+    def purge_expired(self) -> int:
+        """Remove sessões expiradas (e seus eventos, em cascata) via índice de expires_at."""
+        with self._write_transaction() as conn:
+            cursor = conn.execute(
+                "DELETE FROM sessions WHERE expires_at IS NOT NULL AND expires_at <= ?", (self._clock(),)
+            )
+            return cursor.rowcount
+
+    # --- state app:/user: ------------------------------------------------------------------
+
+    def _merge_shared_state(self, conn: sqlite3.Connection, session: Session) -> Session:
+        row = conn.execute("SELECT state FROM app_states WHERE app_name = ?", (session.app_name,)).fetchone()
+        if row:
+            session.state.update({APP_PREFIX + k: v for k, v in json.loads(row[0]).items()})
+        row = conn.execute(
+            "SELECT state FROM user_states WHERE app_name = ? AND user_id = ?", (session.app_name, session.user_id)
+        ).fetchone()
+        if row:
+            session.state.update({USER_PREFIX + k: v for k, v in json.loads(row[0]).items()})
+        return session
+
+    def _update_shared_state(
+        self, conn: sqlite3.Connection, app_name: str, user_id: str, app: dict, user: dict
+    ) -> None:
+        if app:
+            row = conn.execute("SELECT state FROM app_states WHERE app_name = ?", (app_name,)).fetchone()
+            merged = {**(json.loads(row[0]) if row else {}), **app}
+            conn.execute(
+                "INSERT INTO app_states (app_name, state) VALUES (?, ?) "
+                "ON CONFLICT (app_name) DO UPDATE SET state = excluded.state",
+                (app_name, json.dumps(merged)),
+            )
+        if user:
+            row = conn.execute(
+                "SELECT state FROM user_states WHERE app_name = ? AND user_id = ?", (app_name, user_id)
+            ).fetchone()
+            merged = {**(json.loads(row[0]) if row else {}), **user}
+            conn.execute(
+                "INSERT INTO user_states (app_name, user_id, state) VALUES (?, ?, ?) "
+                "ON CONFLICT (app_name, user_id) DO UPDATE SET state = excluded.state",
+                (app_name, user_id, json.dumps(merged)),
+            )
+
+    # --- API do ADK ------------------------------------------------------------------------
+
+    def _create_session_impl(
+        self, app_name: str, user_id: str, state: dict[str, Any] | None, session_id: str | None
+    ) -> Session:
+        session_id = session_id.strip() if session_id and session_id.strip() else str(uuid.uuid4())
+        app, user, session_state = _split_state(state)
+        now = self._clock()
+        with self._write_transaction() as conn:
+            # Sessão expirada ainda não varrida não impede recriar o mesmo id.
+            conn.execute(
+                "DELETE FROM sessions WHERE app_name = ? AND user_id = ? AND id = ? AND expires_at <= ?",
+                (app_name, user_id, session_id, now),
+            )
+            try:
+                conn.execute(
+                    "INSERT INTO sessions (app_name, user_id, id, state, version, update_time, expires_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        app_name,
+                        user_id,
+                        session_id,
+                        json.dumps(session_state),
+                        session_state.get("version"),
+                        now,
+                        self._expires_at(now),
+                    ),
+                )
+            except sqlite3.IntegrityError as e:
+                raise AlreadyExistsError(f"Session with id {session_id} already exists.") from e
+            self._update_shared_state(conn, app_name, user_id, app, user)
+            session = Session(
+                app_name=app_name, user_id=user_id, id=session_id, state=session_state, last_update_time=now
+            )
+            session = self._merge_shared_state(conn, session)
+        self._maybe_sweep()
+        return session
+
+    async def create_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        state: dict[str, Any] | None = None,
+        session_id: str | None = None,
+    ) -> Session:
+        return await self._run(self._create_session_impl, app_name, user_id, state, session_id)
+
+    def _get_session_impl(
+        self, app_name: str, user_id: str, session_id: str, config: GetSessionConfig | None
+    ) -> Session | None:
+        with self._connection() as conn:
+            row = conn.execute(
+                "SELECT state, update_time FROM sessions WHERE app_name = ? AND user_id = ? AND id = ? "
+                "AND (expires_at IS NULL OR expires_at > ?)",
+                (app_name, user_id, session_id, self._clock()),
+            ).fetchone()
+            if row is None:
+                return None
+            query = "SELECT data FROM events WHERE app_name = ? AND user_id = ? AND session_id = ?"
+            params: list[Any] = [app_name, user_id, session_id]
+            if config and config.after_timestamp:
+                query += " AND timestamp >= ?"
+                params.append(config.after_timestamp)
+            query += " ORDER BY seq DESC"
+            if config and config.num_recent_events:
+                query += " LIMIT ?"
+                params.append(config.num_recent_events)
+            events = [Event.model_validate_json(data) for (data,) in conn.execute(query, params)]
+            events.reverse()
+            session = Session(
+                app_name=app_name,
+                user_id=user_id,
+                id=session_id,
+                state=json.loads(row[0]),
+                events=events,
+                last_update_time=row[1],
+            )
+            return self._merge_shared_state(conn, session)
+
+    async def get_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        config: GetSessionConfig | None = None,
+    ) -> Session | None:
+        return await self._run(self._get_session_impl, app_name, user_id, session_id, config)
+
+    def _list_sessions_impl(self, app_name: str, user_id: str | None) -> ListSessionsResponse:
+        query = "SELECT user_id, id, state, update_time FROM sessions WHERE app_name = ? "
+        query += "AND (expires_at IS NULL OR expires_at > ?)"
+        params: list[Any] = [app_name, self._clock()]
+        if user_id is not None:
+            query += " AND user_id = ?"
+            params.append(user_id)
+        with self._connection() as conn:
+            sessions = [
+                self._merge_shared_state(
+                    conn,
+                    Session(app_name=app_name, user_id=uid, id=sid, state=json.loads(state), last_update_time=updated),
+                )
+                for uid, sid, state, updated in conn.execute(query, params).fetchall()
+            ]
+        return ListSessionsResponse(sessions=sessions)
+
+    async def list_sessions(self, *, app_name: str, user_id: str | None = None) -> ListSessionsResponse:
+        return await self._run(self._list_sessions_impl, app_name, user_id)
+
+    def _delete_session_impl(self, app_name: str, user_id: str, session_id: str) -> None:
+        with self._write_transaction() as conn:
+            conn.execute(
+                "DELETE FROM sessions WHERE app_name = ? AND user_id = ? AND id = ?", (app_name, user_id, session_id)
+            )
+
+    async def delete_session(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        await self._run(self._delete_session_impl, app_name, user_id, session_id)
+
+    def _append_event_impl(self, session: Session, event: Event, expected_version: Any) -> None:
+        delta = event.actions.state_delta if event.actions and event.actions.state_delta else {}
+        app, user, session_delta = _split_state(delta)
+        now = self._clock()
+        key = (session.app_name, session.user_id, session.id)
+        with self._write_transaction() as conn:
+            row = conn.execute(
+                "SELECT state, version FROM sessions WHERE app_name = ? AND user_id = ? AND id = ?", key
+            ).fetchone()
+            if row is None:
+                raise ValueError(f"Sessão {session.id} não encontrada (expirada ou removida).")
+            stored_state, stored_version = row
+            if "version" in session_delta and stored_version != expected_version:
+                raise ConcurrentWriteError(
+                    f"OCC conflict: expected version {expected_version}, found {stored_version}."
+                )
+            state = {**json.loads(stored_state), **session_delta}
+            conn.execute(
+                "UPDATE sessions SET state = ?, version = ?, update_time = ?, expires_at = ? "
+                "WHERE app_name = ? AND user_id = ? AND id = ?",
+                (json.dumps(state), state.get("version"), now, self._expires_at(now), *key),
+            )
+            conn.execute(
+                "INSERT INTO events (app_name, user_id, session_id, timestamp, data) VALUES (?, ?, ?, ?, ?)",
+                (*key, event.timestamp, event.model_dump_json()),
+            )
+            self._update_shared_state(conn, session.app_name, session.user_id, app, user)
+        self._maybe_sweep()
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        """
+        Persiste o evento e aplica o state_delta. Se o delta traz `version`, o append é um CAS:
+        a versão gravada precisa ser a do `session` do chamador, senão ConcurrentWriteError.
+        """
+        if event.partial:
+            return event
+        expected_version = session.state.get("version")
+        event = self._trim_temp_delta_state(event)
+        await self._run(self._append_event_impl, session, event, expected_version)
+        # Atualiza o objeto do chamador só depois de persistir (igual ao InMemorySessionService).
+        self._update_session_state(session, event)
+        session.events.append(event)
+        session.last_update_time = event.timestamp
+        return event
@@ -1,6 +1,6 @@
-from typing import Literal
+from typing import Any, Literal
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr
 
 
 class NegotiationState(BaseModel):
@@ -8,6 +8,7 @@ class NegotiationState(BaseModel):
     Modelo estrito para a Máquina de Estados (FSM) da Negociação.
     Evita corrupção do checkpoint (Short-Term Memory) pelo LLM.
     Campo `version` permite Optimistic Concurrency Control (OCC) no save.
+    Atribuições a campos são rastreadas (dirty tracking) para que o checkpoint envie só o delta.
     """
 
     funnel_stage: Literal["initial_contact", "analyzing_credit", "rate_proposed", "contract_signed", "human_handoff"]
@@ -16,6 +17,29 @@ class NegotiationState(BaseModel):
     customer_tier: Literal["standard", "premium"]
     version: int = Field(default=1, ge=1, description="OCC: incrementado a cada save para detectar race conditions")
 
+    _dirty: set[str] = PrivateAttr(default_factory=set)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        super().__setattr__(name, value)
+        if name in type(self).model_fields:
+            self._dirty.add(name)
+
+    @property
+    def dirty_fields(self) -> set[str]:
+        return set(self._dirty)
+
+    def dirty_delta(self) -> dict[str, Any]:
+        """Campos alterados desde o último checkpoint (sempre inclui `version`)."""
+        return self.model_dump(include=self._dirty | {"version"})
+
+    def mark_clean(self) -> None:
+        """Chamado após persistir o checkpoint."""
+        self._dirty.clear()
+
+    def mark_all_dirty(self) -> None:
+        """Força o próximo checkpoint a enviar o estado completo (ex: sessão sem state ou resetada)."""
+        self._dirty.update(type(self).model_fields)
+
     def increment_rejection(self, max_rejections: int = 3) -> None:
         """Incrementa contador de recusa. Handoff quando atingir max_rejections (configurável via YAML)."""
         self.rejection_count += 1
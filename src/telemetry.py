@@ -1,39 +1,211 @@
-import tiktoken
+import asyncio
+import threading
+from collections import Counter, OrderedDict
+from collections.abc import Sequence
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any
+
 import yaml
 
 
+@dataclass(frozen=True)
+class TurnUsage:
+    """Tokens e custo de um turno, medidos sobre o prompt efetivamente enviado ao modelo."""
+
+    input_tokens: int
+    output_tokens: int
+    cost_usd: float
+
+
+# Último turno registrado no contexto da task atual (o consumidor de process_message o enxerga).
+_LAST_TURN: ContextVar[TurnUsage | None] = ContextVar("finops_last_turn", default=None)
+
+
 class FinOpsTelemetry:
     """
     Calcula e compara o custo do modelo Arquitetural Stateful (ADK)
     versus a abordagem Stateless/Amnésica (onde se envia o chat history inteiro).
     """
 
-    def __init__(self, config_path: str = "config/memory_policy.yaml"):
+    def __init__(self, config_path: str = "config/memory_policy.yaml", *, encoding: Any | None = None):
         with open(config_path, encoding="utf-8") as f:
             self.config = yaml.safe_load(f)["finops"]
 
-        # Encodings do tiktoken como proxy de tokens Gemini
-        try:
-            self.encoding = tiktoken.get_encoding("cl100k_base")
-        except Exception:
-            self.encoding = None
+        # Encodings do tiktoken como proxy de tokens Gemini; carregado no primeiro uso ou em warm_up()
+        self._encoding = encoding
+        self._encoding_loaded = encoding is not None
+        self._encoding_lock = threading.Lock()
 
-    def calculate_stateful_cost(self, prompt_text: str, response_text: str) -> float:
-        """Calcula custo do modelo arquiteturado com Checkpointing + RAG vetorial."""
-        input_tokens = len(self.encoding.encode(prompt_text)) if self.encoding else len(prompt_text) // 4
-        output_tokens = len(self.encoding.encode(response_text)) if self.encoding else len(response_text) // 4
+        # Contagem de tokens de fragmentos que se repetem entre turnos (system prompt renderizado,
+        # moldura do injector, insights): LRU limitado, acessado a partir de threads do executor.
+        self.token_cache_max_entries = self.config.get("token_cache_max_entries", 4096)
+        self._token_cache: OrderedDict[str, int] = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Acumulado dos turnos registrados pelo agente
+        self.turns = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.stateful_cost = 0.0
+
+        # Prefetch especulativo da Long-Term Memory (vector_search.speculative_prefetch)
+        self.prefetch_used = 0
+        self.prefetch_discarded = 0
+        self.prefetch_saved_s = 0.0
+
+        # Estágios opcionais descartados pelo orçamento de latência do turno (src/deadline.py)
+        self.shed_stages: Counter[str] = Counter()
+
+        # Insights da Long-Term Memory empacotados no orçamento de tokens (src/context_packer.py)
+        self.packed_turns = 0
+        self.packed_tokens = 0
+        self.trimmed_tokens = 0
+
+        # Cache de respostas do LLM (src/response_cache.py): hits são chamadas ao modelo evitadas
+        self.response_cache_hits = 0
+        self.response_cache_misses = 0
+
+    @property
+    def encoding(self) -> Any | None:
+        """Encoding cl100k_base (ou None se indisponível, com fallback de ~4 caracteres/token)."""
+        if not self._encoding_loaded:
+            self.warm_up()
+        return self._encoding
+
+    def warm_up(self) -> None:
+        """Importa o tiktoken e carrega o BPE; pode rodar em background para não pesar no cold start."""
+        with self._encoding_lock:
+            if self._encoding_loaded:
+                return
+            try:
+                import tiktoken
 
+                self._encoding = tiktoken.get_encoding("cl100k_base")
+            except Exception:
+                self._encoding = None
+            self._encoding_loaded = True
+
+    def record_prefetch(self, saved_s: float | None) -> None:
+        """Registra um prefetch: latência economizada no turno, ou None se o resultado foi descartado."""
+        if saved_s is None:
+            self.prefetch_discarded += 1
+            return
+        self.prefetch_used += 1
+        self.prefetch_saved_s += max(0.0, saved_s)
+
+    def record_shed(self, stage: str) -> None:
+        """Registra um estágio opcional pulado ou cancelado por falta de orçamento no turno."""
+        self.shed_stages[stage] += 1
+
+    def record_packing(self, packed_tokens: int, trimmed_tokens: int) -> None:
+        """Registra os tokens de insights injetados e os podados (duplicatas e excesso do orçamento)."""
+        with self._lock:
+            self.packed_turns += 1
+            self.packed_tokens += packed_tokens
+            self.trimmed_tokens += trimmed_tokens
+
+    def record_response_cache(self, hit: bool) -> None:
+        """Registra uma consulta ao cache de respostas de um estágio cacheável."""
+        with self._lock:
+            if hit:
+                self.response_cache_hits += 1
+            else:
+                self.response_cache_misses += 1
+
+    @property
+    def response_cache_hit_rate(self) -> float:
+        lookups = self.response_cache_hits + self.response_cache_misses
+        return self.response_cache_hits / lookups if lookups else 0.0
+
+    def _encode_counts(self, texts: Sequence[str]) -> list[int]:
+        """Conta tokens de vários textos numa única chamada ao tiktoken (encode em lote, sem special tokens)."""
+        if not texts:
+            return []
+        encoding = self.encoding
+        if encoding is None:
+            return [len(t) // 4 for t in texts]
+        return [len(tokens) for tokens in encoding.encode_ordinary_batch(list(texts))]
+
+    def count_tokens(self, texts: Sequence[str], *, cached: bool = False) -> list[int]:
+        """
+        Conta tokens de `texts`. Com `cached=True` a contagem de cada texto fica no LRU: use para
+        fragmentos que se repetem entre turnos, não para mensagens e respostas (únicas por turno).
+        """
+        if not cached:
+            return self._encode_counts(texts)
+        counts: dict[str, int] = {}
+        with self._lock:
+            for text in texts:
+                if text in self._token_cache:
+                    self._token_cache.move_to_end(text)
+                    counts[text] = self._token_cache[text]
+        misses = list(dict.fromkeys(t for t in texts if t not in counts))
+        if misses:
+            fresh = dict(zip(misses, self._encode_counts(misses), strict=True))
+            counts.update(fresh)
+            with self._lock:
+                self._token_cache.update(fresh)
+                while len(self._token_cache) > self.token_cache_max_entries:
+                    self._token_cache.popitem(last=False)
+        return [counts[t] for t in texts]
+
+    def _cost(self, input_tokens: int, output_tokens: int) -> float:
         cost_in = (input_tokens / 1000) * self.config["cost_per_1k_input"]
         cost_out = (output_tokens / 1000) * self.config["cost_per_1k_output"]
         return cost_in + cost_out
 
+    def calculate_stateful_cost(self, prompt_text: str, response_text: str) -> float:
+        """Calcula custo do modelo arquiteturado com Checkpointing + RAG vetorial."""
+        input_tokens, output_tokens = self._encode_counts([prompt_text, response_text])
+        return self._cost(input_tokens, output_tokens)
+
+    def _measure_turn(self, prompt_fragments: Sequence[str], message: str, response: str) -> TurnUsage:
+        # Mensagem e resposta num único lote; fragmentos recorrentes saem do cache.
+        message_tokens, output_tokens = self._encode_counts([message, response])
+        input_tokens = message_tokens + sum(self.count_tokens(prompt_fragments, cached=True))
+        usage = TurnUsage(input_tokens, output_tokens, self._cost(input_tokens, output_tokens))
+        with self._lock:
+            self.turns += 1
+            self.input_tokens += input_tokens
+            self.output_tokens += output_tokens
+            self.stateful_cost += usage.cost_usd
+        return usage
+
+    async def record_turn(self, prompt_fragments: Sequence[str], message: str, response: str) -> TurnUsage:
+        """
+        Registra um turno a partir do prompt enviado: `prompt_fragments` (partes recorrentes) e `message`.
+        A soma por fragmento é uma aproximação; a tokenização roda no executor.
+        """
+        usage = await asyncio.to_thread(self._measure_turn, prompt_fragments, message, response)
+        _LAST_TURN.set(usage)
+        return usage
+
+    @staticmethod
+    def record_turn_without_llm() -> TurnUsage:
+        """Registra na task corrente um turno que não chamou o modelo (cache de respostas ou handoff): custo zero."""
+        usage = TurnUsage(0, 0, 0.0)
+        _LAST_TURN.set(usage)
+        return usage
+
+    @staticmethod
+    def last_turn_usage() -> TurnUsage | None:
+        """Último turno registrado na task corrente (ex: para o custo por linha do batch runner)."""
+        return _LAST_TURN.get()
+
     def get_amnesic_baseline_cost(self) -> float:
         """Custo hipotético de enviar o histórico completo (10k tokens)."""
         tokens = self.config["amnesic_payload_tokens"]
         return (tokens / 1000) * self.config["cost_per_1k_input"]
 
-    def print_savings_report(self, stateful_cost: float):
-        """Imprime relatório FinOps comparativo no console."""
+    def print_savings_report(self, stateful_cost: float | None = None):
+        """
+        Imprime relatório FinOps comparativo no console. Sem `stateful_cost`, usa a média por turno
+        registrada pelo agente; os tokens exibidos são os medidos, não uma estimativa fixa.
+        """
+        if stateful_cost is None:
+            stateful_cost = self.stateful_cost / self.turns if self.turns else 0.0
+        stateful_tokens = str(round((self.input_tokens + self.output_tokens) / self.turns)) if self.turns else "n/d"
         amnesic = self.get_amnesic_baseline_cost()
         savings = amnesic - stateful_cost
         pct = (savings / amnesic) * 100 if amnesic > 0 else 0
@@ -48,9 +220,29 @@ class FinOpsTelemetry:
         table.add_column("Tokens Estimados", justify="right")
 
         table.add_row("Amnesico (Historico Completo)", f"${amnesic:.6f}", str(self.config["amnesic_payload_tokens"]))
-        table.add_row("Stateful (ADK Checkpoint + Vetorial)", f"${stateful_cost:.6f}", "~500")
+        table.add_row("Stateful (ADK Checkpoint + Vetorial)", f"${stateful_cost:.6f}", stateful_tokens)
         table.add_row(
             "[bold green]Economia (FinOps)[/bold green]", f"[bold green]${savings:.6f} (-{pct:.1f}%)[/bold green]", ""
         )
 
         console.print(table)
+        if self.prefetch_used or self.prefetch_discarded:
+            avg_ms = (self.prefetch_saved_s / self.prefetch_used * 1000) if self.prefetch_used else 0.0
+            console.print(
+                f"Prefetch especulativo: {self.prefetch_used} usados, {self.prefetch_discarded} descartados, "
+                f"latência economizada {self.prefetch_saved_s * 1000:.1f} ms (média {avg_ms:.1f} ms/turno)"
+            )
+        if self.shed_stages:
+            shed = ", ".join(f"{stage}={count}" for stage, count in sorted(self.shed_stages.items()))
+            console.print(f"Estágios descartados pelo orçamento do turno: {shed}")
+        if self.packed_turns:
+            trimmed_cost = (self.trimmed_tokens / 1000) * self.config["cost_per_1k_input"]
+            console.print(
+                f"Insights de Long-Term Memory: {self.packed_tokens} tokens injetados, {self.trimmed_tokens} "
+                f"podados em {self.packed_turns} turnos (economia de ${trimmed_cost:.6f} em input)"
+            )
+        if self.response_cache_hits or self.response_cache_misses:
+            console.print(
+                f"Cache de respostas: {self.response_cache_hits} hits, {self.response_cache_misses} misses "
+                f"(hit rate {self.response_cache_hit_rate:.1%}, {self.response_cache_hits} chamadas ao LLM evitadas)"
+            )
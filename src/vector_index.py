@@ -0,0 +1,197 @@
+"""
+Backend local de Long-Term Memory: índice vetorial em memória (NumPy), sem Vertex AI Vector Search.
+
+Os embeddings ficam numa matriz float32 (n, dim) com linhas normalizadas, então similaridade de
+cosseno = produto interno. A busca é um matvec (BLAS) + pré-filtro por score mínimo + argpartition
+para o top-k. A matriz pode ser memory-mapped do disco (`embeddings.npy`).
+
+O scan exato é limitado pela banda de memória (~30 ms para 1M x 64 num core). Com `partitions`
+(IVF), o índice agrupa os vetores por k-means esférico e a busca só varre as `probes` partições de
+centróide mais próximo: a busca fica aproximada, mas uma ordem de grandeza mais rápida.
+"""
+
+import hashlib
+import json
+import re
+import threading
+from pathlib import Path
+
+import numpy as np
+
+from src.context_packer import ScoredInsight
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+EMBEDDINGS_FILE = "embeddings.npy"
+DOCUMENTS_FILE = "documents.json"
+CENTROIDS_FILE = "centroids.npy"
+OFFSETS_FILE = "offsets.npy"
+
+# Pontos de treino do k-means por partição e iterações (o treino usa uma amostra, não a matriz toda).
+_KMEANS_SAMPLES_PER_PARTITION = 64
+_KMEANS_ITERATIONS = 10
+_ASSIGN_CHUNK = 16384
+
+
+class HashingEmbedder:
+    """
+    Embedder determinístico por feature hashing (bag of words com sinal).
+    Sem modelo nem rede: suficiente para staging e benchmarks de recall do índice local.
+    """
+
+    def __init__(self, dim: int = 64):
+        self.dim = dim
+
+    def _bucket(self, token: str) -> tuple[int, float]:
+        digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+        value = int.from_bytes(digest, "little")
+        return value % self.dim, 1.0 if (value >> 63) & 1 else -1.0
+
+    def embed(self, text: str) -> np.ndarray:
+        vec = np.zeros(self.dim, dtype=np.float32)
+        for token in _TOKEN_RE.findall(text.lower()):
+            idx, sign = self._bucket(token)
+            vec[idx] += sign
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else vec
+
+    def embed_batch(self, texts: list[str]) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        return np.stack([self.embed(t) for t in texts])
+
+
+def _nearest_centroid(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    assignments = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), _ASSIGN_CHUNK):
+        chunk = np.asarray(vectors[start : start + _ASSIGN_CHUNK], dtype=np.float32)
+        assignments[start : start + len(chunk)] = np.argmax(chunk @ centroids.T, axis=1)
+    return assignments
+
+
+def _spherical_kmeans(vectors: np.ndarray, partitions: int, seed: int = 0) -> np.ndarray:
+    """Centróides normalizados treinados numa amostra de `vectors` (linhas normalizadas)."""
+    rng = np.random.default_rng(seed)
+    sample_size = min(len(vectors), partitions * _KMEANS_SAMPLES_PER_PARTITION)
+    sample = np.asarray(vectors[np.sort(rng.choice(len(vectors), sample_size, replace=False))], dtype=np.float32)
+    centroids = sample[rng.choice(sample_size, partitions, replace=False)].copy()
+    for _ in range(_KMEANS_ITERATIONS):
+        assignments = _nearest_centroid(sample, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, sample)
+        empty = ~sums.any(axis=1)
+        # Partição vazia: reinicia num ponto aleatório da amostra.
+        sums[empty] = sample[rng.choice(sample_size, int(empty.sum()))]
+        centroids = sums / np.linalg.norm(sums, axis=1, keepdims=True)
+    return centroids
+
+
+class LocalVectorIndex:
+    """
+    Índice vetorial local com top-k por cosseno, filtrado por score mínimo. Com `partitions` > 0
+    as linhas são reordenadas por partição (IVF) e a busca varre só `probes` partições.
+    """
+
+    def __init__(
+        self,
+        embeddings: np.ndarray,
+        documents: list[str],
+        embedder: HashingEmbedder | None = None,
+        *,
+        partitions: int = 0,
+        probes: int = 32,
+        centroids: np.ndarray | None = None,
+        offsets: np.ndarray | None = None,
+    ):
+        if embeddings.ndim != 2 or embeddings.shape[0] != len(documents):
+            raise ValueError("embeddings deve ter shape (len(documents), dim)")
+        self.embedder = embedder or HashingEmbedder(dim=embeddings.shape[1])
+        if self.embedder.dim != embeddings.shape[1]:
+            raise ValueError("dimensão do embedder difere da matriz de embeddings")
+        if centroids is None and 0 < partitions < len(documents):
+            centroids = _spherical_kmeans(embeddings, partitions)
+            assignments = _nearest_centroid(embeddings, centroids)
+            order = np.argsort(assignments, kind="stable")
+            # Cada partição vira um trecho contíguo da matriz: o scan de uma partição é um matvec.
+            embeddings = np.ascontiguousarray(embeddings[order], dtype=np.float32)
+            documents = [documents[i] for i in order]
+            offsets = np.searchsorted(assignments[order], np.arange(len(centroids) + 1))
+        self.embeddings = embeddings
+        self.documents = documents
+        self.centroids = centroids
+        self.offsets = offsets
+        self.probes = probes
+        # Buffer de scores por thread: a busca roda em asyncio.to_thread e pode ser concorrente.
+        self._local = threading.local()
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    @classmethod
+    def from_documents(cls, documents: list[str], embedder: HashingEmbedder | None = None) -> "LocalVectorIndex":
+        embedder = embedder or HashingEmbedder()
+        return cls(embedder.embed_batch(documents), list(documents), embedder)
+
+    def save(self, directory: Path | str) -> None:
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        np.save(directory / EMBEDDINGS_FILE, np.ascontiguousarray(self.embeddings, dtype=np.float32))
+        with open(directory / DOCUMENTS_FILE, "w", encoding="utf-8") as f:
+            json.dump(self.documents, f, ensure_ascii=False)
+        if self.centroids is not None:
+            np.save(directory / CENTROIDS_FILE, self.centroids)
+            np.save(directory / OFFSETS_FILE, self.offsets)
+
+    @classmethod
+    def load(cls, directory: Path | str, *, mmap: bool = True, probes: int = 32) -> "LocalVectorIndex":
+        """Carrega o índice salvo; com `mmap=True` a matriz é mapeada do disco (sem cópia em RAM)."""
+        directory = Path(directory)
+        embeddings = np.load(directory / EMBEDDINGS_FILE, mmap_mode="r" if mmap else None)
+        with open(directory / DOCUMENTS_FILE, encoding="utf-8") as f:
+            documents = json.load(f)
+        centroids = offsets = None
+        if (directory / CENTROIDS_FILE).exists():
+            centroids = np.load(directory / CENTROIDS_FILE)
+            offsets = np.load(directory / OFFSETS_FILE)
+        return cls(embeddings, documents, probes=probes, centroids=centroids, offsets=offsets)
+
+    def _scores_buffer(self) -> np.ndarray:
+        buf = getattr(self._local, "scores", None)
+        if buf is None or buf.shape[0] != len(self.documents):
+            buf = np.empty(len(self.documents), dtype=np.float32)
+            self._local.scores = buf
+        return buf
+
+    def search_vector(self, query: np.ndarray, top_k: int = 3, min_score: float = 0.0) -> list[ScoredInsight]:
+        """Top-k por cosseno (query normalizada) com score >= min_score, em ordem decrescente."""
+        if top_k <= 0 or not len(self.documents):
+            return []
+        query = query.astype(np.float32, copy=False)
+        scores = self._scores_buffer()
+        if self.centroids is None:
+            np.matmul(self.embeddings, query, out=scores)
+            candidates = np.flatnonzero(scores >= min_score)
+        else:
+            candidates = self._probe_partitions(query, scores, min_score)
+
+        if candidates.size > top_k:
+            best = np.argpartition(scores[candidates], -top_k)[-top_k:]
+            candidates = candidates[best]
+        ordered = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return [ScoredInsight(self.documents[i], float(scores[i])) for i in ordered]
+
+    def _probe_partitions(self, query: np.ndarray, scores: np.ndarray, min_score: float) -> np.ndarray:
+        """Pontua só as `probes` partições mais próximas da query; devolve os candidatos >= min_score."""
+        probes = min(self.probes, len(self.centroids))
+        nearest = np.argpartition(-(self.centroids @ query), probes - 1)[:probes]
+        found = []
+        for partition in nearest:
+            start, end = int(self.offsets[partition]), int(self.offsets[partition + 1])
+            if start == end:
+                continue
+            np.matmul(self.embeddings[start:end], query, out=scores[start:end])
+            found.append(start + np.flatnonzero(scores[start:end] >= min_score))
+        return np.concatenate(found) if found else np.empty(0, dtype=np.int64)
+
+    def search(self, text: str, top_k: int = 3, min_score: float = 0.0) -> list[ScoredInsight]:
+        return self.search_vector(self.embedder.embed(text), top_k=top_k, min_score=min_score)
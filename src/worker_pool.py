@@ -0,0 +1,349 @@
+"""
+Serving multi-processo do StatefulFinanceAgent com afinidade de sessão.
+
+`WorkerPool` inicia N processos (spawn), cada um com o seu agente e event loop, e encaminha cada
+`session_id` sempre ao mesmo worker por hashing consistente (`HashRing`). Estado e caches da sessão
+(versões vistas do single_writer, renders, consultas vetoriais) ficam locais ao worker, sem
+conflitos de OCC entre processos.
+
+Adicionar ou remover workers rebalanceia o anel: só as sessões do trecho afetado mudam de dono, e
+uma sessão com turno em voo continua no worker antigo até o turno terminar. Para que a conversa
+sobreviva à troca de worker, use um backend de sessão compartilhado (Vertex ou SESSION_SQLITE_PATH).
+
+Uso (front end JSONL: uma linha {"session_id", "message", "tier"?, "customer_id"?} por turno na entrada padrão):
+    python -m src.worker_pool --workers 4 < entrada.jsonl > saida.jsonl
+    python -m src.worker_pool --factory benchmarks._support:build_fake_agent < entrada.jsonl
+"""
+
+import argparse
+import asyncio
+import importlib
+import itertools
+import logging
+import multiprocessing
+import os
+import queue
+import sys
+import threading
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from src.exceptions import WorkerUnavailableError
+from src.hashring import HashRing
+from src.policy import policy_section
+
+logger = logging.getLogger(__name__)
+
+# Intervalo (s) em que o leitor de respostas verifica se algum worker morreu
+_LIVENESS_POLL_S = 0.5
+
+
+def _load_factory(spec: str) -> Callable[[], Any]:
+    """Resolve 'modulo:funcao' (ex: src.worker_pool:build_agent)."""
+    module, _, attr = spec.partition(":")
+    return getattr(importlib.import_module(module), attr or "build_agent")
+
+
+def build_agent() -> Any:
+    """Agente padrão de cada worker (mesmos Gateways do src.main)."""
+    from src.agent_router import StatefulFinanceAgent
+    from src.memory_gateway import LongTermMemoryGateway
+    from src.session_gateway import NegotiationSessionGateway
+
+    return StatefulFinanceAgent(session_gw=NegotiationSessionGateway(), memory_gw=LongTermMemoryGateway())
+
+
+def _worker_main(worker_id: int, agent_factory: Callable[[], Any], inbox: Any, outbox: Any) -> None:
+    asyncio.run(_serve(worker_id, agent_factory, inbox, outbox))
+
+
+async def _serve(worker_id: int, agent_factory: Callable[[], Any], inbox: Any, outbox: Any) -> None:
+    """Loop do worker: atende turnos concorrentes até receber None e drenar os que estão em voo."""
+    agent = agent_factory()
+    warm_up = getattr(agent, "warm_up", None)
+    if warm_up is not None:
+        try:
+            await asyncio.to_thread(warm_up)
+        except Exception as e:
+            logger.warning("Warm-up do worker %d falhou: %s", worker_id, e)
+    outbox.put((worker_id, None, "ready", os.getpid()))
+
+    async def handle(request_id: int, session_id: str, message: str, tier: str, customer_id: str | None) -> None:
+        kwargs = {"customer_id": customer_id} if customer_id else {}
+        try:
+            response = await agent.process_message(session_id, message, tier, **kwargs)
+        except Exception as e:
+            outbox.put((worker_id, request_id, "error", f"{type(e).__name__}: {e}"))
+        else:
+            outbox.put((worker_id, request_id, "ok", response))
+
+    tasks: set[asyncio.Task] = set()
+    while (request := await asyncio.to_thread(inbox.get)) is not None:
+        task = asyncio.create_task(handle(*request))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+    if tasks:
+        await asyncio.gather(*tasks)
+    close = getattr(agent, "close", None)
+    if close is not None:
+        try:
+            await close()
+        except Exception as e:
+            logger.warning("Shutdown do agente no worker %d falhou: %s", worker_id, e)
+    outbox.put((worker_id, None, "stopped", None))
+
+
+@dataclass
+class _Worker:
+    worker_id: int
+    process: Any
+    inbox: Any
+    ready: asyncio.Event
+    drained: asyncio.Event
+    pid: int | None = None
+    accepting: bool = True
+    alive: bool = True
+    in_flight: int = 0
+
+
+@dataclass
+class _Affinity:
+    """Sessão com turnos em voo: fica presa ao worker até `in_flight` zerar."""
+
+    worker_id: int
+    in_flight: int = 0
+    released: asyncio.Event = field(default_factory=asyncio.Event)
+
+
+class WorkerPool:
+    """
+    Pool de processos com roteamento por sessão. `process_message` tem a mesma assinatura do
+    agente (duck typing), então o pool serve de agente para `src.batch_runner.run_batch`.
+    Todas as chamadas assíncronas devem vir do mesmo event loop (o do front end).
+    """
+
+    def __init__(
+        self,
+        agent_factory: Callable[[], Any] = build_agent,
+        *,
+        workers: int | None = None,
+        vnodes: int | None = None,
+        policy_path: Path | None = None,
+    ):
+        policy = policy_section("serving", policy_path)
+        self.agent_factory = agent_factory
+        self.initial_workers = workers or policy.get("workers") or os.cpu_count() or 1
+        self.start_timeout_s = policy.get("start_timeout_s", 60)
+        self.drain_timeout_s = policy.get("drain_timeout_s", 30)
+        self.ring = HashRing(vnodes=vnodes or policy.get("vnodes", 64))
+        self._ctx = multiprocessing.get_context("spawn")
+        self._outbox = self._ctx.Queue()
+        self._workers: dict[int, _Worker] = {}
+        self._pending: dict[int, tuple[asyncio.Future, int, str]] = {}
+        self._affinity: dict[str, _Affinity] = {}
+        self._worker_ids = itertools.count()
+        self._request_ids = itertools.count()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._reader: threading.Thread | None = None
+
+    @property
+    def workers(self) -> dict[int, int | None]:
+        """worker_id -> pid dos workers que recebem sessões novas."""
+        return {w.worker_id: w.pid for w in self._workers.values() if w.accepting and w.alive}
+
+    async def __aenter__(self) -> "WorkerPool":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc: object) -> None:
+        await self.close()
+
+    async def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._reader = threading.Thread(target=self._read_results, name="worker-pool-reader", daemon=True)
+        self._reader.start()
+        await asyncio.gather(*(self.add_worker() for _ in range(self.initial_workers)))
+
+    async def add_worker(self) -> int:
+        """Inicia um worker e, quando ele fica pronto, o coloca no anel (rebalanceamento)."""
+        worker_id = next(self._worker_ids)
+        inbox = self._ctx.Queue()
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(worker_id, self.agent_factory, inbox, self._outbox),
+            name=f"agent-worker-{worker_id}",
+            daemon=True,
+        )
+        worker = _Worker(worker_id, process, inbox, asyncio.Event(), asyncio.Event())
+        self._workers[worker_id] = worker
+        await asyncio.to_thread(process.start)
+        try:
+            await asyncio.wait_for(worker.ready.wait(), self.start_timeout_s)
+        except TimeoutError:
+            worker.alive = False
+            process.kill()
+            raise WorkerUnavailableError(f"Worker {worker_id} não ficou pronto em {self.start_timeout_s}s") from None
+        if not worker.alive:
+            raise WorkerUnavailableError(f"Worker {worker_id} encerrou durante o warm-up")
+        self.ring.add(worker_id)
+        logger.info("Worker %d (pid %s) no anel; %d workers ativos", worker_id, worker.pid, len(self.ring))
+        return worker_id
+
+    async def remove_worker(self, worker_id: int) -> None:
+        """Tira o worker do anel, espera os turnos em voo (drain) e encerra o processo."""
+        worker = self._workers[worker_id]
+        worker.accepting = False
+        self.ring.remove(worker_id)
+        if worker.in_flight:
+            worker.drained.clear()
+            try:
+                await asyncio.wait_for(worker.drained.wait(), self.drain_timeout_s)
+            except TimeoutError:
+                logger.warning("Worker %d encerrado com %d turnos em voo", worker_id, worker.in_flight)
+        worker.inbox.put(None)
+        await asyncio.to_thread(worker.process.join, self.drain_timeout_s)
+        if worker.process.is_alive():
+            worker.process.kill()
+        worker.alive = False
+        self._fail_pending(worker_id)
+        del self._workers[worker_id]
+
+    async def close(self) -> None:
+        """Drena e encerra todos os workers."""
+        await asyncio.gather(*(self.remove_worker(wid) for wid in list(self._workers)))
+        if self._reader is not None:
+            self._outbox.put(None)
+            await asyncio.to_thread(self._reader.join)
+            self._reader = None
+
+    async def _route(self, session_id: str) -> _Worker:
+        while True:
+            affinity = self._affinity.get(session_id)
+            if affinity is None:
+                return self._workers[self.ring.node_for(session_id)]
+            worker = self._workers.get(affinity.worker_id)
+            if worker is not None and worker.accepting and worker.alive:
+                return worker
+            # Worker em drain: a sessão só muda de dono depois que o turno em voo terminar.
+            await affinity.released.wait()
+
+    async def process_message(
+        self,
+        session_id: str,
+        customer_message: str,
+        customer_tier: str = "standard",
+        *,
+        customer_id: str | None = None,
+    ) -> str:
+        worker = await self._route(session_id)
+        request_id = next(self._request_ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = (future, worker.worker_id, session_id)
+        worker.in_flight += 1
+        affinity = self._affinity.setdefault(session_id, _Affinity(worker.worker_id))
+        affinity.in_flight += 1
+        worker.inbox.put((request_id, session_id, customer_message, customer_tier, customer_id))
+        return await future
+
+    def _release(self, request_id: int) -> tuple[asyncio.Future, int] | None:
+        entry = self._pending.pop(request_id, None)
+        if entry is None:
+            return None
+        future, worker_id, session_id = entry
+        worker = self._workers.get(worker_id)
+        if worker is not None:
+            worker.in_flight -= 1
+            if worker.in_flight == 0:
+                worker.drained.set()
+        affinity = self._affinity.get(session_id)
+        if affinity is not None:
+            affinity.in_flight -= 1
+            if affinity.in_flight == 0:
+                del self._affinity[session_id]
+                affinity.released.set()
+        return future, worker_id
+
+    def _on_message(self, worker_id: int, request_id: int | None, kind: str, payload: Any) -> None:
+        worker = self._workers.get(worker_id)
+        if kind == "ready" and worker is not None:
+            worker.pid = payload
+            worker.ready.set()
+            return
+        if request_id is None:
+            return
+        released = self._release(request_id)
+        if released is None or released[0].done():
+            return
+        future = released[0]
+        if kind == "ok":
+            future.set_result(payload)
+        else:
+            future.set_exception(RuntimeError(f"Worker {worker_id}: {payload}"))
+
+    def _fail_pending(self, worker_id: int) -> None:
+        for request_id in [rid for rid, (_, wid, _) in self._pending.items() if wid == worker_id]:
+            released = self._release(request_id)
+            if released is not None and not released[0].done():
+                released[0].set_exception(WorkerUnavailableError(f"Worker {worker_id} encerrou com o turno em voo"))
+
+    def _on_worker_exit(self, worker_id: int) -> None:
+        """Worker morreu fora do drain: sai do anel (as sessões vão para os demais) e falha os turnos dele."""
+        worker = self._workers.get(worker_id)
+        if worker is None or not worker.alive:
+            return
+        if worker.accepting:
+            logger.error("Worker %d (pid %s) encerrou inesperadamente", worker_id, worker.pid)
+        worker.alive = False
+        worker.accepting = False
+        self.ring.remove(worker_id)
+        worker.ready.set()
+        worker.drained.set()
+        self._fail_pending(worker_id)
+
+    def _read_results(self) -> None:
+        """Thread leitora da fila de respostas: entrega cada mensagem ao event loop do pool."""
+        assert self._loop is not None
+        while True:
+            try:
+                message = self._outbox.get(timeout=_LIVENESS_POLL_S)
+            except queue.Empty:
+                for worker in list(self._workers.values()):
+                    if worker.alive and worker.process.exitcode is not None:
+                        self._loop.call_soon_threadsafe(self._on_worker_exit, worker.worker_id)
+                continue
+            if message is None:
+                return
+            self._loop.call_soon_threadsafe(self._on_message, *message)
+
+
+async def _main_async(args: argparse.Namespace) -> None:
+    from src.batch_runner import iter_jsonl_rows, run_batch
+
+    async with WorkerPool(_load_factory(args.factory), workers=args.workers) as pool:
+        logger.info("Pool pronto: %s", pool.workers)
+        summary = await run_batch(pool, iter_jsonl_rows(sys.stdin), sys.stdout, concurrency=args.concurrency)
+    logger.info(
+        "%d turnos (%d ok, %d erros) em %.1fs",
+        summary.rows,
+        summary.succeeded,
+        summary.failed,
+        summary.elapsed_s,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=None, help="padrão: serving.workers (0 = um por core)")
+    parser.add_argument("--factory", default="src.worker_pool:build_agent", help="modulo:funcao que cria o agente")
+    parser.add_argument("--concurrency", type=int, default=64, help="turnos em voo no pool")
+    args = parser.parse_args()
+
+    # Logs vão para stderr: a saída padrão é só JSONL
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s - %(message)s", stream=sys.stderr)
+    asyncio.run(_main_async(args))
+
+
+if __name__ == "__main__":
+    main()
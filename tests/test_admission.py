@@ -0,0 +1,158 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from src.admission import AdmissionController, AdmissionSettings, BoundedExecutor, ExecutorSettings
+from src.exceptions import OverloadedError
+from src.instrumentation import (
+    ADMISSION_REJECTED_TOTAL,
+    DEGRADED_TOTAL,
+    EXECUTOR_QUEUE_DEPTH,
+    EXECUTOR_REJECTED_TOTAL,
+    InMemorySink,
+    Instrumentation,
+    PrometheusTextExporter,
+)
+
+
+def test_saturated_backend_executor_fails_fast_without_starving_the_other():
+    """Sessões travadas lotam o executor delas; a busca vetorial segue no próprio pool e a excedente falha na hora."""
+    from src.memory_gateway import LongTermMemoryGateway
+
+    sink = InMemorySink()
+    instrumentation = Instrumentation(sink)
+    release = threading.Event()
+    session_executor = BoundedExecutor(
+        "session", ExecutorSettings(max_workers=2, max_queue=2), instrumentation=instrumentation
+    )
+    memory_gw = LongTermMemoryGateway(project_id="", location="", index_endpoint="", instrumentation=instrumentation)
+
+    async def scenario():
+        stuck = [asyncio.create_task(session_executor.run(release.wait)) for _ in range(4)]
+        await asyncio.sleep(0.05)
+        depth = sink.gauge(EXECUTOR_QUEUE_DEPTH, executor="session")
+        start = time.perf_counter()
+        with pytest.raises(OverloadedError):
+            await session_executor.run(time.sleep, 0)
+        rejected_s = time.perf_counter() - start
+        insights = await asyncio.wait_for(memory_gw.search_customer_insights("sessao_premium"), 1.0)
+        release.set()
+        await asyncio.gather(*stuck)
+        return depth, rejected_s, insights
+
+    depth, rejected_s, insights = asyncio.run(scenario())
+    assert depth == 2
+    assert rejected_s < 0.01
+    assert "conservador" in insights
+    assert session_executor.pending == 0
+    assert sink.counter(EXECUTOR_REJECTED_TOTAL, executor="session") == 1
+    assert sink.gauge(EXECUTOR_QUEUE_DEPTH, executor="session") == 0
+
+
+def test_memory_search_degrades_when_its_executor_is_full():
+    """Executor da busca cheio: contexto vazio imediato, sem retry nem falha contada no circuit breaker."""
+    from benchmarks._support import FakeMemoryService
+    from src.memory_gateway import LongTermMemoryGateway
+
+    sink = InMemorySink()
+    executor = BoundedExecutor("vector_search", ExecutorSettings(max_workers=1, max_queue=0))
+    service = FakeMemoryService(latency_s=0.2)
+    gw = LongTermMemoryGateway(service=service, executor=executor, instrumentation=Instrumentation(sink))
+
+    async def scenario():
+        return await asyncio.gather(*(gw.search_customer_insights(f"Sessao: {i}") for i in range(3)))
+
+    results = asyncio.run(scenario())
+    assert sorted(bool(r) for r in results) == [False, False, True]
+    assert service.calls == 1
+    assert gw.retrier.retries == 0
+    assert len(gw.breaker._window) == 1
+    assert sink.counter(DEGRADED_TOTAL, gateway="memory", reason="overloaded") == 2
+
+
+def test_admission_queues_then_rejects_excess_turns():
+    """Acima do limite: um turno espera a vaga na fila, os excedentes falham por fila cheia ou timeout."""
+    sink = InMemorySink()
+    settings = AdmissionSettings(enabled=True, max_in_flight_turns=2, max_queued_turns=1, queue_timeout_s=0.5)
+    admission = AdmissionController(settings, instrumentation=Instrumentation(sink))
+
+    async def turn(hold_s: float) -> str:
+        async with admission.admit():
+            await asyncio.sleep(hold_s)
+        return "ok"
+
+    async def scenario():
+        burst = await asyncio.gather(*(turn(0.05) for _ in range(5)), return_exceptions=True)
+        slow = [asyncio.create_task(turn(0.3)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        short = AdmissionController(
+            AdmissionSettings(enabled=True, max_in_flight_turns=0, max_queued_turns=1, queue_timeout_s=0.05)
+        )
+        with pytest.raises(OverloadedError, match="timeout"):
+            async with short.admit():
+                pass
+        await asyncio.gather(*slow)
+        return burst
+
+    burst = asyncio.run(scenario())
+    assert burst.count("ok") == 3
+    assert [type(r) for r in burst if r != "ok"] == [OverloadedError, OverloadedError]
+    assert sink.counter(ADMISSION_REJECTED_TOTAL, reason="queue_full") == 2
+    assert admission.in_flight == 0 and not admission._waiters
+
+
+def test_admission_timeout_racing_a_handover_returns_the_slot(monkeypatch):
+    """Se o timeout dispara depois de _release entregar a vaga ao waiter, a vaga volta ao pool."""
+    admission = AdmissionController(AdmissionSettings(enabled=True, max_in_flight_turns=1, max_queued_turns=1))
+
+    async def handover_then_timeout(waiter, timeout):
+        admission._release()
+        raise TimeoutError
+
+    async def scenario():
+        await admission._acquire()
+        with monkeypatch.context() as patch, pytest.raises(OverloadedError, match="timeout"):
+            patch.setattr(asyncio, "wait_for", handover_then_timeout)
+            await admission._acquire()
+
+    asyncio.run(scenario())
+    assert admission.in_flight == 0 and not admission._waiters
+
+
+def test_agent_sheds_turns_over_the_in_flight_limit(tmp_path):
+    """Com admissão habilitada, o turno excedente falha rápido e a rejeição aparece na exportação."""
+    pytest.importorskip("google.adk", reason="google-adk não instalado")
+    from benchmarks._support import FakeLlm
+    from src.agent_router import StatefulFinanceAgent
+    from src.memory_gateway import LongTermMemoryGateway
+    from src.session_gateway import NegotiationSessionGateway
+
+    policy = tmp_path / "policy.yaml"
+    policy.write_text(
+        "admission:\n  enabled: true\n  max_in_flight_turns: 1\n  max_queued_turns: 0\n", encoding="utf-8"
+    )
+    sink = InMemorySink()
+    agent = StatefulFinanceAgent(
+        session_gw=NegotiationSessionGateway(project_id="", location="", policy_path=policy),
+        memory_gw=LongTermMemoryGateway(project_id="", location="", index_endpoint="", policy_path=policy),
+        policy_path=policy,
+        model=FakeLlm(latency_s=0.2, reply=lambda _req: "Analisando."),
+        instrumentation=Instrumentation(sink),
+    )
+
+    async def timed(session_id: str):
+        start = time.perf_counter()
+        try:
+            return await agent.process_message(session_id, "Olá", "standard"), time.perf_counter() - start
+        except OverloadedError as e:
+            return e, time.perf_counter() - start
+
+    async def scenario():
+        return await asyncio.gather(timed("a"), timed("b"))
+
+    (first, _), (second, second_s) = asyncio.run(scenario())
+    assert first == "Analisando."
+    assert isinstance(second, OverloadedError)
+    assert second_s < 0.05
+    assert 'admission_rejected_total{reason="queue_full"} 1' in PrometheusTextExporter(sink).render()
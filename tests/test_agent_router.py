@@ -0,0 +1,301 @@
+import asyncio
+import time
+
+import pytest
+
+
+def _agent_factory():
+    """Import opcional: o agente depende do google-adk."""
+    pytest.importorskip("google.adk", reason="google-adk não instalado")
+    from benchmarks._support import FakeLlm, echo_system_instruction
+    from src.agent_router import StatefulFinanceAgent
+    from src.memory_gateway import LongTermMemoryGateway
+    from src.session_gateway import NegotiationSessionGateway
+
+    def build(latency_s: float = 0.0):
+        llm = FakeLlm(latency_s=latency_s, reply=echo_system_instruction)
+        agent = StatefulFinanceAgent(
+            session_gw=NegotiationSessionGateway(project_id="", location=""),
+            memory_gw=LongTermMemoryGateway(project_id="", location="", index_endpoint=""),
+            model=llm,
+        )
+        return agent, llm
+
+    return build
+
+
+async def _run_sessions(agent, n_sessions: int, turns: int) -> list[tuple[str, list[str]]]:
+    async def conversation(i: int) -> tuple[str, list[str]]:
+        session_id = f"load-{n_sessions}-{i}"
+        tier = "premium" if i % 2 else "standard"
+        replies = []
+        for _ in range(turns):
+            replies.append(await agent.process_message(session_id, "Quero financiar um carro.", tier))
+        return tier, replies
+
+    return await asyncio.gather(*(conversation(i) for i in range(n_sessions)))
+
+
+def test_parallel_sessions_have_no_prompt_cross_talk():
+    """N sessões concorrentes no mesmo agente: cada turno recebe o system prompt da sua própria FSM."""
+    build = _agent_factory()
+    agent, llm = build(latency_s=0.01)
+
+    results = asyncio.run(_run_sessions(agent, n_sessions=40, turns=2))
+
+    assert llm.calls == 80
+    for tier, replies in results:
+        for turn, prompt in enumerate(replies):
+            assert f"Perfil do Cliente: {tier}" in prompt
+            assert f"Tentativas de Recusa do Cliente: {turn}" in prompt
+
+
+def test_parallel_sessions_throughput_scales_with_n():
+    """Com LLM de latência fixa, 32 sessões em paralelo levam bem menos que 32x uma sessão."""
+    build = _agent_factory()
+    agent, _ = build(latency_s=0.05)
+
+    start = time.perf_counter()
+    asyncio.run(_run_sessions(agent, n_sessions=1, turns=1))
+    single = time.perf_counter() - start
+
+    start = time.perf_counter()
+    asyncio.run(_run_sessions(agent, n_sessions=32, turns=1))
+    parallel = time.perf_counter() - start
+
+    assert parallel < single * 8
+
+
+def test_stream_message_yields_chunks_before_generation_completes():
+    """TTFT < tempo total de geração: o primeiro chunk chega antes do LLM terminar."""
+    build = _agent_factory()
+    agent, llm = build(latency_s=0.3)
+    llm.reply = lambda _req: "Podemos oferecer uma taxa especial para o seu perfil hoje."
+
+    async def consume():
+        start = time.perf_counter()
+        first_chunk_at = None
+        chunks = []
+        async for chunk in agent.stream_message("stream-1", "Olá", "premium"):
+            if first_chunk_at is None:
+                first_chunk_at = time.perf_counter() - start
+            chunks.append(chunk)
+        return chunks, first_chunk_at, time.perf_counter() - start
+
+    chunks, ttft, total = asyncio.run(consume())
+    assert len(chunks) > 1
+    assert "".join(chunks) == llm.reply(None)
+    assert ttft < total / 2
+
+
+def test_process_message_is_stream_aggregate_and_checkpoints_turn():
+    """process_message devolve o texto completo e o checkpoint é salvo ao fim do stream."""
+    build = _agent_factory()
+    agent, llm = build()
+    llm.reply = lambda _req: "Taxa de 1.49% ao mês."
+
+    async def turns():
+        first = await agent.process_message("stream-2", "Olá", "standard")
+        _, state = await agent.session_gw.recover_or_create("stream-2", "standard")
+        return first, state
+
+    text, state = asyncio.run(turns())
+    assert text == "Taxa de 1.49% ao mês."
+    assert state.rejection_count == 1
+    assert state.version == 2
+
+
+def test_speculative_prefetch_overlaps_memory_with_session_recovery(tmp_path):
+    """Prefetch ligado: busca vetorial em paralelo à sessão; descartada fora dos estágios que a usam."""
+    pytest.importorskip("google.adk", reason="google-adk não instalado")
+    from benchmarks._support import CountingSessionService, FakeLlm, FakeMemoryService
+    from src.agent_router import StatefulFinanceAgent
+    from src.memory_gateway import LongTermMemoryGateway
+    from src.session_gateway import NegotiationSessionGateway
+    from src.telemetry import FinOpsTelemetry
+
+    policy = tmp_path / "policy.yaml"
+    policy.write_text("vector_search:\n  speculative_prefetch: true\n  cache_ttl_seconds: 0\n", encoding="utf-8")
+    telemetry = FinOpsTelemetry()
+    memory_service = FakeMemoryService(latency_s=0.05)
+    agent = StatefulFinanceAgent(
+        session_gw=NegotiationSessionGateway(service=CountingSessionService(latency_s=0.05)),
+        memory_gw=LongTermMemoryGateway(service=memory_service, policy_path=policy),
+        policy_path=policy,
+        model=FakeLlm(),
+        telemetry=telemetry,
+    )
+
+    async def scenario():
+        await agent.process_message("prefetch-1", "Olá", "premium")
+        session, state = await agent.session_gw.recover_or_create("prefetch-1", "premium")
+        state.funnel_stage = "rate_proposed"
+        await agent.session_gw.save_checkpoint(session, state)
+        await agent.process_message("prefetch-1", "A taxa está alta.", "premium")
+
+    asyncio.run(scenario())
+    assert memory_service.calls == 2
+    assert telemetry.prefetch_discarded == 1
+    assert telemetry.prefetch_used == 1
+    assert telemetry.prefetch_saved_s > 0.03
+
+
+def test_concurrent_turns_of_same_session_are_serialized():
+    """Duas mensagens simultâneas da mesma sessão: ambas concluem, sem ConcurrentWriteError."""
+    build = _agent_factory()
+    agent, llm = build(latency_s=0.02)
+
+    async def burst():
+        replies = await asyncio.gather(*(agent.process_message("same-session", f"msg {i}") for i in range(2)))
+        _, state = await agent.session_gw.recover_or_create("same-session", "standard")
+        return replies, state
+
+    replies, state = asyncio.run(burst())
+    assert llm.calls == 2
+    assert "Tentativas de Recusa do Cliente: 0" in replies[0]
+    assert "Tentativas de Recusa do Cliente: 1" in replies[1]
+    assert state.rejection_count == 2
+    assert state.version == 3
+    stats = agent.session_gw.lock_stats
+    assert stats.contended == 1
+    assert stats.wait_s_max > 0.01
+    assert len(agent.session_gw._session_locks) == 0
+
+
+def test_telemetry_measures_rendered_system_prompt():
+    """O custo do turno inclui o system prompt renderizado, não só a mensagem do cliente."""
+    pytest.importorskip("google.adk", reason="google-adk não instalado")
+    from benchmarks._support import FakeLlm
+    from src.agent_router import StatefulFinanceAgent
+    from src.memory_gateway import LongTermMemoryGateway
+    from src.session_gateway import NegotiationSessionGateway
+    from src.telemetry import FinOpsTelemetry
+
+    telemetry = FinOpsTelemetry()
+    agent = StatefulFinanceAgent(
+        session_gw=NegotiationSessionGateway(project_id="", location=""),
+        memory_gw=LongTermMemoryGateway(project_id="", location="", index_endpoint=""),
+        model=FakeLlm(reply=lambda _req: "Proposta enviada."),
+        telemetry=telemetry,
+    )
+    message = "Quero financiar."
+
+    async def turn():
+        await agent.process_message("telemetry-session", message, "premium")
+        return telemetry.last_turn_usage()
+
+    usage = asyncio.run(turn())
+    message_only = telemetry.count_tokens([message])[0]
+    assert telemetry.turns == 1
+    assert usage.input_tokens > 20 * message_only
+    assert usage.output_tokens > 0
+
+
+def test_instrumentation_times_every_turn_stage():
+    """Com sink habilitado, cada estágio do turno gera uma amostra no histograma."""
+    pytest.importorskip("google.adk", reason="google-adk não instalado")
+    from benchmarks._support import FakeLlm
+    from src.agent_router import StatefulFinanceAgent
+    from src.instrumentation import STAGE_SECONDS, InMemorySink, Instrumentation
+    from src.memory_gateway import LongTermMemoryGateway
+    from src.session_gateway import NegotiationSessionGateway
+
+    sink = InMemorySink()
+    agent = StatefulFinanceAgent(
+        session_gw=NegotiationSessionGateway(project_id="", location=""),
+        memory_gw=LongTermMemoryGateway(project_id="", location="", index_endpoint=""),
+        model=FakeLlm(latency_s=0.02, reply=lambda _req: "Vamos avaliar a proposta."),
+        instrumentation=Instrumentation(sink),
+    )
+
+    async def turn():
+        session, state = await agent.session_gw.recover_or_create("instrumented", "premium")
+        state.funnel_stage = "rate_proposed"
+        await agent.session_gw.save_checkpoint(session, state)
+        await agent.process_message("instrumented", "Está caro.", "premium")
+
+    asyncio.run(turn())
+    stages = {
+        "lock_wait",
+        "session_recover",
+        "render",
+        "memory_search",
+        "llm_first_chunk",
+        "llm_stream",
+        "checkpoint_save",
+    }
+    for stage in stages:
+        assert sink.histogram(STAGE_SECONDS, stage=stage).count == 1, stage
+    assert sink.histogram(STAGE_SECONDS, stage="llm_stream").sum >= 0.02
+
+
+def _budgeted_agent(tmp_path, *, llm_latency_s: float, memory_latency_s: float, turn_budget_s: float):
+    pytest.importorskip("google.adk", reason="google-adk não instalado")
+    from benchmarks._support import FakeLlm, FakeMemoryService
+    from src.agent_router import StatefulFinanceAgent
+    from src.instrumentation import InMemorySink, Instrumentation
+    from src.memory_gateway import LongTermMemoryGateway
+    from src.session_gateway import NegotiationSessionGateway
+    from src.telemetry import FinOpsTelemetry
+
+    policy = tmp_path / "policy.yaml"
+    policy.write_text(
+        f"deadline:\n  enabled: true\n  turn_budget_s: {turn_budget_s}\n  min_optional_stage_s: 0.01\n",
+        encoding="utf-8",
+    )
+    sink = InMemorySink()
+    telemetry = FinOpsTelemetry()
+    agent = StatefulFinanceAgent(
+        session_gw=NegotiationSessionGateway(project_id="", location="", policy_path=policy),
+        memory_gw=LongTermMemoryGateway(service=FakeMemoryService(latency_s=memory_latency_s), policy_path=policy),
+        policy_path=policy,
+        model=FakeLlm(latency_s=llm_latency_s, reply=lambda _req: "Proposta revisada."),
+        telemetry=telemetry,
+        instrumentation=Instrumentation(sink),
+    )
+
+    async def seed(session_id: str) -> None:
+        session, state = await agent.session_gw.recover_or_create(session_id, "premium")
+        state.funnel_stage = "rate_proposed"
+        await agent.session_gw.save_checkpoint(session, state)
+
+    return agent, sink, telemetry, seed
+
+
+def test_slow_memory_is_shed_and_turn_meets_budget(tmp_path):
+    """Busca vetorial mais lenta que a sua fração: cancelada, o turno responde dentro do orçamento."""
+    from src.instrumentation import STAGES_SHED_TOTAL
+
+    agent, sink, telemetry, seed = _budgeted_agent(
+        tmp_path, llm_latency_s=0.01, memory_latency_s=1.0, turn_budget_s=0.5
+    )
+
+    async def scenario():
+        await seed("budget-1")
+        start = time.perf_counter()
+        reply = await agent.process_message("budget-1", "A taxa está alta.", "premium")
+        return reply, time.perf_counter() - start
+
+    reply, elapsed = asyncio.run(scenario())
+    assert reply == "Proposta revisada."
+    assert elapsed < 0.5
+    assert sink.counter(STAGES_SHED_TOTAL, stage="memory_search", reason="timeout") == 1
+    assert telemetry.shed_stages["memory_search"] == 1
+
+
+def test_slow_llm_raises_deadline_exceeded(tmp_path):
+    """LLM que não responde dentro da janela dele: o turno falha com DeadlineExceededError sem checkpoint."""
+    from src.exceptions import DeadlineExceededError
+    from src.instrumentation import DEADLINE_EXCEEDED_TOTAL
+
+    agent, sink, _, _ = _budgeted_agent(tmp_path, llm_latency_s=2.0, memory_latency_s=0.0, turn_budget_s=0.3)
+
+    async def scenario():
+        with pytest.raises(DeadlineExceededError, match="LLM"):
+            await agent.process_message("budget-2", "Olá", "premium")
+        _, state = await agent.session_gw.recover_or_create("budget-2", "premium")
+        return state
+
+    state = asyncio.run(scenario())
+    assert state.rejection_count == 0
+    assert sink.counter(DEADLINE_EXCEEDED_TOTAL) == 1
@@ -0,0 +1,152 @@
+import asyncio
+import io
+import json
+import time
+
+import pytest
+from src.batch_runner import iter_jsonl_rows, run_batch
+
+
+class _EchoAgent:
+    """Agente mínimo (duck typing) que mede a concorrência máxima atingida."""
+
+    def __init__(self, latency_s: float = 0.01):
+        self.latency_s = latency_s
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def process_message(self, session_id: str, customer_message: str, customer_tier: str = "standard") -> str:
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency_s)
+            if customer_message == "boom":
+                raise RuntimeError("falha simulada")
+            return f"{customer_tier}:{customer_message}"
+        finally:
+            self.in_flight -= 1
+
+
+def test_run_batch_streams_jsonl_with_bounded_concurrency():
+    """Todas as linhas viram JSONL com latência; concorrência nunca passa do limite."""
+    agent = _EchoAgent()
+    rows = ({"session_id": f"s{i}", "message": f"m{i}", "tier": "premium"} for i in range(200))
+    out = io.StringIO()
+
+    summary = asyncio.run(run_batch(agent, rows, out, concurrency=16))
+
+    records = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert summary.rows == summary.succeeded == len(records) == 200
+    assert agent.max_in_flight == 16
+    assert sorted(r["index"] for r in records) == list(range(200))
+    assert all(r["status"] == "ok" and r["latency_ms"] >= 0 for r in records)
+    assert records[0]["response"].startswith("premium:")
+
+
+def test_run_batch_reads_input_lazily():
+    """O produtor não lê a entrada inteira: no máximo fila (2x) + turnos em voo à frente do que terminou."""
+    consumed = 0
+    completed = 0
+    peak_ahead = 0
+
+    def rows():
+        nonlocal consumed
+        for i in range(10_000):
+            consumed += 1
+            yield (f"s{i}", "m")
+
+    class _Probe(_EchoAgent):
+        async def process_message(self, *args, **kwargs):
+            nonlocal completed, peak_ahead
+            peak_ahead = max(peak_ahead, consumed - completed)
+            result = await super().process_message(*args, **kwargs)
+            completed += 1
+            return result
+
+    asyncio.run(run_batch(_Probe(latency_s=0), rows(), io.StringIO(), concurrency=8))
+
+    assert completed == 10_000
+    assert peak_ahead <= 8 * 3 + 1
+
+
+def test_run_batch_records_row_errors_and_continues():
+    """Falha em uma linha vira registro de erro; o lote segue."""
+    lines = [
+        json.dumps({"session_id": "a", "message": "ok"}),
+        "",
+        json.dumps({"session_id": "b", "message": "boom"}),
+    ]
+    out = io.StringIO()
+    summary = asyncio.run(run_batch(_EchoAgent(), iter_jsonl_rows(lines), out, concurrency=2))
+
+    records = {r["session_id"]: r for r in map(json.loads, out.getvalue().splitlines())}
+    assert summary.succeeded == 1 and summary.failed == 1
+    assert records["a"]["tier"] == "standard"
+    assert records["b"]["status"] == "error" and "falha simulada" in records["b"]["error"]
+
+
+def test_run_batch_reports_malformed_lines_and_continues():
+    """Linha com JSON inválido ou sem campo obrigatório vira erro com o número da linha; as demais seguem."""
+    lines = [
+        json.dumps({"session_id": "a", "message": "oi"}),
+        '{"session_id": "b", "message": ',
+        json.dumps({"session_id": "c"}),
+        json.dumps({"session_id": "d", "message": "tchau"}),
+    ]
+    out = io.StringIO()
+    summary = asyncio.run(run_batch(_EchoAgent(), iter_jsonl_rows(lines), out, concurrency=2))
+
+    records = sorted(map(json.loads, out.getvalue().splitlines()), key=lambda r: r["index"])
+    assert summary.rows == 4 and summary.succeeded == 2 and summary.failed == 2
+    assert [r["status"] for r in records] == ["ok", "error", "error", "ok"]
+    assert records[1]["line"] == 2 and "JSON inválido" in records[1]["error"]
+    assert records[2]["line"] == 3 and "message" in records[2]["error"]
+    assert records[3]["response"] == "standard:tchau"
+
+
+def test_run_batch_applies_per_backend_rate_limit():
+    """rate_limits={'llm': 40}: após o burst de 40 turnos, os demais começam a 40/s."""
+    rows = [(f"s{i}", "m") for i in range(60)]
+
+    start = time.perf_counter()
+    asyncio.run(run_batch(_EchoAgent(latency_s=0), rows, io.StringIO(), concurrency=60))
+    unlimited = time.perf_counter() - start
+
+    start = time.perf_counter()
+    asyncio.run(run_batch(_EchoAgent(latency_s=0), rows, io.StringIO(), concurrency=60, rate_limits={"llm": 40}))
+    limited = time.perf_counter() - start
+
+    assert unlimited < 0.3
+    assert limited >= 0.45
+
+
+def test_run_batch_charges_nothing_for_response_cache_hits(tmp_path):
+    """Turno servido pelo cache de respostas não chama o LLM: custo zero na linha e no total do lote."""
+    pytest.importorskip("google.adk", reason="google-adk não instalado")
+    from benchmarks._support import FakeLlm
+    from src.agent_router import StatefulFinanceAgent
+    from src.memory_gateway import LongTermMemoryGateway
+    from src.session_gateway import NegotiationSessionGateway
+    from src.telemetry import FinOpsTelemetry
+
+    policy = tmp_path / "policy.yaml"
+    policy.write_text("response_cache:\n  enabled: true\n  stages: [initial_contact]\n", encoding="utf-8")
+    llm = FakeLlm(reply=lambda _req: "Olá! Vamos simular seu financiamento.")
+    telemetry = FinOpsTelemetry()
+    agent = StatefulFinanceAgent(
+        session_gw=NegotiationSessionGateway(project_id="", location="", policy_path=policy),
+        memory_gw=LongTermMemoryGateway(project_id="", location="", index_endpoint="", policy_path=policy),
+        policy_path=policy,
+        model=llm,
+        telemetry=telemetry,
+    )
+    rows = [(f"abertura-{i}", "Quero financiar um carro.", "premium") for i in range(2)]
+    out = io.StringIO()
+
+    summary = asyncio.run(run_batch(agent, rows, out, concurrency=1, telemetry=telemetry))
+
+    miss, hit = sorted(map(json.loads, out.getvalue().splitlines()), key=lambda r: r["index"])
+    assert llm.calls == 1 and telemetry.response_cache_hits == 1
+    assert miss["cost_usd"] > 0
+    assert hit["status"] == "ok" and hit["cost_usd"] == 0
+    assert summary.total_cost == pytest.approx(miss["cost_usd"])
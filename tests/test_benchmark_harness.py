@@ -0,0 +1,74 @@
+import asyncio
+import json
+
+import pytest
+
+
+def test_e2e_harness_reports_latency_percentiles_and_errors(tmp_path):
+    """Cenários reduzidos do benchmark ponta a ponta rodam e produzem JSON comparável entre commits."""
+    pytest.importorskip("google.adk", reason="google-adk não instalado")
+    from benchmarks.agent_e2e import BackendProfile, Scenario, compare, main_async
+
+    fast = BackendProfile(llm_latency_s=0.005, session_latency_s=0.0, memory_latency_s=0.0)
+    scenarios = [
+        Scenario("hot", sessions=1, clients=5, turns=2, backends=fast),
+        Scenario("throttled", sessions=5, clients=5, turns=2, backends=BackendProfile(0.005, 0.5, 0.0, 0.0, 0.0, 0.5)),
+    ]
+
+    report = asyncio.run(main_async(scenarios))
+    json.dumps(report)  # serializável
+    hot, throttled = report["results"]
+    assert hot["turns"] == 10 and hot["errors"] == 0
+    assert hot["lock_contended"] > 0
+    assert 0 < hot["p50_ms"] <= hot["p95_ms"] <= hot["p99_ms"]
+    assert hot["turns_per_s"] > 0 and hot["peak_rss_mb"] > 0
+    assert throttled["errors"] > 0
+    assert throttled["memory_retries"] > 0
+    assert compare(report, report)[0] == "hot: turns_per_s +0.0%, p95_ms +0.0%, p99_ms +0.0%"
+
+
+def test_hedging_benchmark_caps_hedge_rate(tmp_path):
+    """Benchmark de hedging reduzido: hedges disparam na cauda e ficam abaixo do max_hedge_ratio."""
+    pytest.importorskip("google.adk", reason="google-adk não instalado")
+    from benchmarks.hedging import run
+
+    latency = {"base_ms": 2.0, "tail_prob": 0.05, "tail_ms": 40.0}
+    results = asyncio.run(run(400, 8, latency, tmp_path))
+
+    assert [(r["backend"], r["hedging"]) for r in results] == [
+        ("memory", False),
+        ("session", False),
+        ("memory", True),
+        ("session", True),
+    ]
+    for result in results:
+        assert 0 < result["p50_ms"] <= result["p99_ms"]
+        if result["hedging"]:
+            assert 0 < result["hedge_rate"] <= 0.1 + 10 / 400
+            assert result["hedge_wins"] > 0
+        else:
+            assert result["hedge_rate"] == 0
+
+
+def test_ingestion_benchmark_batches_amortize_backend_latency(tmp_path):
+    """Benchmark de ingestão reduzido: todas as sessões gravadas; lotes maiores, mais vazão."""
+    pytest.importorskip("google.adk", reason="google-adk não instalado")
+    from benchmarks.ingestion import run
+
+    results = asyncio.run(run(60, [1, 20], 5.0, tmp_path))
+
+    assert [(r["batch_size"], r["ingested"], r["batches"]) for r in results] == [(1, 60, 60), (20, 60, 3)]
+    assert results[1]["sessions_per_s"] > 3 * results[0]["sessions_per_s"]
+
+
+def test_session_keyspace_benchmark_partitions_listing_and_sweep(tmp_path):
+    """Benchmark de keyspace reduzido: listagem por cliente sem varrer o arquivo e varredura repartida entre shards."""
+    pytest.importorskip("google.adk", reason="google-adk não instalado")
+    from benchmarks.session_keyspace import run
+
+    legacy, partitioned = asyncio.run(run(4000, 4, 4, 0.25, tmp_path, lookups=50, list_samples=2))
+
+    assert (legacy["files"], partitioned["files"]) == (1, 4)
+    assert legacy["purged"] == partitioned["purged"] > 0
+    assert partitioned["list_customer_ms"] < legacy["list_customer_ms"]
+    assert 0 < partitioned["lookup_p50_us"] <= partitioned["lookup_p99_us"]
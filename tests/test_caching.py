@@ -0,0 +1,107 @@
+import asyncio
+
+import pytest
+from src.caching import AsyncTTLCache
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_cache_hit_until_ttl_expires():
+    """Valor servido do cache até o TTL vencer; depois recarrega."""
+    clock = _Clock()
+    cache = AsyncTTLCache(max_entries=10, ttl_s=60, clock=clock)
+    loads = []
+
+    async def loader(key):
+        loads.append(key)
+        return f"v{len(loads)}"
+
+    async def scenario():
+        assert await cache.get_or_load("q", loader, "q") == "v1"
+        assert await cache.get_or_load("q", loader, "q") == "v1"
+        clock.now = 61
+        assert await cache.get_or_load("q", loader, "q") == "v2"
+
+    asyncio.run(scenario())
+    assert cache.stats.hits == 1
+    assert cache.stats.misses == 2
+
+
+def test_cache_evicts_least_recently_used():
+    """LRU: acima de max_entries sai a chave menos usada recentemente."""
+    cache = AsyncTTLCache(max_entries=2, ttl_s=60)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == (True, 1)
+    cache.put("c", 3)
+
+    assert cache.get("b") == (False, None)
+    assert cache.get("a") == (True, 1)
+    assert cache.stats.evictions == 1
+
+
+def test_concurrent_identical_loads_are_coalesced():
+    """Chamadas concorrentes para a mesma chave compartilham um único load em voo."""
+    cache = AsyncTTLCache()
+    loads = []
+
+    async def slow_loader():
+        loads.append(1)
+        await asyncio.sleep(0.02)
+        return "insight"
+
+    async def scenario():
+        return await asyncio.gather(*(cache.get_or_load("q", slow_loader) for _ in range(20)))
+
+    assert asyncio.run(scenario()) == ["insight"] * 20
+    assert len(loads) == 1
+    assert cache.stats.misses == 1
+    assert cache.stats.coalesced == 19
+
+
+def test_failed_loads_are_not_cached():
+    """Erro do loader chega a todos os que aguardavam e a próxima chamada tenta de novo."""
+    cache = AsyncTTLCache()
+    calls = []
+
+    async def failing():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        raise RuntimeError("backend fora")
+
+    async def scenario():
+        return await asyncio.gather(*(cache.get_or_load("q", failing) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    assert all(isinstance(r, RuntimeError) for r in results)
+    with pytest.raises(RuntimeError):
+        asyncio.run(cache.get_or_load("q", failing))
+    assert len(calls) == 2
+    assert len(cache) == 0
+
+
+def test_cancelled_caller_does_not_cancel_shared_load():
+    """Cancelar quem iniciou o load não afeta os demais nem impede o cache de ser populado."""
+    cache = AsyncTTLCache()
+
+    async def slow_loader():
+        await asyncio.sleep(0.02)
+        return "insight"
+
+    async def scenario():
+        leader = asyncio.create_task(cache.get_or_load("q", slow_loader))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(cache.get_or_load("q", slow_loader))
+        await asyncio.sleep(0)
+        leader.cancel()
+        result = await follower
+        return leader.cancelled(), result
+
+    assert asyncio.run(scenario()) == (True, "insight")
+    assert cache.get("q") == (True, "insight")
@@ -0,0 +1,67 @@
+import time
+
+import pytest
+from benchmarks.import_time import COLD_START_IMPORT_BUDGET_RATIO, ENTRY_MODULES, REFERENCE_MODULE, measure
+from src.readiness import Readiness, start_warm_up
+
+
+@pytest.mark.parametrize("module", ENTRY_MODULES)
+def test_entry_module_does_not_load_heavy_sdks_on_import(module):
+    """Módulos de entrada não carregam ADK/google-genai/tiktoken no import."""
+    assert measure(module)["heavy_modules_loaded"] == []
+
+
+def test_entry_modules_import_within_budget_relative_to_deferred_sdk():
+    """O import de cada módulo de entrada custa uma fração do SDK adiado, medido no mesmo teste."""
+    pytest.importorskip("google.adk", reason="google-adk não instalado")
+    reference_ms = measure(REFERENCE_MODULE, 0)["import_ms"]
+    budget_ms = COLD_START_IMPORT_BUDGET_RATIO * reference_ms
+    assert {m: ms for m in ENTRY_MODULES if (ms := measure(m, 0)["import_ms"]) >= budget_ms} == {}
+
+
+def test_readiness_waits_for_all_warm_ups_and_records_failures():
+    """Prontidão só após todos os warm-ups; falha fica registrada sem bloquear o processo."""
+
+    def slow():
+        time.sleep(0.05)
+
+    def broken():
+        raise RuntimeError("sem credenciais")
+
+    readiness = Readiness()
+    readiness.start({"slow": slow, "broken": broken})
+    assert not readiness.ready
+    assert readiness.wait(timeout=5)
+    status = readiness.status()
+    assert status["pending"] == []
+    assert status["durations_ms"]["slow"] >= 50
+    assert "sem credenciais" in status["errors"]["broken"]
+
+
+def test_agent_warm_up_builds_runner_in_background():
+    """O runner do ADK é criado no warm-up; o primeiro turno já o encontra pronto."""
+    pytest.importorskip("google.adk", reason="google-adk não instalado")
+    import asyncio
+
+    from benchmarks._support import FakeLlm
+    from src.agent_router import StatefulFinanceAgent
+    from src.memory_gateway import LongTermMemoryGateway
+    from src.session_gateway import NegotiationSessionGateway
+    from src.telemetry import FinOpsTelemetry
+
+    telemetry = FinOpsTelemetry()
+    agent = StatefulFinanceAgent(
+        session_gw=NegotiationSessionGateway(project_id="", location=""),
+        memory_gw=LongTermMemoryGateway(project_id="", location="", index_endpoint=""),
+        model=FakeLlm(reply=lambda _req: "Pronto."),
+        telemetry=telemetry,
+    )
+    assert agent._runner is None
+
+    readiness = start_warm_up(agent, telemetry)
+    assert readiness.wait(timeout=30)
+    assert readiness.status()["errors"] == {}
+    runner = agent._runner
+    assert runner is not None
+    assert asyncio.run(agent.process_message("warm-session", "Oi")) == "Pronto."
+    assert agent.runner is runner
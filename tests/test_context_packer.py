@@ -0,0 +1,135 @@
+import asyncio
+
+import pytest
+from src.context_packer import ContextPacker, ScoredInsight
+
+
+def _words(texts):
+    """Contador falso: 1 token por palavra, registrando cada lote."""
+    _words.batches.append(list(texts))
+    return [len(t.split()) for t in texts]
+
+
+_words.batches = []
+
+
+def test_pack_ranks_by_score_and_drops_near_duplicates():
+    """Maior score primeiro; a quase-duplicata de menor score é descartada."""
+    packer = ContextPacker(max_tokens=100, count_tokens=_words)
+    packed = packer.pack(
+        [
+            ScoredInsight("Cliente prefere parcelas menores", 0.71),
+            ScoredInsight("Cliente negocia taxas com agressividade", 0.93),
+            ScoredInsight("cliente negocia taxas com agressividade!", 0.90),
+        ]
+    )
+
+    assert [i.content for i in packed.insights] == [
+        "Cliente negocia taxas com agressividade",
+        "Cliente prefere parcelas menores",
+    ]
+    assert packed.text == "- Cliente negocia taxas com agressividade\n- Cliente prefere parcelas menores"
+    assert packed.duplicates == 1
+    assert packed.trimmed_tokens == 6  # "- " + 5 palavras da duplicata
+
+
+def test_pack_puts_unscored_insights_after_all_scored_ones():
+    """Insights sem score vão para o fim, mesmo atrás de scores negativos, e mantêm a ordem do backend."""
+    packer = ContextPacker(max_tokens=100, count_tokens=_words)
+    packed = packer.pack(
+        [
+            ScoredInsight("sem score primeiro"),
+            ScoredInsight("similaridade negativa", -0.4),
+            ScoredInsight("sem score segundo"),
+            ScoredInsight("similaridade positiva", 0.2),
+        ]
+    )
+
+    assert [i.content for i in packed.insights] == [
+        "similaridade positiva",
+        "similaridade negativa",
+        "sem score primeiro",
+        "sem score segundo",
+    ]
+
+
+def test_pack_fits_token_budget_and_reports_trimmed_tokens():
+    """O insight que estoura o orçamento fica de fora sem bloquear os menores que ainda cabem."""
+    packer = ContextPacker(max_tokens=12, count_tokens=_words)
+    long_insight = "Histórico " + "detalhado " * 20
+    packed = packer.pack(
+        [
+            ScoredInsight("Cliente premium desde 2015", 0.9),
+            ScoredInsight(long_insight, 0.8),
+            ScoredInsight("Recusou seguro prestamista", 0.7),
+        ]
+    )
+
+    assert [i.content for i in packed.insights] == ["Cliente premium desde 2015", "Recusou seguro prestamista"]
+    assert packed.tokens == 9
+    assert packed.over_budget == 1
+    assert packed.trimmed_tokens == 22
+    assert packed.tokens <= packer.max_tokens
+
+
+def test_token_counts_are_cached_per_insight():
+    """Insights repetidos entre turnos não voltam ao tokenizer; o LRU é limitado."""
+    _words.batches.clear()
+    packer = ContextPacker(max_tokens=100, count_tokens=_words, token_cache_max_entries=2)
+    turn = [ScoredInsight("Cliente conservador", 0.9), ScoredInsight("Prefere prazo longo", 0.8)]
+
+    first = packer.pack(turn)
+    second = packer.pack(turn)
+    packer.pack([ScoredInsight("Quitou antecipado", 0.9)])
+
+    assert first == second
+    assert _words.batches == [["- Cliente conservador", "- Prefere prazo longo"], ["- Quitou antecipado"]]
+    assert len(packer._token_cache) == 2
+
+
+def test_agent_injects_packed_insights_and_records_trimmed_tokens(tmp_path):
+    """Documentos repetidos e longos não chegam ao prompt; a telemetria registra os tokens podados."""
+    pytest.importorskip("google.adk", reason="google-adk não instalado")
+    from benchmarks._support import FakeLlm, FakeMemoryService, echo_system_instruction
+    from src.agent_router import StatefulFinanceAgent
+    from src.instrumentation import INSIGHT_TOKENS_TRIMMED_TOTAL, InMemorySink, Instrumentation
+    from src.memory_gateway import LongTermMemoryGateway
+    from src.session_gateway import NegotiationSessionGateway
+    from src.telemetry import FinOpsTelemetry
+
+    policy = tmp_path / "policy.yaml"
+    policy.write_text("vector_search:\n  max_documents: 5\n  insight_token_budget: 40\n", encoding="utf-8")
+    documents = [
+        "O cliente prefere parcelas menores.",
+        "O cliente prefere parcelas menores",
+        "Resumo " + "da negociação anterior " * 40,
+    ]
+    prompts: list[str] = []
+
+    def capture(llm_request):
+        prompts.append(llm_request.contents[-1].parts[0].text)
+        return echo_system_instruction(llm_request)
+
+    sink = InMemorySink()
+    telemetry = FinOpsTelemetry()
+    agent = StatefulFinanceAgent(
+        session_gw=NegotiationSessionGateway(project_id="", location="", policy_path=policy),
+        memory_gw=LongTermMemoryGateway(service=FakeMemoryService(documents), policy_path=policy),
+        policy_path=policy,
+        model=FakeLlm(reply=capture),
+        telemetry=telemetry,
+        instrumentation=Instrumentation(sink),
+    )
+
+    async def turn():
+        session, state = await agent.session_gw.recover_or_create("packed", "premium")
+        state.funnel_stage = "rate_proposed"
+        await agent.session_gw.save_checkpoint(session, state)
+        await agent.process_message("packed", "Está caro.", "premium")
+
+    asyncio.run(turn())
+    assert prompts[-1].count("parcelas menores") == 1
+    assert "negociação anterior" not in prompts[-1]
+    assert telemetry.packed_turns == 1
+    assert telemetry.trimmed_tokens > 40
+    assert sink.counter(INSIGHT_TOKENS_TRIMMED_TOTAL) == telemetry.trimmed_tokens
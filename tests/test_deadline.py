@@ -0,0 +1,95 @@
+import asyncio
+import math
+
+import pytest
+from src.deadline import BudgetSettings, TurnBudget
+from src.exceptions import DeadlineExceededError
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+SETTINGS = BudgetSettings(
+    enabled=True,
+    turn_budget_s=10.0,
+    stage_shares={"session_recover": 0.1, "memory_search": 0.2, "llm": 0.6, "checkpoint_save": 0.1},
+    min_optional_stage_s=0.5,
+)
+
+
+def test_stage_windows_reserve_later_stages_and_cap_optional_ones():
+    """Cada estágio tem o restante menos a reserva dos seguintes; o opcional fica na própria fração."""
+    clock = _Clock()
+    budget = TurnBudget(SETTINGS, clock=clock)
+    assert budget.time_for("session_recover") == pytest.approx(1.0)
+    assert budget.time_for("memory_search") == pytest.approx(2.0)
+    assert budget.time_for("llm") == pytest.approx(9.0)
+    assert budget.time_for("checkpoint_save") == pytest.approx(10.0)
+
+    clock.now += 8.5  # sessão lenta consumiu quase todo o orçamento
+    assert budget.time_for("memory_search") == pytest.approx(0.0)
+    assert budget.time_for("llm") == pytest.approx(0.5)
+    assert budget.time_for("checkpoint_save") == pytest.approx(1.5)
+    clock.now += 2
+    assert budget.expired
+
+
+def test_optional_stage_is_skipped_or_cancelled_and_recorded():
+    """Sem janela mínima o estágio opcional nem começa; ao estourar a janela é cancelado."""
+    clock = _Clock()
+    budget = TurnBudget(SETTINGS, clock=clock)
+    started = []
+
+    async def search():
+        started.append(1)
+        await asyncio.sleep(10)
+        return "insights"
+
+    clock.now += 8.0
+    assert asyncio.run(budget.run_optional("memory_search", search(), "")) == ""
+    assert started == []
+
+    fast = TurnBudget(BudgetSettings(enabled=True, turn_budget_s=0.5, min_optional_stage_s=0.01))
+    assert asyncio.run(fast.run_optional("memory_search", search(), "")) == ""
+    assert started == [1]
+    assert budget.shed == [("memory_search", "budget")]
+    assert fast.shed == [("memory_search", "timeout")]
+
+
+def test_mandatory_stage_raises_when_window_is_exceeded():
+    """Estágio obrigatório que não cabe no orçamento levanta DeadlineExceededError."""
+    budget = TurnBudget(BudgetSettings(enabled=True, turn_budget_s=0.2))
+
+    with pytest.raises(DeadlineExceededError, match="session_recover"):
+        asyncio.run(budget.run("session_recover", asyncio.sleep(1)))
+    assert asyncio.run(budget.run("checkpoint_save", asyncio.sleep(0, "ok"))) == "ok"
+
+
+def test_disabled_budget_does_not_limit_any_stage():
+    """Desligado (padrão), o orçamento não corta estágios lentos nem descarta os opcionais."""
+    budget = TurnBudget(BudgetSettings(turn_budget_s=0.05))
+
+    async def turn():
+        recovered = await budget.run("session_recover", asyncio.sleep(0.1, "sessão"))
+        insights = await budget.run_optional("memory_search", asyncio.sleep(0.1, "insights"), "")
+        return recovered, insights
+
+    assert asyncio.run(turn()) == ("sessão", "insights")
+    assert budget.shed == []
+    assert budget.time_for("llm") == math.inf
+
+
+def test_budget_settings_from_policy_merges_stage_shares(tmp_path):
+    """A política pode sobrescrever só algumas frações; as demais ficam no padrão."""
+    policy = tmp_path / "policy.yaml"
+    policy.write_text("deadline:\n  turn_budget_s: 5\n  stage_shares:\n    llm: 0.5\n", encoding="utf-8")
+    settings = BudgetSettings.from_policy(policy)
+    assert not settings.enabled
+    assert settings.turn_budget_s == 5
+    assert settings.stage_shares["llm"] == 0.5
+    assert settings.stage_shares["checkpoint_save"] == 0.1
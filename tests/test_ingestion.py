@@ -0,0 +1,110 @@
+import asyncio
+import time
+
+import pytest
+from src.ingestion import IngestionQueue, IngestionSettings
+
+
+class _Recorder:
+    """Destino de ingestão falso: registra os lotes recebidos (e falha nos primeiros `failures`)."""
+
+    def __init__(self, latency_s: float = 0.0, failures: int = 0):
+        self.latency_s = latency_s
+        self.failures = failures
+        self.batches: list[list[str]] = []
+
+    async def load(self, session_id: str) -> str | None:
+        return None if session_id.startswith("sumiu") else session_id
+
+    async def ingest(self, sessions) -> None:
+        await asyncio.sleep(self.latency_s)
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("backend fora do ar")
+        self.batches.append(list(sessions))
+
+
+def test_batches_by_size_and_time_and_flushes_on_close():
+    """Lotes fecham por tamanho ou por intervalo; close() drena a fila e recusa novos ids."""
+    recorder = _Recorder()
+    settings = IngestionSettings(enabled=True, batch_size=20, batch_interval_s=0.05)
+
+    async def scenario():
+        queue = IngestionQueue(recorder.load, recorder.ingest, settings)
+        for i in range(45):
+            queue.enqueue(f"s{i}")
+        await asyncio.sleep(0.2)
+        queue.enqueue("tardia")
+        queue.enqueue("sumiu-1")
+        await queue.close()
+        return queue, queue.enqueue("depois")
+
+    queue, accepted = asyncio.run(scenario())
+    assert [len(b) for b in recorder.batches] == [20, 20, 5, 1]
+    assert recorder.batches[-1] == ["tardia"]
+    assert not accepted
+    assert (queue.stats.ingested, queue.stats.failed, queue.stats.dropped) == (46, 1, 1)
+
+
+def test_full_queue_drops_instead_of_blocking_and_failed_batch_is_counted():
+    """Fila cheia descarta na hora; um lote que falha não derruba o worker."""
+    from src.instrumentation import INGESTION_BATCHES_TOTAL, INGESTION_DROPPED_TOTAL, InMemorySink, Instrumentation
+
+    recorder = _Recorder(latency_s=0.05, failures=1)
+    sink = InMemorySink()
+    settings = IngestionSettings(enabled=True, queue_max_size=2, batch_size=1, batch_interval_s=0.01)
+
+    async def scenario():
+        async with IngestionQueue(
+            recorder.load, recorder.ingest, settings, instrumentation=Instrumentation(sink)
+        ) as queue:
+            start = time.perf_counter()
+            accepted = [queue.enqueue(f"s{i}") for i in range(5)]
+            return queue, accepted, time.perf_counter() - start
+
+    queue, accepted, enqueue_s = asyncio.run(scenario())
+    assert accepted == [True, True, False, False, False]
+    assert enqueue_s < 0.01
+    assert sink.counter(INGESTION_DROPPED_TOTAL, reason="queue_full") == 3
+    assert sink.counter(INGESTION_BATCHES_TOTAL, outcome="failed") == 1
+    assert recorder.batches == [["s1"]]
+    assert queue.stats.failed == 1
+
+
+def test_handoff_turn_is_ingested_in_background(tmp_path):
+    """A sessão que chega ao handoff é gravada na memória sem que o turno espere a ingestão."""
+    pytest.importorskip("google.adk", reason="google-adk não instalado")
+    from benchmarks._support import FakeLlm, FakeMemoryService
+    from src.agent_router import StatefulFinanceAgent
+    from src.memory_gateway import LongTermMemoryGateway
+    from src.session_gateway import NegotiationSessionGateway
+
+    policy = tmp_path / "policy.yaml"
+    policy.write_text(
+        "ingestion:\n  enabled: true\n  batch_interval_s: 0.01\nretry:\n  initial_wait_s: 0.01\n",
+        encoding="utf-8",
+    )
+    service = FakeMemoryService(ingest_latency_s=0.5)
+    agent = StatefulFinanceAgent(
+        session_gw=NegotiationSessionGateway(project_id="", location="", policy_path=policy),
+        memory_gw=LongTermMemoryGateway(service=service, policy_path=policy),
+        policy_path=policy,
+        model=FakeLlm(reply=lambda _req: "Entendo."),
+    )
+
+    async def scenario():
+        turn_s = []
+        for _ in range(3):  # max_rejections = 3 -> human_handoff no terceiro turno
+            start = time.perf_counter()
+            await agent.process_message("encerrada", "Não aceito.", "standard")
+            turn_s.append(time.perf_counter() - start)
+        pending = list(service.ingested_sessions)
+        await agent.close()
+        return turn_s, pending
+
+    turn_s, pending = asyncio.run(scenario())
+    assert max(turn_s) < 0.3
+    assert pending == []
+    assert service.ingested_sessions == ["encerrada"]
+    assert service.documents[-1] == "Negociação encerrada encerrada em human_handoff."
+    assert agent.ingestion.stats.enqueued == 1
@@ -0,0 +1,67 @@
+import asyncio
+import time
+
+import pytest
+from src.instrumentation import (
+    DEGRADED_TOTAL,
+    RETRIES_TOTAL,
+    STAGE_SECONDS,
+    InMemorySink,
+    Instrumentation,
+    PrometheusTextExporter,
+)
+from src.resilience import AsyncRetrier, RetrySettings, TokenBucket
+
+FAST_RETRY = RetrySettings(max_attempts=3, initial_wait_s=0.001, max_wait_s=0.005)
+
+
+def test_disabled_span_costs_under_5us():
+    """Sem sink, span/increment/observe são no-op: bem abaixo de 5µs por estágio."""
+    instrumentation = Instrumentation()
+    n = 100_000
+    start = time.perf_counter()
+    for _ in range(n):
+        with instrumentation.span("llm_stream"):
+            pass
+        instrumentation.increment(RETRIES_TOTAL, gateway="memory")
+    per_call = (time.perf_counter() - start) / n
+    assert per_call < 5e-6
+
+
+def test_span_feeds_stage_histogram_and_text_exposition():
+    """Spans viram amostras do histograma por estágio, exportadas no formato Prometheus."""
+    sink = InMemorySink()
+    instrumentation = Instrumentation(sink)
+    for _ in range(3):
+        with instrumentation.span("render"):
+            pass
+    instrumentation.increment(DEGRADED_TOTAL, gateway="memory", reason="empty_context")
+
+    histogram = sink.histogram(STAGE_SECONDS, stage="render")
+    assert histogram.count == 3
+    assert histogram.quantile(0.99) <= 0.0005
+
+    text = PrometheusTextExporter(sink).render()
+    assert "# TYPE turn_stage_seconds histogram" in text
+    assert 'turn_stage_seconds_bucket{stage="render",le="+Inf"} 3' in text
+    assert 'turn_stage_seconds_count{stage="render"} 3' in text
+    assert 'gateway_degraded_total{gateway="memory",reason="empty_context"} 1' in text
+
+
+def test_memory_gateway_counts_retries_and_degradation():
+    """Retries do tenacity e degradações para contexto vazio ficam visíveis nos contadores."""
+    pytest.importorskip("google.adk", reason="google-adk não instalado")
+    from benchmarks._support import FakeMemoryService
+    from src.memory_gateway import LongTermMemoryGateway
+
+    sink = InMemorySink()
+    gw = LongTermMemoryGateway(
+        service=FakeMemoryService(failure_rate=1.0),
+        retrier=AsyncRetrier(FAST_RETRY, bucket=TokenBucket(1000, 1000)),
+        instrumentation=Instrumentation(sink),
+    )
+
+    assert asyncio.run(gw.search_customer_insights("Sessao: falha")) == ""
+    retries = sink.counter(RETRIES_TOTAL, gateway="memory", operation="search", error="VectorSearchError")
+    assert retries == gw.retrier.retries == FAST_RETRY.max_attempts - 1
+    assert sink.counter(DEGRADED_TOTAL, gateway="memory", reason="empty_context") == 1
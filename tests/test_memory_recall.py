@@ -1,5 +1,7 @@
 import asyncio
+import time
 
+import pytest
 from src.memory_gateway import LongTermMemoryGateway
 
 
@@ -12,3 +14,81 @@ def test_ltm_gateway_graceful_degradation():
 
     res = asyncio.run(gw.search_customer_insights("query_que_nao_da_match"))
     assert res == "Nenhum histórico prévio encontrado para este CPF."
+
+
+def _gateway_with_fake_service(**service_kwargs):
+    pytest.importorskip("google.adk", reason="google-adk não instalado")
+    from benchmarks._support import FakeMemoryService
+
+    service = FakeMemoryService(**service_kwargs)
+    return LongTermMemoryGateway(service=service), service
+
+
+def test_ltm_gateway_caches_repeated_queries():
+    """Mesma query em turnos seguidos: uma única busca vetorial, demais servidas pelo cache."""
+    gw, service = _gateway_with_fake_service()
+
+    async def turns():
+        return [await gw.search_customer_insights("Sessao: abc") for _ in range(5)]
+
+    assert asyncio.run(turns()) == ["O cliente prefere parcelas menores."] * 5
+    assert service.calls == 1
+    assert gw.cache.stats.hits == 4
+    assert gw.cache.stats.misses == 1
+
+
+def test_ltm_gateway_coalesces_concurrent_queries():
+    """Consultas idênticas concorrentes compartilham a mesma chamada em voo."""
+    gw, service = _gateway_with_fake_service(latency_s=0.05)
+
+    async def burst():
+        return await asyncio.gather(*(gw.search_customer_insights("Sessao: xyz") for _ in range(10)))
+
+    assert len(set(asyncio.run(burst()))) == 1
+    assert service.calls == 1
+    assert gw.cache.stats.coalesced == 9
+
+
+def test_ltm_gateway_outage_opens_circuit_and_degrades_fast():
+    """Vector Search fora do ar: após abrir o circuito os turnos degradam sem retries; a sonda reabilita o backend."""
+    from src.instrumentation import BREAKER_TRANSITIONS_TOTAL, DEGRADED_TOTAL, InMemorySink, Instrumentation
+    from src.resilience import AsyncRetrier, BreakerSettings, CircuitBreaker, RetrySettings, TokenBucket
+
+    pytest.importorskip("google.adk", reason="google-adk não instalado")
+    from benchmarks._support import FakeMemoryService
+
+    service = FakeMemoryService(failure_rate=1.0)
+    sink = InMemorySink()
+    gw = LongTermMemoryGateway(
+        service=service,
+        retrier=AsyncRetrier(RetrySettings(initial_wait_s=0.01, max_wait_s=0.02), bucket=TokenBucket(1000, 1000)),
+        instrumentation=Instrumentation(sink),
+    )
+    gw.breaker = CircuitBreaker(
+        "vector_search",
+        BreakerSettings(window_size=10, min_calls=5, open_duration_s=0.1),
+        probe=gw._probe,
+        on_transition=gw._count_transition,
+    )
+
+    async def outage():
+        for i in range(5):
+            await gw.search_customer_insights(f"Sessao: warm-{i}")
+        calls_when_open = service.calls
+        start = time.perf_counter()
+        degraded = [await gw.search_customer_insights(f"Sessao: down-{i}") for i in range(200)]
+        elapsed = time.perf_counter() - start
+        service.failure_rate = 0.0
+        await asyncio.sleep(0.25)
+        recovered = await gw.search_customer_insights("Sessao: up")
+        return calls_when_open, degraded, elapsed, recovered
+
+    calls_when_open, degraded, elapsed, recovered = asyncio.run(outage())
+    assert gw.breaker.state == gw.breaker.CLOSED
+    assert degraded == [""] * 200
+    assert elapsed < 0.5
+    # Com o circuito aberto só as sondas tocam o backend
+    assert service.calls - calls_when_open <= 5
+    assert recovered == "O cliente prefere parcelas menores."
+    assert sink.counter(DEGRADED_TOTAL, gateway="memory", reason="circuit_open") >= 200
+    assert sink.counter(BREAKER_TRANSITIONS_TOTAL, breaker="vector_search", from_state="closed", to_state="open") == 1
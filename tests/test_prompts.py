@@ -0,0 +1,72 @@
+import os
+
+from src.prompts import PromptRegistry
+
+
+def _context(**overrides):
+    context = {"funnel_stage": "rate_proposed", "proposed_rate": 1.49, "rejection_count": 1, "customer_tier": "premium"}
+    return {**context, **overrides}
+
+
+def test_registry_is_independent_of_cwd(tmp_path, monkeypatch):
+    """Os templates vêm do diretório do pacote, não do CWD do processo."""
+    monkeypatch.chdir(tmp_path)
+    registry = PromptRegistry()
+    assert "Fase do Funil: rate_proposed" in registry.render("negotiator.jinja2", **_context())
+
+
+def test_render_is_memoized_per_state_tuple():
+    """Mesmo estado da FSM não é renderizado de novo; estados diferentes geram prompts diferentes."""
+    registry = PromptRegistry()
+    first = registry.render("negotiator.jinja2", **_context())
+    assert registry.render("negotiator.jinja2", **_context()) is first
+    other = registry.render("negotiator.jinja2", **_context(rejection_count=2))
+    assert "Tentativas de Recusa do Cliente: 2" in other
+    assert (registry.hits, registry.misses) == (1, 2)
+
+
+def test_render_cache_is_bounded():
+    registry = PromptRegistry(render_cache_max_entries=4)
+    for count in range(10):
+        registry.render("negotiator.jinja2", **_context(rejection_count=count))
+    assert len(registry._rendered) == 4
+
+
+def test_auto_reload_follows_mtime(tmp_path):
+    """Com auto_reload o template é recompilado quando o arquivo muda; sem ele, fica o compilado."""
+    template = tmp_path / "greeting.jinja2"
+    template.write_text("Olá {{ name }}", encoding="utf-8")
+    reloading = PromptRegistry(tmp_path, auto_reload=True)
+    frozen = PromptRegistry(tmp_path)
+    assert reloading.render("greeting.jinja2", name="Ana") == "Olá Ana"
+    assert frozen.render("greeting.jinja2", name="Ana") == "Olá Ana"
+
+    template.write_text("Oi {{ name }}", encoding="utf-8")
+    stat = template.stat()
+    os.utime(template, (stat.st_atime, stat.st_mtime + 10))
+
+    assert reloading.render("greeting.jinja2", name="Ana") == "Oi Ana"
+    assert frozen.render("greeting.jinja2", name="Ana") == "Olá Ana"
+
+
+def test_bytecode_cache_is_written(tmp_path):
+    """O bytecode compilado vai para disco e é reaproveitado por novos registros."""
+    cache_dir = tmp_path / "bytecode"
+    PromptRegistry(bytecode_cache_dir=cache_dir).get("negotiator.jinja2")
+    assert any(cache_dir.iterdir())
+    assert PromptRegistry(bytecode_cache_dir=cache_dir).render("negotiator.jinja2", **_context())
+
+
+def test_bytecode_cache_refuses_directory_writable_by_others(tmp_path):
+    """Diretório de cache com escrita para outros usuários é recusado: o Jinja executaria o bytecode plantado."""
+    shared = tmp_path / "shared"
+    shared.mkdir()
+    shared.chmod(0o777)
+    registry = PromptRegistry(bytecode_cache_dir=shared)
+    assert registry.env.bytecode_cache is None
+    assert registry.render("negotiator.jinja2", **_context())
+
+    private = tmp_path / "private"
+    PromptRegistry(bytecode_cache_dir=private)
+    assert private.stat().st_mode & 0o777 == 0o700
+    assert PromptRegistry(bytecode_cache=True).env.bytecode_cache is not None
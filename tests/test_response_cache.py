@@ -0,0 +1,104 @@
+import asyncio
+
+import pytest
+from src.response_cache import ResponseCache, normalize_message, response_key
+
+
+def test_key_normalizes_message_but_not_model_input():
+    """Variações de caixa, espaços e pontuação final colidem; prompt, insights e histórico não."""
+    assert normalize_message("  Olá,   quero FINANCIAR um carro!! ") == "olá, quero financiar um carro"
+    base = response_key("prompt", "Olá, quero financiar um carro.")
+    assert response_key("prompt", "olá,  quero financiar um carro") == base
+    assert response_key("prompt v2", "Olá, quero financiar um carro.") != base
+    assert response_key("prompt", "Olá, quero financiar um carro.", "- Cliente premium") != base
+    assert response_key("prompt", "Olá, quero financiar um carro.", history=["user: oi"]) != base
+
+
+def test_disk_tier_survives_new_instance_and_honors_stage_allowlist(tmp_path):
+    """A resposta gravada em disco é servida por outra instância; estágios fora da allowlist não usam o cache."""
+    path = tmp_path / "responses.sqlite"
+
+    async def scenario():
+        first = ResponseCache(stages=["initial_contact"], disk_path=path)
+        await first.put("k1", "Bem-vindo!")
+        first.close()
+
+        second = ResponseCache(stages=["initial_contact"], disk_path=path)
+        hit, miss = await second.get("k1"), await second.get("k2")
+        try:
+            return second, hit, miss
+        finally:
+            second.close()
+
+    cache, hit, miss = asyncio.run(scenario())
+    assert (hit, miss) == ("Bem-vindo!", None)
+    assert cache.stats.hits == 1 and cache.stats.misses == 1
+    assert cache.cacheable("initial_contact")
+    assert not cache.cacheable("rate_proposed")
+    assert not ResponseCache(enabled=False).cacheable("initial_contact")
+
+
+def test_disk_tier_is_capped_and_sweeps_expired_rows_on_write(tmp_path):
+    """O disco mantém no máximo `max_entries` linhas e as gravações disparam a varredura de expiradas."""
+    from src.response_cache import _DiskTier
+
+    now = [1000.0]
+    disk = _DiskTier(tmp_path / "responses.sqlite", 100.0, max_entries=3, sweep_interval_s=50.0, clock=lambda: now[0])
+    try:
+        for i in range(5):
+            now[0] += 1
+            disk.put(f"k{i}", f"resposta {i}")
+        assert [disk.get(f"k{i}") for i in range(5)] == [None, None, "resposta 2", "resposta 3", "resposta 4"]
+
+        now[0] += 100
+        disk.put("k5", "resposta 5")
+        rows = disk._conn.execute("SELECT key FROM responses ORDER BY key").fetchall()
+    finally:
+        disk.close()
+    assert rows == [("k5",)]
+
+
+def test_agent_serves_identical_opening_from_cache(tmp_path):
+    """Aberturas idênticas chamam o LLM uma vez; o hit grava o turno no histórico e conta na telemetria."""
+    pytest.importorskip("google.adk", reason="google-adk não instalado")
+    from benchmarks._support import FakeLlm
+    from src.agent_router import StatefulFinanceAgent
+    from src.instrumentation import RESPONSE_CACHE_TOTAL, InMemorySink, Instrumentation
+    from src.memory_gateway import LongTermMemoryGateway
+    from src.session_gateway import NegotiationSessionGateway
+    from src.telemetry import FinOpsTelemetry
+
+    policy = tmp_path / "policy.yaml"
+    policy.write_text("response_cache:\n  enabled: true\n  stages: [initial_contact]\n", encoding="utf-8")
+    llm = FakeLlm(reply=lambda _req: "Olá! Vamos simular seu financiamento.")
+    sink = InMemorySink()
+    telemetry = FinOpsTelemetry()
+    agent = StatefulFinanceAgent(
+        session_gw=NegotiationSessionGateway(project_id="", location="", policy_path=policy),
+        memory_gw=LongTermMemoryGateway(project_id="", location="", index_endpoint="", policy_path=policy),
+        policy_path=policy,
+        model=llm,
+        telemetry=telemetry,
+        instrumentation=Instrumentation(sink),
+    )
+
+    async def scenario():
+        first = await agent.process_message("abertura-1", "Quero financiar um carro.", "premium")
+        second = await agent.process_message("abertura-2", "quero financiar um carro", "premium")
+        session, state = await agent.session_gw.recover_or_create("abertura-2", "premium")
+
+        proposal, _ = await agent.session_gw.recover_or_create("proposta", "premium")
+        _, seeded = await agent.session_gw.recover_or_create("proposta", "premium")
+        seeded.funnel_stage = "rate_proposed"
+        await agent.session_gw.save_checkpoint(proposal, seeded)
+        await agent.process_message("proposta", "Quero financiar um carro.", "premium")
+        return first, second, session, state
+
+    first, second, session, state = asyncio.run(scenario())
+    assert first == second == "Olá! Vamos simular seu financiamento."
+    assert llm.calls == 2  # abertura-1 e a sessão em rate_proposed (fora da allowlist)
+    assert [e.author for e in session.events if e.content] == ["user", "StatefulAutoFinanceNegotiator"]
+    assert state.rejection_count == 1
+    assert telemetry.response_cache_hits == 1
+    assert telemetry.response_cache_hit_rate == 0.5
+    assert sink.counter(RESPONSE_CACHE_TOTAL, outcome="hit") == 1
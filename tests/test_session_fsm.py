@@ -55,3 +55,23 @@ def test_invalid_funnel_stage_rejected():
     """Pydantic deve bloquear um estágio de funil inventado pelo LLM."""
     with pytest.raises(ValidationError):
         NegotiationState(funnel_stage="fase_inventada_pelo_llm", customer_tier="premium")
+
+
+def test_dirty_tracking_reports_only_changed_fields():
+    """Checkpoint delta: só os campos alterados (+ version) desde o último save."""
+    state = NegotiationState(funnel_stage="rate_proposed", customer_tier="premium", proposed_rate=1.49)
+    assert state.dirty_delta() == {"version": 1}
+
+    state.increment_rejection(max_rejections=3)
+    state.bump_version()
+    assert state.dirty_delta() == {"rejection_count": 1, "version": 2}
+
+    state.mark_clean()
+    assert state.dirty_fields == set()
+
+
+def test_mark_all_dirty_forces_full_delta():
+    """Estado recriado (sessão vazia/corrompida) precisa enviar todos os campos."""
+    state = NegotiationState(funnel_stage="initial_contact", customer_tier="standard")
+    state.mark_all_dirty()
+    assert state.dirty_delta() == state.model_dump()
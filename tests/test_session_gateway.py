@@ -5,8 +5,9 @@ import pytest
 
 def _session_gateway():
     """Import opcional: evita Skip no nível do módulo (INTERNALERROR com pytest-asyncio)."""
-    pytest.importorskip("google_adk", reason="google-adk não instalado (opcional para testes de gateway)")
+    pytest.importorskip("google.adk", reason="google-adk não instalado (opcional para testes de gateway)")
     from src.session_gateway import NegotiationSessionGateway
+
     return NegotiationSessionGateway
 
 
@@ -33,3 +34,171 @@ def test_session_gateway_save_checkpoint_async():
     session2, state2 = asyncio.run(gw.recover_or_create("test-session-2", "standard"))
     assert state2.rejection_count == 1
     assert state2.version >= 1
+
+
+def _counting_gateway(single_writer: bool):
+    gateway_cls = _session_gateway()
+    from benchmarks._support import CountingSessionService
+
+    service = CountingSessionService()
+    return gateway_cls(service=service, single_writer=single_writer), service
+
+
+def test_save_checkpoint_single_writer_skips_occ_refetch():
+    """single_writer: o save usa a versão vista no recover e faz só o append_event (1 round trip)."""
+    gw, service = _counting_gateway(single_writer=True)
+
+    async def turn():
+        session, state = await gw.recover_or_create("sw-session", "premium")
+        state.increment_rejection(max_rejections=3)
+        service.calls.clear()
+        await gw.save_checkpoint(session, state)
+        return state
+
+    state = asyncio.run(turn())
+    assert dict(service.calls) == {"append_event": 1}
+    assert state.version == 2
+
+    state = asyncio.run(turn())
+    assert state.rejection_count == 2
+    assert state.version == 3
+
+
+def test_save_checkpoint_default_path_refetches_for_occ():
+    """Sem single_writer o save mantém o get de verificação OCC antes do append."""
+    gw, service = _counting_gateway(single_writer=False)
+
+    async def turn():
+        session, state = await gw.recover_or_create("occ-session", "standard")
+        service.calls.clear()
+        await gw.save_checkpoint(session, state)
+
+    asyncio.run(turn())
+    assert dict(service.calls) == {"get_session": 1, "append_event": 1}
+
+
+def test_save_checkpoint_single_writer_still_detects_stale_state():
+    """Versão divergente do cache local cai no caminho com re-fetch e detecta o conflito."""
+    from src.exceptions import ConcurrentWriteError
+
+    gw, _ = _counting_gateway(single_writer=True)
+
+    async def race():
+        session_a, state_a = await gw.recover_or_create("race-session", "standard")
+        session_b, state_b = await gw.recover_or_create("race-session", "standard")
+        await gw.save_checkpoint(session_a, state_a)
+        await gw.save_checkpoint(session_b, state_b)
+
+    with pytest.raises(ConcurrentWriteError):
+        asyncio.run(race())
+
+
+def _checkpoint_deltas(service, session_id: str) -> list[dict]:
+    from src.session_gateway import APP_NAME, USER_ID
+
+    session = service._get_session_impl(app_name=APP_NAME, user_id=USER_ID, session_id=session_id)
+    return [e.actions.state_delta for e in session.events if e.author == "StatefulFinanceAgent"]
+
+
+def test_save_checkpoint_sends_only_dirty_fields():
+    """O state_delta do checkpoint contém só o que mudou (+ version), e o estado recuperado é o completo."""
+    gw, service = _counting_gateway(single_writer=False)
+
+    async def turn():
+        session, state = await gw.recover_or_create("delta-session", "premium")
+        state.increment_rejection(max_rejections=3)
+        await gw.save_checkpoint(session, state)
+        return await gw.recover_or_create("delta-session", "premium")
+
+    _, state = asyncio.run(turn())
+    assert _checkpoint_deltas(service, "delta-session") == [{"rejection_count": 1, "version": 2}]
+    assert state.rejection_count == 1
+    assert state.customer_tier == "premium"
+
+
+def test_compaction_folds_history_into_snapshot():
+    """Ao atingir o limite de eventos, a sessão é recriada com o state consolidado e poucos eventos."""
+    gateway_cls = _session_gateway()
+    from benchmarks._support import CountingSessionService
+    from src.session_gateway import APP_NAME, USER_ID
+
+    service = CountingSessionService()
+    gw = gateway_cls(service=service, compaction_event_threshold=5, compaction_keep_recent_events=2)
+
+    async def turns():
+        for _ in range(12):
+            session, state = await gw.recover_or_create("compact-session", "standard")
+            state.rejection_count += 1
+            await gw.save_checkpoint(session, state)
+        return await gw.recover_or_create("compact-session", "standard")
+
+    session, state = asyncio.run(turns())
+    assert gw.compactions == 2
+    assert state.rejection_count == 12
+    assert state.version == 13
+    stored = service._get_session_impl(app_name=APP_NAME, user_id=USER_ID, session_id="compact-session")
+    assert len(stored.events) < 5
+
+
+def test_just_compacted_session_is_not_compacted_again_on_next_turn():
+    """Depois da compactação sobram `keep` eventos, abaixo do limite; limite <= keep é rejeitado."""
+    gateway_cls = _session_gateway()
+    from benchmarks._support import CountingSessionService
+    from google.adk.events.event import Event
+    from google.genai import types
+
+    service = CountingSessionService()
+    gw = gateway_cls(service=service, compaction_event_threshold=8, compaction_keep_recent_events=2)
+    compactions_per_turn = []
+
+    async def turns():
+        for i in range(6):
+            session, state = await gw.recover_or_create("chatty-session", "standard")
+            message = types.Content(role="user", parts=[types.Part(text=f"mensagem {i}")])
+            await gw.append_event(session, Event(invocation_id=f"turn-{i}", author="user", content=message))
+            state.rejection_count += 1
+            await gw.save_checkpoint(session, state)
+            compactions_per_turn.append(gw.compactions)
+
+    asyncio.run(turns())
+    assert compactions_per_turn == [0, 0, 0, 1, 1, 1]
+    with pytest.raises(ValueError):
+        gateway_cls(service=service, compaction_event_threshold=5, compaction_keep_recent_events=10)
+
+
+def test_compaction_failure_restores_original_session():
+    """Se a recriação falha no meio da compactação, o state FSM e o histórico originais são restaurados."""
+    gateway_cls = _session_gateway()
+    from benchmarks._support import CountingSessionService
+    from src.session_gateway import APP_NAME, USER_ID
+
+    class FailingCreateService(CountingSessionService):
+        fail_next_create = False
+
+        async def create_session(self, **kwargs):
+            if self.fail_next_create:
+                self.fail_next_create = False
+                raise ConnectionError("backend indisponível")
+            return await super().create_session(**kwargs)
+
+    service = FailingCreateService()
+    gw = gateway_cls(service=service, compaction_event_threshold=0)
+
+    async def scenario():
+        for _ in range(4):
+            session, state = await gw.recover_or_create("fragile-session", "premium")
+            state.rejection_count += 1
+            await gw.save_checkpoint(session, state)
+        session, _ = await gw.recover_or_create("fragile-session", "premium")
+        service.fail_next_create = True
+        with pytest.raises(ConnectionError):
+            await gw.compact_session(session)
+        return await gw.recover_or_create("fragile-session", "premium")
+
+    _, state = asyncio.run(scenario())
+    assert gw.compactions == 0
+    assert state.rejection_count == 4
+    assert state.customer_tier == "premium"
+    assert state.version == 5
+    stored = service._get_session_impl(app_name=APP_NAME, user_id=USER_ID, session_id="fragile-session")
+    assert len(stored.events) == 4
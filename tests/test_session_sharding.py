@@ -0,0 +1,132 @@
+import asyncio
+from collections import Counter
+
+import pytest
+from src.session_sharding import APP_NAME, ConsistentHashSharding, SingleShard, sharding_from_policy
+
+
+def test_consistent_hash_sharding_is_stable_balanced_and_moves_few_customers():
+    """Mesmo cliente, mesmo shard; clientes espalhados entre os app_names; um shard novo move só ~1/N."""
+    customers = [f"cliente-{i}" for i in range(4000)]
+    four = ConsistentHashSharding(4)
+    five = ConsistentHashSharding(5)
+
+    placement = {c: four.shard_for(c) for c in customers}
+    assert all(ConsistentHashSharding(4).shard_for(c) == shard for c, shard in placement.items())
+    counts = Counter(shard.app_name for shard in placement.values())
+    assert set(counts) == {f"{APP_NAME}-{i:02d}" for i in range(4)}
+    assert min(counts.values()) > len(customers) / 4 * 0.6
+    moved = [c for c in customers if five.shard_for(c).index != placement[c].index]
+    assert all(five.shard_for(c).index == 4 for c in moved)
+    assert len(moved) < len(customers) * 0.35
+
+    assert SingleShard().shard_for("qualquer").app_name == APP_NAME
+    assert isinstance(sharding_from_policy({}), SingleShard)
+    assert len(sharding_from_policy({"shards": 3}).shards) == 3
+
+
+def test_customer_sessions_are_partitioned_across_sqlite_files(tmp_path):
+    """Com `{shard}` no caminho, cada shard tem o seu arquivo; o mesmo session_id em clientes diferentes não colide."""
+    pytest.importorskip("google.adk", reason="google-adk não instalado")
+    from src.session_gateway import NegotiationSessionGateway
+
+    policy = tmp_path / "policy.yaml"
+    db = tmp_path / "sessions-{shard}.db"
+    policy.write_text(f"session:\n  shards: 4\n  sqlite_path: '{db}'\n", encoding="utf-8")
+    gw = NegotiationSessionGateway(project_id="", location="", policy_path=policy)
+    customers = [f"cliente-{i}" for i in range(40)]
+
+    async def scenario():
+        for customer in customers:
+            for n in range(2):
+                session, state = await gw.recover_or_create(f"negociacao-{n}", user_id=customer)
+                state.proposed_rate = 1.5 + n
+                await gw.save_checkpoint(session, state)
+        listed = await gw.list_customer_sessions("cliente-7")
+        _, state = await gw.recover_or_create("negociacao-1", user_id="cliente-7")
+        missing = await gw.get_session("negociacao-1")
+        return listed, state, missing
+
+    listed, state, missing = asyncio.run(scenario())
+    assert len(gw.services) == 4
+    assert sorted(p.name for p in tmp_path.glob("sessions-*.db")) == [f"sessions-{i:02d}.db" for i in range(4)]
+    assert {s.user_id for s in listed} == {"cliente-7"}
+    assert sorted(s.id for s in listed) == ["negociacao-0", "negociacao-1"]
+    assert listed[0].app_name == gw.shard_for("cliente-7").app_name
+    assert (state.proposed_rate, state.version) == (2.5, 2)
+    assert missing is None
+    per_file = [len(gw.service_for(s)._list_sessions_impl(s.app_name, None).sessions) for s in gw.sharding.shards]
+    assert sum(per_file) == 80 and min(per_file) > 0
+
+
+def test_legacy_sessions_migrate_on_first_read_and_in_bulk():
+    """Sessões do usuário "default" vão para a partição do cliente com estado e histórico, e saem do layout legado."""
+    pytest.importorskip("google.adk", reason="google-adk não instalado")
+    from google.adk.events.event import Event
+    from google.genai import types
+    from src.session_gateway import NegotiationSessionGateway
+    from src.session_sharding import DEFAULT_USER_ID
+
+    legacy_gw = NegotiationSessionGateway(project_id="", location="")
+
+    async def seed(session_id: str) -> None:
+        session, state = await legacy_gw.recover_or_create(session_id, "premium")
+        content = types.Content(role="user", parts=[types.Part(text="Quero 1.2%")])
+        await legacy_gw.service.append_event(session, Event(author="user", invocation_id="e-1", content=content))
+        state.increment_rejection(max_rejections=3)
+        await legacy_gw.save_checkpoint(session, state)
+
+    gw = NegotiationSessionGateway(service=legacy_gw.service, sharding=ConsistentHashSharding(2), legacy_fallback=True)
+
+    async def scenario():
+        for session_id in ("antiga-1", "antiga-2", "antiga-3"):
+            await seed(session_id)
+        session, state = await gw.recover_or_create("antiga-1", "premium", user_id="cliente-a")
+        again, _ = await gw.recover_or_create("antiga-1", "premium", user_id="cliente-a")
+        _, fresh_state = await gw.recover_or_create("nova", "standard", user_id="cliente-a")
+        bulk = await gw.migrate_legacy_sessions({"antiga-2": "cliente-b", "antiga-3": "cliente-c", "sumiu": "x"})
+        remaining = await gw.service.list_sessions(app_name=APP_NAME, user_id=DEFAULT_USER_ID)
+        moved = await gw.get_session("antiga-3", user_id="cliente-c")
+        return session, state, again, fresh_state, bulk, remaining, moved
+
+    session, state, again, fresh_state, bulk, remaining, moved = asyncio.run(scenario())
+    assert session.user_id == "cliente-a"
+    assert session.app_name == gw.shard_for("cliente-a").app_name
+    assert (state.rejection_count, state.customer_tier, state.version) == (1, "premium", 2)
+    assert [e.content.parts[0].text for e in session.events if e.content] == ["Quero 1.2%"]
+    assert len(again.events) == len(session.events)
+    assert fresh_state.funnel_stage == "initial_contact"
+    assert bulk == 2
+    assert gw.migrations == 3
+    assert remaining.sessions == []
+    assert moved.state["rejection_count"] == 1
+
+
+def test_agent_turn_runs_under_the_customer_partition():
+    """O turno com customer_id grava a sessão na partição do cliente, pelo Runner do shard dele."""
+    pytest.importorskip("google.adk", reason="google-adk não instalado")
+    from benchmarks._support import FakeLlm
+    from src.agent_router import StatefulFinanceAgent
+    from src.memory_gateway import LongTermMemoryGateway
+    from src.session_gateway import NegotiationSessionGateway
+
+    session_gw = NegotiationSessionGateway(project_id="", location="", sharding=ConsistentHashSharding(3))
+    agent = StatefulFinanceAgent(
+        session_gw=session_gw,
+        memory_gw=LongTermMemoryGateway(project_id="", location="", index_endpoint=""),
+        model=FakeLlm(reply=lambda _req: "Posso ajudar."),
+    )
+    customers = ["cliente-a", "cliente-b", "cliente-c", "cliente-d"]
+
+    async def scenario():
+        replies = [await agent.process_message("negociacao", "Olá", customer_id=c) for c in customers]
+        sessions = [await session_gw.get_session("negociacao", user_id=c) for c in customers]
+        return replies, sessions, await session_gw.get_session("negociacao")
+
+    replies, sessions, legacy = asyncio.run(scenario())
+    assert replies == ["Posso ajudar."] * 4
+    assert legacy is None
+    for customer, session in zip(customers, sessions, strict=True):
+        assert session.app_name == session_gw.shard_for(customer).app_name
+        assert [e.author for e in session.events if e.content] == ["user", "StatefulAutoFinanceNegotiator"]
+    assert set(agent._runners) == {session_gw.shard_for(c).index for c in customers}
@@ -0,0 +1,128 @@
+import asyncio
+import multiprocessing
+
+import pytest
+
+pytest.importorskip("google.adk", reason="google-adk não instalado")
+
+from src.exceptions import ConcurrentWriteError  # noqa: E402
+from src.session_gateway import APP_NAME, USER_ID, NegotiationSessionGateway  # noqa: E402
+from src.sqlite_session_service import SqliteSessionService  # noqa: E402
+
+
+def _gateway(path, **kwargs) -> NegotiationSessionGateway:
+    return NegotiationSessionGateway(service=SqliteSessionService(path, **kwargs))
+
+
+def test_checkpoint_survives_restart(tmp_path):
+    """O estado salvo num processo é recuperado por um serviço novo sobre o mesmo arquivo."""
+    db = tmp_path / "sessions.db"
+    gw = _gateway(db)
+
+    async def first_run():
+        session, state = await gw.recover_or_create("durable", "premium")
+        state.funnel_stage = "rate_proposed"
+        state.proposed_rate = 1.29
+        await gw.save_checkpoint(session, state)
+
+    asyncio.run(first_run())
+    gw.service.close()
+
+    _, state = asyncio.run(_gateway(db).recover_or_create("durable", "premium"))
+    assert (state.funnel_stage, state.proposed_rate, state.version) == ("rate_proposed", 1.29, 2)
+
+
+def test_append_is_compare_and_swap_on_version(tmp_path):
+    """Dois writers com a mesma versão lida: o segundo checkpoint falha com ConcurrentWriteError."""
+    gw = _gateway(tmp_path / "sessions.db")
+
+    async def race():
+        await gw.recover_or_create("cas", "standard")
+        session_a, state_a = await gw.recover_or_create("cas", "standard")
+        session_b, state_b = await gw.recover_or_create("cas", "standard")
+        state_a.rejection_count = 1
+        await gw.save_checkpoint(session_a, state_a)
+        state_b.rejection_count = 5
+        with pytest.raises(ConcurrentWriteError):
+            await gw.save_checkpoint(session_b, state_b)
+        return await gw.recover_or_create("cas", "standard")
+
+    _, state = asyncio.run(race())
+    assert (state.rejection_count, state.version) == (1, 2)
+    # OCC garantido pelo backend: nenhum get de verificação antes do append
+    assert gw.retrier.retries == 0
+
+
+def test_ttl_hides_and_sweeps_expired_sessions(tmp_path):
+    """Sessões além de ttl_hours somem das leituras e a varredura remove sessão e eventos."""
+    now = [1_000_000.0]
+    service = SqliteSessionService(tmp_path / "sessions.db", ttl_hours=1, clock=lambda: now[0])
+    gw = NegotiationSessionGateway(service=service)
+
+    async def scenario():
+        session, state = await gw.recover_or_create("expiring", "standard")
+        await gw.save_checkpoint(session, state)
+        now[0] += 3599
+        assert await service.get_session(app_name=APP_NAME, user_id=USER_ID, session_id="expiring")
+        now[0] += 3601
+        assert await service.get_session(app_name=APP_NAME, user_id=USER_ID, session_id="expiring") is None
+
+    asyncio.run(scenario())
+    assert service.purge_expired() == 1
+    with service._connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM events").fetchone()[0] == 0
+
+
+def test_agent_turn_persists_conversation_events(tmp_path):
+    """Turno completo pelo Runner do ADK: eventos de conversa e checkpoint vão para o SQLite."""
+    from benchmarks._support import FakeLlm
+    from src.agent_router import StatefulFinanceAgent
+    from src.memory_gateway import LongTermMemoryGateway
+
+    db = tmp_path / "sessions.db"
+    agent = StatefulFinanceAgent(
+        session_gw=_gateway(db),
+        memory_gw=LongTermMemoryGateway(project_id="", location="", index_endpoint=""),
+        model=FakeLlm(reply=lambda _req: "Podemos conversar sobre a taxa."),
+    )
+    assert asyncio.run(agent.process_message("agent-sqlite", "Oi")) == "Podemos conversar sobre a taxa."
+
+    service = SqliteSessionService(db)
+    session = asyncio.run(service.get_session(app_name=APP_NAME, user_id=USER_ID, session_id="agent-sqlite"))
+    texts = [e.content.parts[0].text for e in session.events if e.content]
+    assert texts == ["Oi", "Podemos conversar sobre a taxa."]
+    assert session.state["rejection_count"] == 1
+
+
+def _increment_worker(path: str, session_id: str, increments: int) -> int:
+    gw = _gateway(path)
+    conflicts = 0
+
+    async def run():
+        nonlocal conflicts
+        done = 0
+        while done < increments:
+            session, state = await gw.recover_or_create(session_id, "standard")
+            state.rejection_count += 1
+            try:
+                await gw.save_checkpoint(session, state)
+            except ConcurrentWriteError:
+                conflicts += 1
+                continue
+            done += 1
+
+    asyncio.run(run())
+    return conflicts
+
+
+def test_multiple_processes_share_sessions_without_lost_updates(tmp_path):
+    """Processos concorrentes na mesma sessão: o CAS rejeita escritas obsoletas e nenhum incremento se perde."""
+    db = str(tmp_path / "sessions.db")
+    asyncio.run(_gateway(db).recover_or_create("shared", "standard"))
+
+    with multiprocessing.get_context("spawn").Pool(3) as pool:
+        pool.starmap(_increment_worker, [(db, "shared", 15)] * 3)
+
+    _, state = asyncio.run(_gateway(db).recover_or_create("shared", "standard"))
+    assert state.rejection_count == 45
+    assert state.version == 46
@@ -0,0 +1,53 @@
+import asyncio
+
+from src.telemetry import FinOpsTelemetry
+
+
+class _CountingEncoding:
+    """Encoding falso (1 token por palavra) que registra as chamadas em lote."""
+
+    def __init__(self):
+        self.batches: list[list[str]] = []
+
+    def encode_ordinary_batch(self, texts: list[str]) -> list[list[int]]:
+        self.batches.append(texts)
+        return [list(range(len(t.split()))) for t in texts]
+
+
+def test_record_turn_counts_full_prompt_and_caches_fragments():
+    """O turno conta system prompt + insights + mensagem; fragmentos repetidos não são re-tokenizados."""
+    encoding = _CountingEncoding()
+    telemetry = FinOpsTelemetry(encoding=encoding)
+    system_prompt = "Voce e um negociador senior " * 50
+    insights = "Cliente prefere prazos curtos"
+
+    async def turns():
+        for _ in range(5):
+            await telemetry.record_turn([system_prompt, insights], "Quero financiar um carro", "Posso ajudar")
+
+    asyncio.run(turns())
+
+    assert telemetry.turns == 5
+    assert telemetry.input_tokens == 5 * (250 + 4 + 4)
+    assert telemetry.output_tokens == 5 * 2
+    encoded = [t for batch in encoding.batches for t in batch]
+    assert encoded.count(system_prompt) == 1
+    assert encoded.count(insights) == 1
+    assert len(encoding.batches) == 5 + 1  # um lote (mensagem + resposta) por turno + um de fragmentos
+
+
+def test_token_cache_is_bounded():
+    """O cache de contagens é um LRU limitado por token_cache_max_entries."""
+    telemetry = FinOpsTelemetry(encoding=_CountingEncoding())
+    telemetry.token_cache_max_entries = 3
+    telemetry.count_tokens([f"fragmento {i}" for i in range(10)], cached=True)
+    assert len(telemetry._token_cache) == 3
+
+
+def test_savings_report_uses_measured_tokens(capsys):
+    """O relatório mostra a média medida de tokens por turno, não uma estimativa fixa."""
+    telemetry = FinOpsTelemetry(encoding=_CountingEncoding())
+    asyncio.run(telemetry.record_turn(["um dois tres"], "quatro", "cinco seis"))
+    telemetry.print_savings_report()
+    stateful_row = next(line for line in capsys.readouterr().out.splitlines() if "Stateful" in line)
+    assert stateful_row.split()[-2] == "6"  # 3 (fragmento) + 1 (mensagem) + 2 (resposta)
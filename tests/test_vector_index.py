@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+
+np = pytest.importorskip("numpy", reason="numpy não instalado (extra local-index)")
+
+from src.memory_gateway import LongTermMemoryGateway  # noqa: E402
+from src.vector_index import HashingEmbedder, LocalVectorIndex  # noqa: E402
+
+INSIGHTS = [
+    "Cliente conservador negocia taxas com agressividade e só fecha abaixo de 1.0%",
+    "Cliente prefere parcelas menores e prazo longo no financiamento",
+    "Cliente premium com histórico de quitação antecipada",
+    "Cliente recusou seguro prestamista em negociações anteriores",
+]
+
+
+def test_search_returns_top_k_ordered_by_similarity():
+    """Top-k em ordem decrescente de cosseno; a consulta mais próxima vem primeiro."""
+    index = LocalVectorIndex.from_documents(INSIGHTS)
+    hits = index.search("cliente negocia taxas com agressividade", top_k=2)
+
+    assert len(hits) == 2
+    assert hits[0].content == INSIGHTS[0]
+    assert hits[0].score >= hits[1].score
+
+
+def test_search_honors_min_similarity_score():
+    """Documentos abaixo do score mínimo são descartados, mesmo dentro do top-k."""
+    index = LocalVectorIndex.from_documents(INSIGHTS)
+    hits = index.search("quitação antecipada premium", top_k=4, min_score=0.5)
+
+    assert [h.content for h in hits] == [INSIGHTS[2]]
+    assert index.search("termo completamente ausente", top_k=4, min_score=0.5) == []
+
+
+def test_index_roundtrip_with_memory_map(tmp_path):
+    """save/load com mmap preserva documentos e resultados."""
+    index = LocalVectorIndex.from_documents(INSIGHTS, HashingEmbedder(dim=32))
+    index.save(tmp_path)
+
+    loaded = LocalVectorIndex.load(tmp_path, mmap=True)
+    assert isinstance(loaded.embeddings, np.memmap)
+    assert loaded.search("parcelas menores", top_k=1) == index.search("parcelas menores", top_k=1)
+
+
+def test_partitioned_index_matches_exact_search_and_survives_roundtrip(tmp_path):
+    """Índice particionado (IVF): mesmo top-1 do scan exato para consultas próximas; save/load preserva as partições."""
+    rng = np.random.default_rng(3)
+    embeddings = rng.standard_normal((4000, 16), dtype=np.float32)
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+    documents = [f"insight-{i}" for i in range(len(embeddings))]
+    exact = LocalVectorIndex(embeddings, documents)
+    partitioned = LocalVectorIndex(embeddings, documents, partitions=32, probes=4)
+    partitioned.save(tmp_path)
+    loaded = LocalVectorIndex.load(tmp_path, probes=4)
+
+    queries = embeddings[:50] + rng.standard_normal((50, 16), dtype=np.float32) * 0.05
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    for query in queries:
+        expected = exact.search_vector(query, top_k=1, min_score=0.5)
+        assert partitioned.search_vector(query, top_k=1, min_score=0.5) == expected
+        assert loaded.search_vector(query, top_k=1, min_score=0.5) == expected
+    assert len(partitioned.centroids) == 32 and partitioned.offsets[-1] == len(documents)
+
+
+def test_gateway_uses_local_index_with_policy_limits(tmp_path):
+    """O gateway aplica max_documents e min_similarity_score da política ao backend local."""
+    policy = tmp_path / "policy.yaml"
+    policy.write_text("vector_search:\n  max_documents: 1\n  min_similarity_score: 0.3\n", encoding="utf-8")
+    gw = LongTermMemoryGateway(local_index=LocalVectorIndex.from_documents(INSIGHTS), policy_path=policy)
+
+    assert not gw.is_mock
+    assert asyncio.run(gw.search_customer_insights("cliente prefere parcelas menores")) == INSIGHTS[1]
+    assert asyncio.run(gw.search_customer_insights("xyz")) == ""
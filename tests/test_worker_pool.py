@@ -0,0 +1,114 @@
+import asyncio
+import os
+from collections import Counter
+
+import pytest
+from src.exceptions import WorkerUnavailableError
+from src.hashring import HashRing
+from src.worker_pool import WorkerPool
+
+
+class _CountingAgent:
+    """Agente mínimo (duck typing): responde com o pid do worker e o nº do turno da sessão naquele processo."""
+
+    def __init__(self, latency_s: float = 0.0):
+        self.latency_s = latency_s
+        self.turns: Counter[str] = Counter()
+
+    async def process_message(self, session_id: str, customer_message: str, customer_tier: str = "standard") -> str:
+        await asyncio.sleep(self.latency_s)
+        if customer_message == "boom":
+            raise RuntimeError("falha simulada")
+        self.turns[session_id] += 1
+        return f"{os.getpid()}:{session_id}:{self.turns[session_id]}"
+
+
+def _fast_agent() -> _CountingAgent:
+    return _CountingAgent()
+
+
+def _slow_agent() -> _CountingAgent:
+    return _CountingAgent(latency_s=0.3)
+
+
+def test_hash_ring_moves_keys_only_to_new_node():
+    """Adicionar um nó move ~1/N das chaves, e só para o nó novo; a distribuição é equilibrada."""
+    keys = [f"sessao-{i}" for i in range(10_000)]
+    ring = HashRing(range(4), vnodes=64)
+    before = {k: ring.node_for(k) for k in keys}
+    load = Counter(before.values())
+    assert min(load.values()) > 10_000 / 4 * 0.7
+
+    ring.add(4)
+    moved = {k: ring.node_for(k) for k in keys if ring.node_for(k) != before[k]}
+    assert set(moved.values()) == {4}
+    assert 0.1 < len(moved) / len(keys) < 0.3
+
+    ring.remove(4)
+    assert {k: ring.node_for(k) for k in keys} == before
+
+
+def test_pool_routes_each_session_to_a_fixed_worker():
+    """Todos os turnos de uma sessão caem no mesmo processo; sessões se espalham pelos workers."""
+
+    async def run():
+        async with WorkerPool(_fast_agent, workers=3) as pool:
+            sessions = [f"s{i}" for i in range(30)]
+            replies = await asyncio.gather(*(pool.process_message(s, "oi") for s in sessions for _ in range(3)))
+            with pytest.raises(RuntimeError, match="falha simulada"):
+                await pool.process_message("s0", "boom")
+            return replies, set(pool.workers.values())
+
+    replies, pids = asyncio.run(run())
+    by_session: dict[str, set[str]] = {}
+    for reply in replies:
+        pid, session_id, _ = reply.split(":")
+        by_session.setdefault(session_id, set()).add(pid)
+    assert all(len(owners) == 1 for owners in by_session.values())
+    assert {int(p) for owners in by_session.values() for p in owners} == pids
+    assert len(pids) == 3
+
+
+def test_add_worker_rebalances_and_remove_worker_drains_in_flight_turns():
+    """Worker novo recebe só parte das sessões; remover um worker espera os turnos em voo terminarem."""
+
+    async def run():
+        async with WorkerPool(_slow_agent, workers=2) as pool:
+            sessions = [f"s{i}" for i in range(40)]
+
+            async def one_turn_each() -> dict[str, str]:
+                replies = await asyncio.gather(*(pool.process_message(s, "oi") for s in sessions))
+                return dict(zip(sessions, replies, strict=True))
+
+            first = await one_turn_each()
+
+            new_id = await pool.add_worker()
+            new_pid = pool.workers[new_id]
+            second = await one_turn_each()
+
+            in_flight = [asyncio.create_task(pool.process_message(s, "oi")) for s in sessions]
+            await asyncio.sleep(0.05)
+            await pool.remove_worker(new_id)
+            drained = await asyncio.gather(*in_flight)
+            return first, second, new_pid, drained, pool.workers
+
+    first, second, new_pid, drained, remaining = asyncio.run(run())
+    moved = [s for s in first if first[s].split(":")[0] != second[s].split(":")[0]]
+    assert moved
+    assert len(moved) < len(first)
+    assert all(second[s].startswith(f"{new_pid}:") for s in moved)
+    assert len(drained) == 40
+    assert len(remaining) == 2
+
+
+def test_closed_pool_rejects_turns():
+    """Sem workers no anel, o turno falha com WorkerUnavailableError em vez de ficar pendurado."""
+
+    async def run():
+        pool = WorkerPool(_fast_agent, workers=1)
+        await pool.start()
+        await pool.close()
+        await pool.process_message("s1", "oi")
+
+    with pytest.raises(WorkerUnavailableError):
+        asyncio.run(run())